@@ -0,0 +1,65 @@
+"""
+Per-field latency of `JCClassifier.classify` against `compute_cts`.
+
+The equivalence harness runs first, so timings are only reported for engines that
+reproduce the reference classification.
+
+Run from the repository root:
+    python benchmarks/bench_classifier.py
+"""
+import logging
+import time
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compute_cts, JCClassifier
+from jcclass.compute.equivalence import check_equivalence
+
+logging.getLogger("jcclass").setLevel(logging.WARNING)
+
+
+def create_mslp(resolution: float, n_time: int) -> xr.DataArray:
+    lat = np.arange(90, -90 - resolution / 2, -resolution)
+    lon = np.arange(0, 360, resolution)
+    values = 101325 + 3000 * np.random.rand(n_time, lat.size, lon.size)
+    return xr.DataArray(
+        values,
+        dims=["time", "latitude", "longitude"],
+        coords={"time": np.arange(n_time), "latitude": lat, "longitude": lon},
+        name="msl",
+    )
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    check_equivalence(n_random=500, n_time=2)
+    for resolution in (2.5, 1.0, 0.5):
+        mslp = create_mslp(resolution, n_time=1)
+        start = time.perf_counter()
+        classifier = JCClassifier(mslp)
+        setup = time.perf_counter() - start
+
+        t_cts = best_of(lambda: compute_cts(mslp), repeat=3)
+        t_xr = best_of(lambda: classifier.classify(mslp), repeat=10)
+        t_np = best_of(lambda: classifier.classify_array(mslp.values), repeat=10)
+        with JCClassifier(mslp, threads=4) as threaded:
+            t_th = best_of(lambda: threaded.classify_array(mslp.values), repeat=10)
+        bilinear = JCClassifier(mslp, stencil="bilinear")
+        t_sp = best_of(lambda: bilinear.classify_array(mslp.values), repeat=10)
+
+        print(f"{resolution:>4}° grid {mslp.shape[1:]}: setup {setup * 1e3:8.1f} ms | "
+              f"compute_cts {t_cts * 1e3:8.1f} ms | classify {t_xr * 1e3:8.1f} ms | "
+              f"classify_array {t_np * 1e3:8.1f} ms | 4 threads {t_th * 1e3:8.1f} ms | "
+              f"bilinear {t_sp * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
-from .compute import compute_cts, eleven_cts
+from .compute import compute_cts, eleven_cts, JCClassifier, NativeGridClassifier, \
+    ensemble_probabilities, compare_periods, ct_composites, rolling_frequencies, \
+    compare_classifications, export_parquet, daily_modes, track_regions, summarize_tracks
 from .plotting import plot_cts
 
-__all__ = ["compute_cts", "eleven_cts", "plot_cts"]
+__all__ = ["compute_cts", "eleven_cts", "JCClassifier", "NativeGridClassifier", "ensemble_probabilities",
+           "compare_periods", "ct_composites", "rolling_frequencies",
+           "compare_classifications", "export_parquet", "daily_modes",
+           "track_regions", "summarize_tracks", "plot_cts"]
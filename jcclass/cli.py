@@ -0,0 +1,323 @@
+import argparse
+import glob
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+import xarray as xr
+from xarray.backends.locks import HDF5_LOCK
+
+from jcclass.compute import compute_cts
+from jcclass.compute.functions.packing import packing_of
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+MSLP_VARIABLES = ("msl", "psl")
+MANIFEST_NAME = "manifest.json"
+
+# Circulation types are stored as int8, with this value for unclassified cells
+CTS_FILL_VALUE = -128
+
+
+def to_int8(lwt: np.ndarray) -> np.ndarray:
+    """Converts circulation type codes (NaN where unclassified) to int8 with `CTS_FILL_VALUE`."""
+    return np.where(np.isfinite(lwt), lwt, CTS_FILL_VALUE).astype(np.int8)
+
+
+def drop_time_calendar(cts: xr.DataArray) -> xr.DataArray:
+    """
+    Removes the calendar attribute of datetime time coordinates, which xarray sets itself
+    when encoding them.
+    """
+    if "time" in cts.coords and cts["time"].dtype.kind == "M":
+        cts["time"].attrs.pop("calendar", None)
+    return cts
+
+
+class NetCDFOutput:
+    """
+    Writes circulation types to a NetCDF file block by block as they are classified (the
+    `out` argument of `compute_cts`), so the result is never held in memory in full and the
+    disk writes overlap the classification of the next block.
+
+    Args:
+        path (str): Output file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dataset = None
+        self.variable = None
+
+    def __call__(self, template: xr.DataArray) -> "NetCDFOutput":
+        """Creates the file with the coordinates of `template` and an empty "cts" variable."""
+        template = drop_time_calendar(template)
+        template.coords.to_dataset().to_netcdf(self.path)
+        with HDF5_LOCK:
+            self.dataset = netCDF4.Dataset(self.path, "a")
+            for dim, size in template.sizes.items():
+                if dim not in self.dataset.dimensions:
+                    self.dataset.createDimension(dim, size)
+            self.variable = self.dataset.createVariable("cts", "i1", template.dims, zlib=True,
+                                                        fill_value=CTS_FILL_VALUE)
+            self.variable.setncatts(template.attrs)
+        return self
+
+    def __setitem__(self, key, lwt: np.ndarray) -> None:
+        # Input files may be read concurrently on the prefetch thread
+        with HDF5_LOCK:
+            self.variable[key] = to_int8(lwt)
+
+    def close(self) -> None:
+        """Closes the file."""
+        if self.dataset is not None:
+            with HDF5_LOCK:
+                self.dataset.close()
+            self.dataset = None
+
+
+def common_root(files: list) -> Path:
+    """
+    Returns the deepest directory containing all the files (as an absolute path).
+    """
+    if not files:
+        return Path.cwd()
+    return Path(os.path.commonpath([os.path.abspath(f.parent) for f in files]))
+
+
+def output_path(input_path: Path, output_dir: Path, root: Path = None) -> Path:
+    """
+    Returns the path of the circulation types file written for an input file. With `root`,
+    the directories of the input below `root` are mirrored under `output_dir`, so inputs with
+    the same name in different directories (e.g. era5/1990/msl.nc and era5/1991/msl.nc) get
+    different outputs.
+    """
+    relative = Path(os.path.abspath(input_path.parent)).relative_to(root) if root is not None else Path()
+    return output_dir / relative / f"{input_path.stem}_cts.nc"
+
+
+def select_variable(ds: xr.Dataset, variable: str = None) -> xr.DataArray:
+    """
+    Selects the MSLP variable of a dataset, looking for "msl" or "psl" if not given.
+
+    Raises:
+        KeyError: If the variable is not found in the dataset.
+    """
+    if variable is not None:
+        return ds[variable]
+    for name in MSLP_VARIABLES:
+        if name in ds.data_vars:
+            return ds[name]
+    raise KeyError(f"None of the variables {MSLP_VARIABLES} found. Use --variable to select one.")
+
+
+def open_mslp(ds: xr.Dataset, variable: str = None, packed: bool = False) -> xr.DataArray:
+    """
+    Selects the MSLP variable of a dataset (see `select_variable`). With `packed`, the dataset
+    was opened with `mask_and_scale=False`: packed integers are kept raw, so they are classified
+    without decoding them (see `compute_cts`), and unpacked variables are decoded as usual.
+    """
+    data = select_variable(ds, variable)
+    if packed and packing_of(data) is None:
+        data = xr.decode_cf(data.to_dataset())[data.name]
+    return data
+
+
+def classify_file(input_path: str, output_file: str, variable: str = None, prefetch: int = 0,
+                  packed: bool = False) -> float:
+    """
+    Computes the circulation types of one NetCDF file and writes them to `output_file`.
+
+    The output is first written to a temporary file and then renamed, so an existing
+    output file is always complete. The temporary file is removed if the computation fails.
+    With `prefetch`, the file is classified in time blocks while the next blocks are read on
+    a background thread, and every block is written to the output file as it is classified
+    (see `NetCDFOutput`). With `packed`, the file is opened with `mask_and_scale=False` and
+    packed int16 MSLP is classified from its raw values.
+
+    Returns:
+        float: Elapsed time in seconds.
+    """
+    start = time.perf_counter()
+    tmp_file = f"{output_file}.tmp"
+    try:
+        with xr.open_dataset(input_path, mask_and_scale=not packed) as ds:
+            data = open_mslp(ds, variable, packed)
+            if prefetch:
+                output = NetCDFOutput(tmp_file)
+                try:
+                    compute_cts(data, prefetch=prefetch, out=output)
+                finally:
+                    output.close()
+            else:
+                cts = drop_time_calendar(compute_cts(data))
+                encoding = {"cts": {"dtype": "int8", "_FillValue": CTS_FILL_VALUE, "zlib": True}}
+                cts.to_netcdf(tmp_file, encoding=encoding)
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    return time.perf_counter() - start
+
+
+def load_manifest(path: Path) -> dict:
+    """
+    Loads a job manifest, or returns an empty one if it does not exist.
+    """
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {"files": {}}
+
+
+def save_manifest(manifest: dict, path: Path) -> None:
+    """
+    Writes the job manifest atomically.
+    """
+    manifest["updated"] = datetime.now(timezone.utc).isoformat()
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def expand_inputs(patterns: list) -> list:
+    """
+    Expands the input glob patterns into a sorted list of unique files.
+    """
+    files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches:
+            logger.warning(f"No files match '{pattern}'.")
+        files.update(matches)
+    return sorted(Path(f) for f in files)
+
+
+def run_batch(inputs: list, output_dir: str, variable: str = None, workers: int = 1,
+              manifest_path: str = None, overwrite: bool = False, prefetch: int = 0,
+              packed: bool = False) -> dict:
+    """
+    Classifies a collection of NetCDF files, skipping those whose output already exists.
+
+    Args:
+        inputs (list): Glob patterns of the input files.
+        output_dir (str): Directory where the "<name>_cts.nc" files are written, mirroring
+            the directories of the inputs below their common root.
+        variable (str, optional): Name of the MSLP variable ("msl" or "psl" are detected).
+        workers (int, optional): Number of files classified concurrently (default: 1).
+        manifest_path (str, optional): Job manifest path (default: "<output_dir>/manifest.json").
+        overwrite (bool, optional): Recompute files whose output already exists (default: False).
+        prefetch (int, optional): Number of time blocks read ahead within each file (default: 0).
+        packed (bool, optional): Classify packed integer MSLP without decoding it (default: False).
+
+    Returns:
+        dict: The job manifest, with the status ("completed", "failed" or "skipped"),
+            output path, elapsed seconds and error message of every input file, and the
+            number of files of each status in this run ("last_run").
+
+    Raises:
+        ValueError: If several inputs map to the same output file (e.g. a.nc and a.nc4).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(manifest_path) if manifest_path else output_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    entries = manifest["files"]
+
+    input_files = expand_inputs(inputs)
+    root = common_root(input_files)
+    outputs = {input_file: output_path(input_file, output_dir, root) for input_file in input_files}
+    duplicates = sorted(str(f) for f, count in Counter(outputs.values()).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Several inputs map to the same output: {', '.join(duplicates)}.")
+
+    summary = {"completed": 0, "failed": 0, "skipped": 0}
+    pending = []
+    for input_file, output_file in outputs.items():
+        if output_file.exists() and not overwrite:
+            previous = entries.get(str(input_file), {})
+            if previous.get("status") != "completed":
+                entries[str(input_file)] = {"status": "skipped", "output": str(output_file)}
+            summary["skipped"] += 1
+            continue
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        pending.append((input_file, output_file))
+
+    logger.info(f"{len(pending)} files to classify, {summary['skipped']} already done.")
+    manifest["last_run"] = summary
+    save_manifest(manifest, manifest_path)
+
+    def record(input_file, output_file, seconds=None, error=None):
+        entry = {"output": str(output_file), "finished": datetime.now(timezone.utc).isoformat()}
+        if error is None:
+            entry.update(status="completed", seconds=round(seconds, 3))
+            logger.info(f"Classified {input_file} in {seconds:.1f} s.")
+        else:
+            entry.update(status="failed", error=error)
+            logger.error(f"Failed to classify {input_file}: {error}")
+        entries[str(input_file)] = entry
+        summary[entry["status"]] += 1
+        save_manifest(manifest, manifest_path)
+
+    if workers <= 1:
+        for input_file, output_file in pending:
+            try:
+                seconds = classify_file(str(input_file), str(output_file), variable, prefetch, packed)
+                record(input_file, output_file, seconds=seconds)
+            except Exception as e:
+                record(input_file, output_file, error=f"{type(e).__name__}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(classify_file, str(input_file), str(output_file), variable, prefetch, packed):
+                    (input_file, output_file)
+                for input_file, output_file in pending
+            }
+            for future in as_completed(futures):
+                input_file, output_file = futures[future]
+                try:
+                    record(input_file, output_file, seconds=future.result())
+                except Exception as e:
+                    record(input_file, output_file, error=f"{type(e).__name__}: {e}")
+
+    return manifest
+
+
+def main(argv: list = None) -> int:
+    """
+    Entry point of the `jcclass` command line tool.
+    """
+    parser = argparse.ArgumentParser(
+        prog="jcclass",
+        description="Compute Jenkinson and Collison circulation types for a collection of MSLP NetCDF files.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Input NetCDF files or glob patterns (quote them).")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for the <name>_cts.nc outputs.")
+    parser.add_argument("-v", "--variable", default=None,
+                        help="MSLP variable name (default: 'msl' or 'psl', whichever is present).")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="Number of files processed concurrently.")
+    parser.add_argument("--manifest", default=None, help="Job manifest path (default: <output-dir>/manifest.json).")
+    parser.add_argument("--overwrite", action="store_true", help="Recompute files whose output already exists.")
+    parser.add_argument("--prefetch", type=int, default=0,
+                        help="Time blocks read ahead while the current block is classified (default: 0).")
+    parser.add_argument("--packed", action="store_true",
+                        help="Classify packed int16 MSLP (scale_factor/add_offset) without decoding it.")
+    args = parser.parse_args(argv)
+
+    manifest = run_batch(args.inputs, args.output_dir, variable=args.variable, workers=args.workers,
+                         manifest_path=args.manifest, overwrite=args.overwrite, prefetch=args.prefetch,
+                         packed=args.packed)
+    return 1 if manifest["last_run"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,3 +1,16 @@
 from .core import compute_cts, eleven_cts
+from .classifier import JCClassifier
+from .native import NativeGridClassifier
+from .ensemble import ensemble_probabilities
+from .statistics import compare_periods
+from .composites import ct_composites
+from .rolling import rolling_frequencies
+from .comparison import compare_classifications
+from .export import export_parquet
+from .modes import daily_modes
+from .regions import track_regions, summarize_tracks
 
-__all__ = ["compute_cts", "eleven_cts"]
+__all__ = ["compute_cts", "eleven_cts", "JCClassifier", "NativeGridClassifier", "ensemble_probabilities",
+           "compare_periods", "ct_composites", "rolling_frequencies",
+           "compare_classifications", "export_parquet", "daily_modes",
+           "track_regions", "summarize_tracks"]
@@ -0,0 +1,377 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import xarray as xr
+from .functions.data_preparation import read_mslp_file, checking_lon_coords, \
+    checking_lat_coords, is_world
+from .functions.data_extraction import extract_lat_lon_points
+from .functions.constants import compute_constants
+from .functions.stencil import stencil_indices, stencil_table
+from .functions.kernels import gather_gridpoints, flow_terms, direction_codes, lwt_codes
+from .functions.operator import INTERPOLATION_METHODS, cached_stencil_operator, apply_operator, grid_key
+from .functions.format_data import enhance_and_validate_dataarray
+
+
+LAT_NAMES = ("latitude", "lat")
+LON_NAMES = ("longitude", "lon")
+
+# Half-width (degrees) of the equatorial band skipped by mask="equator", as masked by plot_cts
+EQUATOR_BAND = 10
+
+
+def _scaled_terms(W, S, ZW, ZS, scale) -> tuple:
+    """
+    Applies the scale factor of packed input to the flow and vorticity terms computed from
+    its raw values. The terms are differences of linear combinations of the grid points,
+    so the offset cancels and scaling them equals computing them from decoded values.
+    """
+    scale = np.float64(scale)
+    W, S, ZW, ZS = W * scale, S * scale, ZW * scale, ZS * scale
+    return W, S, np.sqrt(S**2 + W**2), ZW, ZS, ZW + ZS
+
+
+def find_dim(data: xr.DataArray, names: tuple) -> str:
+    """
+    Returns the first of `names` that is a dimension of `data`.
+
+    Raises:
+        ValueError: If none of `names` is a dimension.
+    """
+    for name in names:
+        if name in data.dims:
+            return name
+    raise ValueError(f"The DataArray must have one of the dimensions {names}. Found: {', '.join(data.dims)}.")
+
+
+def find_coord(data: xr.DataArray, names: tuple) -> str:
+    """
+    Returns the first of `names` that is a coordinate of `data`, on any dimensions (e.g. the
+    2-D latitude of a curvilinear grid).
+
+    Raises:
+        ValueError: If none of `names` is a coordinate.
+    """
+    for name in names:
+        if name in data.coords:
+            return name
+    raise ValueError(f"The DataArray must have one of the coordinates {names}. Found: {', '.join(data.coords)}.")
+
+
+class JCClassifier:
+    """
+    Reusable Jenkinson and Collison classifier for a fixed grid.
+
+    All the grid-dependent work done by `compute_cts` (coordinate checks, global coverage
+    detection, constants and the search of the 16 grid points) is carried out once when the
+    classifier is built. `classify` then only gathers the grid points and evaluates the flow,
+    direction and circulation type rules, giving the same result as `compute_cts`.
+
+    An instance serves one caller at a time: the grid points are gathered into scratch
+    buffers kept between calls, so concurrent `classify` calls on the same instance must be
+    serialized (or use one classifier per thread). With `threads > 1`, the worker threads are
+    released by `close`, or by using the classifier as a context manager.
+
+    Args:
+        grid (xr.DataArray): Any DataArray on the target grid (e.g. one MSLP field), with
+            latitude ("latitude" or "lat") and longitude ("longitude" or "lon") dimensions.
+        stencil (str, optional): How the 16 grid points are obtained.
+            - "gather" (default): nearest grid nodes gathered one by one, exactly as `compute_cts`.
+            - "nearest": the same nodes, applied as precomputed sparse operators for the
+              W, S, ZW and ZS terms (one sparse product per term for all time steps).
+            - "bilinear": sparse operators that interpolate every grid point between its four
+              surrounding nodes, keeping the 5°/10° geometry on irregular or Gaussian grids.
+            Sparse operators are cached per grid and reused by later classifiers.
+        mask (xr.DataArray or np.ndarray or str, optional): Cells to classify (True) or skip
+            (False). A DataArray with latitude and longitude coordinates is matched to the
+            nearest classified cells; an array must have the shape of the classified grid.
+            "equator" skips the band |latitude| < 10°, where the classification is not
+            meaningful. Skipped cells are never computed and are NaN in the output.
+        threads (int, optional): Number of threads that classify a field at once, each on a
+            band of latitudes, reading the same input and writing into the same output array
+            (default: 1). Useful to lower the latency of one or a few large fields.
+
+    Attributes:
+        latitude (xr.DataArray): Latitude values of the classified cells.
+        longitude (xr.DataArray): Longitude values of the classified cells.
+        is_global (bool): Whether the grid covers the entire globe.
+        cells (np.ndarray): Flat indices of the classified cells, or None if all are classified.
+        lat_dim (str): Name of the latitude dimension of the input grid.
+        lon_dim (str): Name of the longitude dimension of the input grid.
+        spatial_dims (tuple): Dimensions of the input grid, (lat_dim, lon_dim).
+
+    Example:
+        >>> from jcclass.compute import JCClassifier
+        >>> classifier = JCClassifier(ds_mslp.isel(time=0))
+        >>> cts = classifier.classify(ds_mslp.isel(time=slice(-4, None)))
+        >>> with JCClassifier(ds_mslp.isel(time=0), threads=4) as classifier:
+        ...     cts = classifier.classify(ds_mslp)
+    """
+
+    def __init__(self, grid: xr.DataArray, stencil: str = "gather", mask=None, threads: int = 1):
+        if not isinstance(grid, xr.DataArray):
+            raise TypeError("The grid must be an xarray.DataArray.")
+        if threads < 1:
+            raise ValueError("threads must be a positive integer.")
+        self._build(grid, stencil, mask)
+
+        self._buffer = None
+        self.threads = threads
+        self._bands = None
+        self._executor = None
+
+    def _build(self, grid: xr.DataArray, stencil: str, mask) -> None:
+        """
+        Sets up the grid: coordinates, constants, the stencil table or operators, and the
+        classified cells.
+        """
+        if stencil != "gather" and stencil not in INTERPOLATION_METHODS:
+            raise ValueError(f"stencil must be one of {('gather',) + INTERPOLATION_METHODS}. Found: {stencil}.")
+        self.stencil = stencil
+
+        self.lat_dim = find_dim(grid, LAT_NAMES)
+        self.lon_dim = find_dim(grid, LON_NAMES)
+        self.spatial_dims = (self.lat_dim, self.lon_dim)
+        self.grid_shape = (grid.sizes[self.lat_dim], grid.sizes[self.lon_dim])
+
+        # Flat position of every cell of the input grid, prepared as compute_cts does
+        positions = xr.DataArray(
+            np.arange(self.grid_shape[0] * self.grid_shape[1]).reshape(self.grid_shape),
+            coords={self.lat_dim: grid[self.lat_dim].values, self.lon_dim: grid[self.lon_dim].values},
+            dims=[self.lat_dim, self.lon_dim],
+        ).expand_dims(time=[0])
+        positions = read_mslp_file(positions)
+        positions = checking_lat_coords(positions)
+        positions = checking_lon_coords(positions)
+
+        self.is_global = is_world(positions)
+        self.latitude, self.longitude = extract_lat_lon_points(positions)
+
+        sc, zwa, zwb, zsc = compute_constants(self.latitude, self.longitude)
+        self.sc = sc.values.ravel()
+        self.zwa = zwa.values.ravel()
+        self.zwb = zwb.values.ravel()
+        self.zsc = zsc.values.ravel()
+        self.northern = np.repeat(self.latitude.values >= 0, self.longitude.size)
+
+        if stencil == "gather":
+            lat_idx, lon_idx = stencil_indices(self.latitude, self.longitude, self.is_global)
+            rows = positions.sel(latitude=self.latitude).isel(time=0).values.astype(np.intp)
+            self.table = stencil_table(rows, lat_idx, lon_idx)
+            self.operators = None
+        else:
+            key = (grid_key(grid[self.lat_dim].values, grid[self.lon_dim].values), stencil)
+            self.table = None
+            self.operators = cached_stencil_operator(
+                key, positions.isel(time=0).values.astype(np.intp), positions.latitude.values,
+                self.latitude, self.longitude, self.is_global,
+                self.sc, self.zwa, self.zwb, self.zsc, method=stencil,
+            )
+
+        self.cells = None
+        if mask is not None:
+            self._apply_mask(mask)
+
+    def _mask_values(self, mask) -> np.ndarray:
+        """Returns the mask as a boolean array with the shape of the classified grid."""
+        if isinstance(mask, str):
+            if mask != "equator":
+                raise ValueError(f"Unknown mask '{mask}'. Use 'equator', a boolean DataArray or array.")
+            keep = np.abs(self.latitude.values) >= EQUATOR_BAND
+            return np.repeat(keep[:, None], self.longitude.size, axis=1)
+
+        if isinstance(mask, xr.DataArray):
+            mask = mask.rename({find_dim(mask, LAT_NAMES): "latitude", find_dim(mask, LON_NAMES): "longitude"})
+            mask = checking_lon_coords(mask)
+            mask = mask.sel(latitude=self.latitude, longitude=self.longitude, method="nearest")
+            mask = mask.transpose("latitude", "longitude").values
+
+        mask = np.asarray(mask)
+        if mask.shape != self.shape:
+            raise ValueError(f"The mask must have the shape of the classified grid {self.shape}. Found: {mask.shape}.")
+        return mask.astype(bool)
+
+    def _apply_mask(self, mask) -> None:
+        """Restricts the stencil, constants and operators to the cells kept by the mask."""
+        cells = np.flatnonzero(self._mask_values(mask))
+        self.cells = cells
+        self.sc, self.zwa, self.zwb, self.zsc = self.sc[cells], self.zwa[cells], self.zwb[cells], self.zsc[cells]
+        self.northern = self.northern[cells]
+        if self.table is not None:
+            self.table = self.table[:, cells]
+        else:
+            self.operators = tuple(operator[cells] for operator in self.operators)
+
+    def close(self) -> None:
+        """
+        Shuts down the worker threads of `threads > 1` and releases the scratch buffers. The
+        classifier can still be used afterwards, and starts new threads when needed.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._buffer = None
+        for _, _, scratch in self._bands or ():
+            scratch["buffer"] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    @property
+    def shape(self) -> tuple:
+        """Shape (latitude, longitude) of the classified fields."""
+        return self.latitude.size, self.longitude.size
+
+    @property
+    def n_cells(self) -> int:
+        """Number of cells actually classified (all cells unless a mask is set)."""
+        return self.cells.size if self.cells is not None else int(np.prod(self.shape))
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the stencil table or sparse operators and the constants, in bytes."""
+        total = self.sc.nbytes + self.zwa.nbytes + self.zwb.nbytes + self.zsc.nbytes + self.northern.nbytes
+        if self.table is not None:
+            total += self.table.nbytes
+        else:
+            total += sum(op.data.nbytes + op.indices.nbytes + op.indptr.nbytes for op in self.operators)
+        return int(total)
+
+    def _gridpoints(self, field: np.ndarray) -> np.ndarray:
+        """Gathers the 16 grid points into a reusable scratch buffer."""
+        n = field.shape[0]
+        buffer = self._buffer
+        if buffer is None or buffer.dtype != field.dtype or buffer.shape[1] < n:
+            buffer = np.empty((self.table.shape[0], n, self.table.shape[1]), dtype=field.dtype)
+            self._buffer = buffer
+        return gather_gridpoints(field, self.table, out=buffer[:, :n])
+
+    def _band_plan(self) -> list:
+        """
+        Splits the classified cells into one contiguous range of whole latitude rows per
+        thread, with the stencil table (or operators) and the constants of every band.
+        """
+        if self._bands is None:
+            cells = self.cells if self.cells is not None else np.arange(self.n_cells)
+            if len(self.shape) > 1:
+                rows, n_rows = cells // self.shape[-1], self.shape[0]
+            else:
+                # Unstructured grids: equal ranges of cells
+                rows, n_rows = cells * self.threads // self.shape[0], self.threads
+            edges = np.linspace(0, n_rows, self.threads + 1).round()
+            bounds = np.searchsorted(rows, edges)
+            self._bands = []
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                if end > start:
+                    band = slice(start, end)
+                    stencil = (np.ascontiguousarray(self.table[:, band]) if self.table is not None
+                               else tuple(operator[band] for operator in self.operators))
+                    self._bands.append((band, stencil, {"buffer": None}))
+        return self._bands
+
+    def _classify_band(self, field: np.ndarray, band: tuple, out: np.ndarray, scale: float = None) -> None:
+        """Classifies one band of cells and writes its codes into `out`."""
+        cells, stencil, scratch = band
+        if self.operators is None:
+            buffer = scratch["buffer"]
+            if buffer is None or buffer.dtype != field.dtype or buffer.shape[1] < field.shape[0]:
+                buffer = np.empty((stencil.shape[0], field.shape[0], stencil.shape[1]), dtype=field.dtype)
+                scratch["buffer"] = buffer
+            gridpoints = gather_gridpoints(field, stencil, out=buffer[:, :field.shape[0]])
+            W, S, F, ZW, ZS, Z = flow_terms(gridpoints, self.sc[cells], self.zwa[cells], self.zwb[cells], self.zsc[cells])
+        else:
+            W, S, ZW, ZS = apply_operator(stencil, field, self.zwa[cells], self.zwb[cells])
+            F = np.sqrt(S**2 + W**2)
+            Z = ZW + ZS
+        if scale is not None:
+            W, S, F, ZW, ZS, Z = _scaled_terms(W, S, ZW, ZS, scale)
+        direction = direction_codes(W, S, self.northern[cells])
+        out[:, cells] = lwt_codes(F, Z, direction)
+
+    def _classify_cells(self, field: np.ndarray, scale: float = None) -> np.ndarray:
+        """
+        Classifies flattened fields of shape (n, npoints) and returns the codes of the
+        classified cells only, shape (n, n_cells). With `scale`, the fields hold raw packed
+        values and the terms are scaled after the stencil differences.
+        """
+        if self.threads > 1:
+            bands = self._band_plan()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.threads)
+            out = np.empty((field.shape[0], self.n_cells))
+            futures = [self._executor.submit(self._classify_band, field, band, out, scale) for band in bands]
+            for future in futures:
+                future.result()
+            return out
+
+        if self.operators is None:
+            gridpoints = self._gridpoints(field)
+            W, S, F, ZW, ZS, Z = flow_terms(gridpoints, self.sc, self.zwa, self.zwb, self.zsc)
+        else:
+            W, S, ZW, ZS = apply_operator(self.operators, field, self.zwa, self.zwb)
+            F = np.sqrt(S**2 + W**2)
+            Z = ZW + ZS
+        if scale is not None:
+            W, S, F, ZW, ZS, Z = _scaled_terms(W, S, ZW, ZS, scale)
+        direction = direction_codes(W, S, self.northern)
+        return lwt_codes(F, Z, direction)
+
+    def classify_array(self, field: np.ndarray, scale: float = None) -> np.ndarray:
+        """
+        Classifies raw MSLP values laid out as the grid the classifier was built with.
+
+        Args:
+            field (np.ndarray): MSLP values with shape (..., nlat, nlon) of the input grid.
+            scale (float, optional): Scale factor of packed values. The field then holds the
+                raw values (integers, or float32 with NaN at missing values, see `unpack_raw`);
+                the stencil differences are computed in float32 and only the flow and
+                vorticity terms are scaled. The offset cancels in the differences.
+
+        Returns:
+            np.ndarray: Circulation type codes with shape (..., *self.shape), NaN where unclassified.
+        """
+        field = np.asarray(field)
+        n_leading = field.ndim - len(self.grid_shape)
+        if n_leading < 0 or field.shape[n_leading:] != self.grid_shape:
+            raise ValueError(
+                f"The field must end with the grid dimensions {self.grid_shape}. Found: {field.shape}."
+            )
+        if not np.issubdtype(field.dtype, np.floating):
+            field = field.astype(np.float64 if scale is None else np.float32)
+        leading = field.shape[:n_leading]
+        field = np.ascontiguousarray(field).reshape(-1, int(np.prod(self.grid_shape)))
+        lwt = self._classify_cells(field, scale)
+
+        if self.cells is not None:
+            compact = lwt
+            lwt = np.full((compact.shape[0], int(np.prod(self.shape))), np.nan)
+            lwt[:, self.cells] = compact
+
+        return lwt.reshape(leading + self.shape)
+
+    def classify(self, field: xr.DataArray) -> xr.DataArray:
+        """
+        Computes the circulation types of one or a few MSLP fields on the classifier grid.
+
+        Args:
+            field (xr.DataArray or np.ndarray): MSLP data on the classifier grid. Other dimensions
+                (e.g. "time") are kept. Numpy arrays are passed to `classify_array`.
+
+        Returns:
+            xr.DataArray: Circulation types, as returned by `compute_cts`.
+        """
+        if not isinstance(field, xr.DataArray):
+            return self.classify_array(field)
+
+        field = field.transpose(..., self.lat_dim, self.lon_dim)
+        lwt = self.classify_array(field.values)
+
+        dims = field.dims[:-2] + ("latitude", "longitude")
+        coords = {dim: field[dim] for dim in field.dims[:-2] if dim in field.coords}
+        coords["latitude"] = self.latitude
+        coords["longitude"] = self.longitude
+        lwt = xr.DataArray(lwt, coords=coords, dims=dims)
+
+        return enhance_and_validate_dataarray(lwt)
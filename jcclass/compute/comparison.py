@@ -0,0 +1,135 @@
+import numpy as np
+import xarray as xr
+from .functions.kernels import ct_positions, count_types, type_codes
+from .functions.chunks import CHUNK_SIZE, time_chunks, spatial_coords
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+
+def confusion_counts(positions_a: np.ndarray, positions_b: np.ndarray, n_types: int,
+                     out: np.ndarray = None) -> np.ndarray:
+    """
+    Counts the pairs of types of every cell with a single `bincount`, encoding every
+    (type a, type b, cell) as one integer.
+
+    Args:
+        positions_a (np.ndarray): Type positions of the first classification, shape (n, ncells).
+        positions_b (np.ndarray): Type positions of the second classification, shape (n, ncells).
+            Pairs with a negative position on either side are ignored.
+        n_types (int): Number of types.
+        out (np.ndarray, optional): Counts of shape (n_types, n_types, ncells) to add to.
+
+    Returns:
+        np.ndarray: Confusion matrices, shape (n_types, n_types, ncells).
+    """
+    cells = positions_a.shape[1]
+    valid = (positions_a >= 0) & (positions_b >= 0)
+    index = ((positions_a * n_types + positions_b) * cells + np.arange(cells))[valid]
+    counts = np.bincount(index, minlength=n_types * n_types * cells).reshape(n_types, n_types, cells)
+    if out is None:
+        return counts
+    out += counts
+    return out
+
+
+def agreement_scores(counts_a: np.ndarray, counts_b: np.ndarray, hits: np.ndarray) -> tuple:
+    """
+    Computes the percent agreement and Cohen's kappa of every cell from the type counts
+    of both classifications over the matched pairs and the number of matching pairs.
+
+    Args:
+        counts_a (np.ndarray): Counts of every type in the first classification, shape (ntypes, ncells).
+        counts_b (np.ndarray): Counts of every type in the second classification, shape (ntypes, ncells).
+        hits (np.ndarray): Number of pairs with the same type, shape (ncells,).
+
+    Returns:
+        tuple: (agreement, kappa), shape (ncells,). NaN where there are no pairs, and kappa
+            is NaN where both classifications always have the same single type.
+    """
+    n = counts_a.sum(axis=0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        agreement = hits / n
+        expected = (counts_a * counts_b.astype(np.float64)).sum(axis=0) / (n * n)
+        kappa = (agreement - expected) / (1 - expected)
+    return agreement, kappa
+
+
+def compare_classifications(cts_a: xr.DataArray, cts_b: xr.DataArray, eleven: bool = False,
+                            confusion: bool = True, chunk_size: int = CHUNK_SIZE) -> xr.Dataset:
+    """
+    Compares two classifications of the same grid cell by cell (e.g. a GCM against ERA5,
+    or two reanalyses) over their common time steps.
+
+    Both archives are read in chunks of time steps. The pair of types of every (time, cell)
+    is encoded as one integer, and the confusion matrices of all cells are accumulated with
+    one `bincount` per chunk. Time steps unclassified in either archive are skipped.
+
+    Args:
+        cts_a (xr.DataArray): Circulation types (27 types) of the reference classification,
+            with a "time" dimension.
+        cts_b (xr.DataArray): Circulation types of the other classification, on the same grid.
+        eleven (bool, optional): Compare the 11 reduced types (default: False).
+        confusion (bool, optional): Return the confusion matrices (default: True). Without
+            them, only the type counts and matching pairs are accumulated, which takes much
+            less memory on large grids.
+        chunk_size (int, optional): Number of time steps read at once.
+
+    Returns:
+        xr.Dataset: Dataset with the variables
+            - agreement: fraction of the matched time steps with the same type.
+            - kappa: Cohen's kappa.
+            - count: number of matched time steps classified in both archives.
+            - confusion: (if `confusion`) number of time steps of every pair of types, with
+              dimensions ("ct_a", "ct_b", ...).
+
+    Example:
+        >>> from jcclass.compute import compare_classifications
+        >>> skill = compare_classifications(cts_era5, cts_gcm)
+        >>> skill.kappa.plot()
+    """
+    cts_a = cts_a.transpose("time", ...)
+    cts_b = cts_b.transpose("time", ...)
+    if cts_a.dims[1:] != cts_b.dims[1:] or cts_a.shape[1:] != cts_b.shape[1:]:
+        raise ValueError("Both classifications must have the same dimensions and grid.")
+    cts_a, cts_b = xr.align(cts_a, cts_b, join="inner", exclude=set(cts_a.dims[1:]))
+    codes = type_codes(eleven)
+    n_types = codes.size
+    cells = int(np.prod(cts_a.shape[1:], dtype=np.int64))
+
+    logger.info(f"Comparing {cts_a.sizes['time']} matched time steps.")
+    matrices = np.zeros((n_types, n_types, cells), dtype=np.int64) if confusion else None
+    counts_a = np.zeros((n_types, cells), dtype=np.int64)
+    counts_b = np.zeros((n_types, cells), dtype=np.int64)
+    hits = np.zeros(cells, dtype=np.int64)
+    for chunk_a, chunk_b in zip(time_chunks(cts_a, chunk_size), time_chunks(cts_b, chunk_size)):
+        positions_a, positions_b = ct_positions(chunk_a, eleven=eleven), ct_positions(chunk_b, eleven=eleven)
+        if confusion:
+            confusion_counts(positions_a, positions_b, n_types, out=matrices)
+            continue
+        paired = (positions_a >= 0) & (positions_b >= 0)
+        count_types(np.where(paired, positions_a, -1), n_types, out=counts_a)
+        count_types(np.where(paired, positions_b, -1), n_types, out=counts_b)
+        hits += (paired & (positions_a == positions_b)).sum(axis=0)
+
+    if confusion:
+        counts_a, counts_b = matrices.sum(axis=1), matrices.sum(axis=0)
+        hits = np.einsum("iic->c", matrices)
+    agreement, kappa = agreement_scores(counts_a, counts_b, hits)
+
+    spatial_shape = cts_a.shape[1:]
+    spatial_dims = cts_a.dims[1:]
+    variables = {
+        "agreement": (spatial_dims, agreement.reshape(spatial_shape)),
+        "kappa": (spatial_dims, kappa.reshape(spatial_shape)),
+        "count": (spatial_dims, counts_a.sum(axis=0).reshape(spatial_shape)),
+    }
+    coords = spatial_coords(cts_a)
+    if confusion:
+        variables["confusion"] = (("ct_a", "ct_b") + spatial_dims, matrices.reshape((n_types, n_types) + spatial_shape))
+        coords.update({"ct_a": codes, "ct_b": codes})
+    comparison = xr.Dataset(variables, coords=coords)
+    comparison["agreement"].attrs["long_name"] = "Fraction of time steps with the same type"
+    comparison["kappa"].attrs["long_name"] = "Cohen's kappa"
+    return comparison
@@ -0,0 +1,108 @@
+import numpy as np
+import xarray as xr
+from .functions.data_preparation import read_mslp_file
+from .functions.kernels import accumulate_by_type, ct_positions, type_codes
+from .functions.chunks import CHUNK_SIZE, time_chunks
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+
+def _as_fields(fields) -> dict:
+    """Returns the fields to composite by name."""
+    if isinstance(fields, xr.Dataset):
+        return dict(fields.data_vars)
+    if isinstance(fields, xr.DataArray):
+        return {fields.name or "field": fields}
+    if isinstance(fields, dict):
+        return dict(fields)
+    raise TypeError("fields must be an xarray.DataArray, an xarray.Dataset or a dict of DataArrays.")
+
+
+def ct_composites(cts: xr.DataArray, fields, point: tuple = None, weights: xr.DataArray = None,
+                  eleven: bool = False, chunk_size: int = CHUNK_SIZE) -> xr.Dataset:
+    """
+    Composites one or more fields by circulation type in a single pass over the archive.
+
+    The circulation types and fields are read in chunks of time steps. For every chunk the
+    weights, weighted sums and weighted sums of squares of every (type, cell) are added with
+    one `bincount` scatter-add each, instead of one masked mean per type. Values are shifted
+    by the mean of the first chunk before squaring, to keep the variances accurate.
+
+    Args:
+        cts (xr.DataArray): Circulation types (27 types) with a "time" dimension.
+        fields (xr.DataArray, xr.Dataset or dict): Fields to composite (e.g. precipitation,
+            temperature), with a "time" dimension. Only the time steps shared with `cts` are used.
+            Without `point`, they must be on the grid of `cts`.
+        point (tuple, optional): (latitude, longitude) of a reference point. The fields of every
+            cell are then composited by the circulation type at the nearest cell of `cts` to this
+            point, and can be on any grid.
+        weights (xr.DataArray, optional): Weight of every time step (e.g. days per record).
+        eleven (bool, optional): Composite by the 11 reduced types (default: False).
+        chunk_size (int, optional): Number of time steps read at once.
+
+    Returns:
+        xr.Dataset: For every field `<name>`, with a "ct" dimension:
+            - <name>_mean: weighted mean per type.
+            - <name>_anomaly: mean per type minus the mean over all classified time steps.
+            - <name>_std: weighted (population) standard deviation per type.
+            - <name>_count: sum of the weights (number of time steps) per type.
+
+    Example:
+        >>> from jcclass.compute import ct_composites
+        >>> composites = ct_composites(cts, xr.Dataset({"tp": tp, "t2m": t2m}))
+        >>> composites.tp_anomaly.sel(ct=20).plot()
+    """
+    fields = _as_fields(fields)
+    if point is not None:
+        cts = read_mslp_file(cts).sel(latitude=point[0], longitude=point[1], method="nearest")
+    codes = type_codes(eleven)
+
+    composites, coords = {}, {}
+    for name, field in fields.items():
+        if "time" not in field.dims:
+            raise ValueError(f"The field '{name}' must have a 'time' dimension.")
+        field = field.transpose("time", ...)
+        exclude = set(field.dims) | set(cts.dims)
+        exclude.discard("time")
+        series, field = xr.align(cts.transpose("time", ...), field, join="inner", exclude=exclude)
+        if point is None and series.shape[1:] != field.shape[1:]:
+            raise ValueError(f"The field '{name}' must be on the grid of the circulation types, "
+                             f"or a reference point must be given.")
+        step_weights = None if weights is None else weights.sel(time=field.time).values
+
+        logger.info(f"Compositing '{name}' over {field.sizes['time']} time steps.")
+        sums, shift = None, None
+        start = 0
+        for ct_chunk, values in zip(time_chunks(series, chunk_size), time_chunks(field, chunk_size)):
+            if shift is None:
+                valid = np.isfinite(values)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    shift = np.nan_to_num(np.where(valid, values, 0).sum(axis=0) / valid.sum(axis=0))
+            w = None if step_weights is None else step_weights[start:start + values.shape[0]]
+            positions = ct_positions(ct_chunk.reshape(values.shape[0], -1), eleven=eleven)
+            sums = accumulate_by_type(positions, values - shift, codes.size, weights=w, out=sums)
+            start += values.shape[0]
+
+        if sums is None:
+            sums = np.zeros((3, codes.size, int(np.prod(field.shape[1:]))))
+            shift = 0
+        count, total, squares = sums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            overall = total.sum(axis=0) / count.sum(axis=0)
+            std = np.sqrt(np.maximum(squares / count - mean**2, 0))
+
+        dims = ("ct",) + field.dims[1:]
+        shape = (codes.size,) + field.shape[1:]
+        composites[f"{name}_mean"] = (dims, (mean + shift).reshape(shape))
+        composites[f"{name}_anomaly"] = (dims, (mean - overall).reshape(shape))
+        composites[f"{name}_std"] = (dims, std.reshape(shape))
+        composites[f"{name}_count"] = (dims, count.reshape(shape))
+        coords.update({dim: field[dim] for dim in field.dims[1:] if dim in field.coords})
+
+    result = xr.Dataset(composites, coords={"ct": codes, **coords})
+    if point is not None:
+        result.attrs["reference_point"] = f"{float(cts.latitude)}, {float(cts.longitude)}"
+    return result
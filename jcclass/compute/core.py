@@ -1,8 +1,18 @@
+from typing import Union
+
 import xarray as xr
 from .functions.main import jc_classification
+from .functions.data_preparation import read_mslp_file
+from .classifier import JCClassifier
+from .pipeline import MemoryPlan, classify_in_blocks, target_template
+from .native import NativeGridClassifier, is_native_grid, classify_native
+from .functions.packing import packing_of
 
 
-def compute_cts(data_mslp: xr.DataArray) -> xr.DataArray:
+def compute_cts(data_mslp: xr.DataArray, stencil: str = "gather", mask=None,
+                resample=None, block_size: int = None, target_grid=None, max_memory=None,
+                dry_run: bool = False, tile_shape: tuple = None, workers: int = 1,
+                prefetch: int = 0, out=None, stats=None) -> Union[xr.DataArray, MemoryPlan]:
     """
     Computes the Jenkinson and Collison Circulation Types (CTs) based on
     Mean Sea Level Pressure (MSLP) data.
@@ -10,7 +20,53 @@ def compute_cts(data_mslp: xr.DataArray) -> xr.DataArray:
     Args:
         data_mslp (xr.DataArray): Input MSLP data as an xarray DataArray.
             - Dimensions: Typically includes "time", "latitude", and "longitude".
+              Curvilinear and unstructured grids, with latitude and longitude coordinates
+              on other dimensions (e.g. ("y", "x") or "ncells"), are classified on their
+              native grid (see `NativeGridClassifier`).
             - Units: Should be in Pascals (Pa) or Hectopascals (hPa).
+            - Packed integers (e.g. int16 ERA5 opened with `mask_and_scale=False`) are
+              classified from their raw values without decoding; the scale factor is only
+              applied to the flow and vorticity terms (see `classify_in_blocks`).
+        stencil (str, optional): How the 16 grid points are obtained (see `JCClassifier`).
+            - "gather" (default): nearest grid nodes.
+            - "nearest": nearest grid nodes, applied as cached sparse operators.
+            - "bilinear": bilinear interpolation of the grid points, applied as cached
+              sparse operators. Recommended for irregular and Gaussian grids.
+        mask (xr.DataArray or np.ndarray or str, optional): Cells to classify (True) or skip
+            (False), e.g. a land-sea mask. "equator" skips the band |latitude| < 10°.
+            Skipped cells are not computed and are NaN in the output (see `JCClassifier`).
+        resample (int or str, optional): Temporal reduction applied to each block of input
+            time steps as it is read, before classification:
+            - int: keep only the fields at this hour, e.g. 12 for 12 UTC.
+            - str: mean over windows of this fixed frequency, e.g. "1D" for daily means or
+              "6h". Calendar frequencies such as "MS" are not supported.
+        block_size (int, optional): Maximum number of input time steps read and classified
+            at once. Lazily loaded inputs are then never held in memory in full.
+        target_grid (xr.DataArray or xr.Dataset, optional): Common grid (latitude and longitude
+            coordinates) to interpolate the input to before classification, e.g. to compare
+            models cell by cell. Bilinear weights are computed once per pair of grids and cached
+            on disk (JCCLASS_CACHE_DIR, default ~/.cache/jcclass). `mask` refers to this grid.
+        max_memory (int or str, optional): Memory budget, e.g. "4GB". The working set per time
+            step is estimated for the grid and data type, and the input is classified in the
+            largest time blocks whose estimated peak memory (including the output) fits in it.
+        dry_run (bool, optional): Do not classify; return the `MemoryPlan` with the chosen
+            block size and the estimated peak memory instead (default: False).
+        tile_shape (tuple, optional): Split the grid into tiles of at most (latitude, longitude)
+            classified cells, for very high-resolution grids. Every tile reads only the input
+            its stencils need (a 10° latitude / 15° longitude halo, wrapping around on global
+            grids), and the result is identical to an untiled run. Not available with `target_grid`.
+        workers (int, optional): Number of threads (default: 1). With `tile_shape`, the number
+            of tiles classified at once; otherwise every field is split into latitude bands
+            classified in parallel (see `JCClassifier`), also on native grids.
+        prefetch (int, optional): Number of time blocks read and decoded ahead on a background
+            thread while the current block is classified, e.g. 2 for lazily opened NetCDF
+            archives. Read, classify and write throughput is logged (default: 0, no read-ahead).
+        out (callable, optional): Writes the circulation types block by block as they are
+            classified, e.g. straight to a NetCDF file, instead of returning them in memory
+            (see `classify_in_blocks`). The returned DataArray then only holds the coordinates
+            and attributes, with NaN values.
+        stats (PipelineStats, optional): Filled in with the read, classify and write throughput
+            of the `prefetch` pipeline (see `jcclass.compute.streaming.PipelineStats`).
 
     Returns:
         xr.DataArray: Computed circulation types as an xarray DataArray.
@@ -18,6 +74,7 @@ def compute_cts(data_mslp: xr.DataArray) -> xr.DataArray:
             - Values: Integer codes representing circulation types.
                 - Codes range from 0 to 28, with -1 indicating unclassified flows.
             - Attributes: Includes metadata describing the circulation type calculation.
+        With `dry_run=True`, a `MemoryPlan` instead.
 
     Notes:
         - The classification is derived using a gridded version of the Lamb Weather Types.
@@ -30,7 +87,30 @@ def compute_cts(data_mslp: xr.DataArray) -> xr.DataArray:
         >>> data_mslp = xr.open_dataset("mslp_data.nc").msl
         >>> cts = compute_cts(data_mslp)
         >>> print(cts)
+        >>> print(compute_cts(data_mslp, max_memory="4GB", dry_run=True))
     """
+    if workers < 1:
+        raise ValueError("workers must be a positive integer.")
+    if is_native_grid(data_mslp):
+        unsupported = (target_grid, max_memory, tile_shape, out, stats)
+        if stencil != "gather" or prefetch or dry_run or any(option is not None for option in unsupported):
+            raise ValueError("Native grids only support the mask, resample, block_size and workers options.")
+        with NativeGridClassifier(data_mslp, mask=mask, threads=workers) as classifier:
+            return classify_native(data_mslp, classifier, block_size=block_size, resample=resample)
+
+    options = (mask, resample, block_size, target_grid, max_memory, tile_shape, out)
+    packed = packing_of(data_mslp) is not None
+    if (stencil != "gather" or dry_run or prefetch or packed or workers > 1
+            or any(option is not None for option in options)):
+        data_mslp = read_mslp_file(data_mslp)
+        grid = data_mslp if target_grid is None else target_template(target_grid)
+        # Tiles are classified in parallel by the pipeline, whole fields in bands by the classifier
+        threads = workers if tile_shape is None else 1
+        with JCClassifier(grid, stencil=stencil, mask=mask, threads=threads) as classifier:
+            return classify_in_blocks(data_mslp, classifier, block_size=block_size, resample=resample,
+                                      target_grid=target_grid, max_memory=max_memory, dry_run=dry_run,
+                                      tile_shape=tile_shape, workers=workers, prefetch=prefetch, out=out,
+                                      stats=stats)
     ds = jc_classification(data_mslp)
     return ds
 
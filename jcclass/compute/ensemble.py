@@ -0,0 +1,88 @@
+import numpy as np
+import xarray as xr
+from .classifier import JCClassifier
+from .functions.kernels import CT_CODES, ct_positions, count_types
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+
+def ensemble_probabilities(data_mslp: xr.DataArray,
+                           member_dim: str = "number",
+                           chunk_size: int = 1,
+                           classifier: JCClassifier = None) -> xr.Dataset:
+    """
+    Computes the probability of every circulation type across the members of an ensemble.
+
+    Members are classified `chunk_size` at a time and only the per-type counts are kept,
+    in a (time, type, latitude, longitude) buffer, so memory does not depend on the
+    number of members. Lazily loaded inputs are read one chunk of members at a time.
+
+    Args:
+        data_mslp (xr.DataArray): Ensemble MSLP data with a member dimension, plus "time",
+            latitude and longitude dimensions.
+        member_dim (str, optional): Name of the ensemble member dimension (default: "number").
+        chunk_size (int, optional): Number of members classified at once (default: 1).
+        classifier (JCClassifier, optional): Classifier built for the grid of `data_mslp`.
+            Built from the first member if not given.
+
+    Returns:
+        xr.Dataset: Dataset with the variables
+            - probability: fraction of members in each circulation type ("ct" dimension).
+            - mode: most frequent circulation type (ties resolved by the order of `ct`).
+            - entropy: Shannon entropy (nats) of the type probabilities, 0 when all
+              members agree.
+
+    Example:
+        >>> from jcclass.compute import ensemble_probabilities
+        >>> ens = xr.open_dataset("ens_mslp.nc").msl
+        >>> products = ensemble_probabilities(ens, chunk_size=10)
+        >>> products.probability.sel(ct=20)  # probability of cyclonic type
+    """
+    if member_dim not in data_mslp.dims:
+        raise ValueError(f"The DataArray must have the member dimension '{member_dim}'.")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer.")
+
+    if classifier is None:
+        classifier = JCClassifier(data_mslp.isel({member_dim: 0}))
+
+    data_mslp = data_mslp.transpose(member_dim, ..., classifier.lat_dim, classifier.lon_dim)
+    n_members = data_mslp.sizes[member_dim]
+    other_dims = data_mslp.dims[1:-2]
+    counts = np.zeros((len(CT_CODES),) + data_mslp.shape[1:-2] + classifier.shape, dtype=np.int32)
+
+    logger.info(f"Classifying {n_members} ensemble members in chunks of {chunk_size}.")
+    for start in range(0, n_members, chunk_size):
+        members = data_mslp.isel({member_dim: slice(start, start + chunk_size)}).values
+        lwt = classifier.classify_array(members)
+        count_types(ct_positions(lwt), len(CT_CODES), out=counts)
+
+    probability = counts / n_members
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.sum(np.where(probability > 0, probability * np.log(probability), 0), axis=0)
+    mode = CT_CODES[np.argmax(counts, axis=0)].astype(float)
+    mode[counts.sum(axis=0) == 0] = np.nan
+
+    dims = other_dims + ("latitude", "longitude")
+    coords = {dim: data_mslp[dim] for dim in other_dims if dim in data_mslp.coords}
+    coords["latitude"] = classifier.latitude
+    coords["longitude"] = classifier.longitude
+
+    products = xr.Dataset(
+        {
+            "probability": (("ct",) + dims, probability),
+            "mode": (dims, mode),
+            "entropy": (dims, entropy),
+        },
+        coords={"ct": CT_CODES, **coords},
+    )
+    products = products.transpose(*dims[:-2], "ct", "latitude", "longitude")
+    products["probability"].attrs["long_name"] = "Probability of each circulation type"
+    products["mode"].attrs["long_name"] = "Modal circulation type"
+    products["entropy"].attrs["long_name"] = "Entropy of the circulation type probabilities"
+    products["entropy"].attrs["units"] = "nats"
+    products.attrs["members"] = n_members
+
+    return products
@@ -0,0 +1,244 @@
+import numpy as np
+import xarray as xr
+from .core import compute_cts
+from .classifier import JCClassifier
+from .functions.computation import compute_direction, assign_lwt
+from .functions.kernels import DIRECTION_LABELS, direction_from_degrees, lwt_codes
+from .functions.operator import apply_operator
+from .functions.reference import reference_classify, reference_direction, reference_lwt, \
+    reference_flows, DIRECTION_OFFSETS
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+DTYPES = (np.float64, np.float32)
+
+# Packing of the "compute_cts[packed]" engine: `random_mslp` values are multiples of the
+# scale factor, so the int16 values hold them exactly
+PACKING = {"scale_factor": 0.5, "add_offset": 101325.0}
+
+# Sector edges of the direction rules, in degrees
+_EDGES = np.array([0, 22, 67, 112, 157, 202, 247, 292, 337, 360])
+
+
+def _assert_equal(name: str, result: np.ndarray, expected: np.ndarray, inputs: dict) -> int:
+    """Raises an AssertionError describing the first mismatches, returns the number of values compared."""
+    result, expected = np.asarray(result, dtype=float), np.asarray(expected, dtype=float)
+    mismatch = ~((result == expected) | (np.isnan(result) & np.isnan(expected)))
+    if mismatch.any():
+        where = np.flatnonzero(mismatch.ravel())[:5]
+        details = "; ".join(
+            f"{ {key: value.ravel()[i] for key, value in inputs.items()} } -> {result.ravel()[i]} "
+            f"(reference {expected.ravel()[i]})" for i in where
+        )
+        raise AssertionError(f"{name}: {int(mismatch.sum())} of {mismatch.size} values differ: {details}")
+    return mismatch.size
+
+
+def direction_cases(rng: np.random.Generator, n_random: int, dtype) -> tuple:
+    """
+    Flow directions exactly on, and one ulp around, every sector edge, plus random directions
+    and NaN, each in both hemispheres and on the equator.
+    """
+    edges = _EDGES.astype(dtype)
+    deg = np.concatenate([
+        edges,
+        np.nextafter(edges, dtype(-np.inf)),
+        np.nextafter(edges, dtype(np.inf)),
+        rng.uniform(0, 360, n_random).astype(dtype),
+        np.array([np.nan], dtype=dtype),
+    ])
+    deg = deg[(deg >= 0) | np.isnan(deg)]
+    latitude = np.array([-30.0, 0.0, 30.0])
+    return np.repeat(deg, latitude.size), np.tile(latitude, deg.size)
+
+
+def lwt_cases(rng: np.random.Generator, n_random: int, dtype) -> tuple:
+    """
+    Flow and vorticity pairs on the rule boundaries (|Z| == F, |Z| == 2F, F and |Z| around 6),
+    plus random pairs and NaN, combined with every direction and an undefined one.
+    """
+    F = np.array([0, 3, 5.5, 6, 7, 12, 30], dtype=dtype)
+    factors = np.array([0, 0.5, 1, 1.5, 2, 2.5], dtype=dtype)
+    Z = (F[:, None] * factors[None, :]).ravel()
+    F = np.repeat(F, factors.size)
+    F = np.concatenate([F, F, F, F, np.nextafter(F, dtype(np.inf))])
+    Z = np.concatenate([Z, -Z, np.nextafter(Z, dtype(np.inf)), np.nextafter(Z, dtype(-np.inf)), Z])
+    low = np.array([5.9, 6, 6.1], dtype=dtype)
+    F = np.concatenate([F, np.repeat(low, 6), rng.uniform(0, 40, n_random).astype(dtype), [np.nan, 10]])
+    Z = np.concatenate([Z, np.tile(np.concatenate([low, -low]), 3),
+                        rng.uniform(-80, 80, n_random).astype(dtype), [5, np.nan]]).astype(dtype)
+    F = F.astype(dtype)
+
+    directions = [None] + list(DIRECTION_OFFSETS)
+    return (np.repeat(F, len(directions)), np.repeat(Z, len(directions)),
+            np.tile(np.array(directions, dtype=object), F.size))
+
+
+def check_kernels(n_random: int = 2000, seed: int = 0) -> dict:
+    """
+    Compares the direction and circulation type rules of the xarray engine (`compute_direction`,
+    `assign_lwt`) and the array engine (`direction_from_degrees`, `lwt_codes`) with the scalar
+    reference, on boundary and random cases in float32 and float64.
+
+    Returns:
+        dict: Number of values compared per check.
+
+    Raises:
+        AssertionError: If any engine differs from the reference.
+    """
+    rng = np.random.default_rng(seed)
+    codes = {label: code for code, label in DIRECTION_LABELS.items()}
+    results = {}
+
+    for dtype in DTYPES:
+        name = np.dtype(dtype).name
+        deg, latitude = direction_cases(rng, n_random, dtype)
+        expected = [reference_direction(d, lat) for d, lat in zip(deg, latitude)]
+        expected_codes = np.array([codes.get(label, 0) for label in expected])
+        labels = compute_direction(xr.DataArray(deg, dims="case"), xr.DataArray(latitude, dims="case")).values
+        labels = np.array([codes.get(label, 0) if isinstance(label, str) else 0 for label in labels])
+        inputs = {"deg": deg, "latitude": latitude}
+        results[f"compute_direction[{name}]"] = _assert_equal(f"compute_direction[{name}]", labels, expected_codes, inputs)
+        results[f"direction_from_degrees[{name}]"] = _assert_equal(
+            f"direction_from_degrees[{name}]", direction_from_degrees(deg, latitude >= 0), expected_codes, inputs)
+
+        F, Z, direction = lwt_cases(rng, n_random, dtype)
+        expected = [reference_lwt(f, z, d) for f, z, d in zip(F, Z, direction)]
+        expected = np.array([np.nan if code is None else code for code in expected])
+        inputs = {"F": F, "Z": Z, "direction": direction}
+        labels = xr.DataArray(np.where(direction == None, np.nan, direction), dims="case")  # noqa: E711
+        lwt = assign_lwt(xr.DataArray(F, dims="case"), xr.DataArray(Z, dims="case"), labels).values
+        results[f"assign_lwt[{name}]"] = _assert_equal(f"assign_lwt[{name}]", lwt, expected, inputs)
+        direction_code = np.array([codes.get(d, 0) for d in direction], dtype=np.int8)
+        results[f"lwt_codes[{name}]"] = _assert_equal(f"lwt_codes[{name}]", lwt_codes(F, Z, direction_code), expected, inputs)
+
+    return results
+
+
+def random_mslp(rng: np.random.Generator, n_time: int = 2, dtype=np.float64) -> xr.DataArray:
+    """
+    Random smooth MSLP fields with noise on a small regional grid spanning both hemispheres,
+    rounded to multiples of the `PACKING` scale factor.
+    """
+    lat = np.arange(-40, 42.5, 5.0)
+    lon = np.arange(-40, 42.5, 5.0)
+    y, x = np.deg2rad(lat)[:, None], np.deg2rad(lon)[None, :]
+    fields = []
+    for _ in range(n_time):
+        a, b, c = rng.uniform(0.5, 4, 3)
+        phase = rng.uniform(0, 2 * np.pi, 2)
+        smooth = 1500 * np.sin(a * x + phase[0]) * np.cos(b * y + phase[1]) + 800 * np.cos(c * (x + y))
+        field = 101325 + smooth + rng.normal(0, 150, smooth.shape)
+        fields.append(np.round(field / PACKING["scale_factor"]) * PACKING["scale_factor"])
+    return xr.DataArray(
+        np.array(fields, dtype=dtype),
+        dims=["time", "latitude", "longitude"],
+        coords={"time": np.arange(n_time), "latitude": lat, "longitude": lon},
+        name="msl",
+    )
+
+
+def pack(data: xr.DataArray) -> xr.DataArray:
+    """Packs MSLP as int16 with the `PACKING` scale factor and offset, as stored in ERA5 files."""
+    raw = np.round((data.values - PACKING["add_offset"]) / PACKING["scale_factor"]).astype(np.int16)
+    packed = data.copy(data=raw)
+    packed.attrs.update(PACKING)
+    return packed
+
+
+def _classify_threaded(data: xr.DataArray) -> xr.DataArray:
+    with JCClassifier(data, threads=2) as classifier:
+        return classifier.classify(data)
+
+
+def engines() -> dict:
+    """
+    Returns the classification engines checked by `check_engines`, by name.
+    """
+    available = {
+        "compute_cts": compute_cts,
+        "compute_cts[blocks]": lambda data: compute_cts(data, block_size=1),
+        "compute_cts[packed]": lambda data: compute_cts(pack(data)),
+        "compute_cts[tiles]": lambda data: compute_cts(data, tile_shape=(4, 4), workers=2),
+        "compute_cts[threads]": lambda data: compute_cts(data, workers=2),
+        "JCClassifier": lambda data: JCClassifier(data).classify(data),
+        "JCClassifier[threads]": _classify_threaded,
+    }
+    try:
+        import dask  # noqa: F401
+        available["compute_cts[dask]"] = lambda data: compute_cts(data.chunk({"time": 1}))
+    except ImportError:
+        pass
+    return available
+
+
+def check_engines(n_time: int = 4, seed: int = 0) -> dict:
+    """
+    Compares every classification engine with the scalar reference on random fields, in
+    float32 and float64, and the flow terms of the sparse stencil operators with the
+    reference terms (to a relative tolerance, since they sum the grid points in another order).
+
+    Returns:
+        dict: Number of values compared per check.
+
+    Raises:
+        AssertionError: If any engine differs from the reference.
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    for dtype in DTYPES:
+        name = np.dtype(dtype).name
+        data = random_mslp(rng, n_time, dtype)
+        classifier = JCClassifier(data)
+        field = data.values.reshape(n_time, -1)
+        latitude = np.repeat(classifier.latitude.values, classifier.longitude.size)
+        args = (classifier.table, latitude, classifier.sc, classifier.zwa, classifier.zwb, classifier.zsc)
+        expected = reference_classify(field, *args).reshape((n_time,) + classifier.shape)
+
+        for engine, classify in engines().items():
+            result = np.asarray(classify(data))
+            results[f"{engine}[{name}]"] = _assert_equal(f"{engine}[{name}]", result, expected, {})
+
+        sparse = JCClassifier(data, stencil="nearest")
+        field = field.astype(np.float64)
+        terms = apply_operator(sparse.operators, field, sparse.zwa, sparse.zwb)
+        reference = np.array([[reference_flows([field[t, k] for k in classifier.table[:, cell]],
+                                               classifier.sc[cell], classifier.zwa[cell],
+                                               classifier.zwb[cell], classifier.zsc[cell])
+                               for cell in range(classifier.table.shape[1])] for t in range(n_time)])
+        for term, values, index in zip(("W", "S", "ZW", "ZS"), terms, (0, 1, 3, 4)):
+            # Central points at ±5° have infinite zonal weights in both engines
+            np.testing.assert_allclose(values, reference[..., index], rtol=1e-9, atol=1e-6,
+                                       err_msg=f"sparse stencil {term}[{name}]")
+            results[f"sparse {term}[{name}]"] = int(values.size)
+
+    return results
+
+
+def check_equivalence(n_random: int = 2000, n_time: int = 4, seed: int = 0) -> dict:
+    """
+    Randomized equivalence harness: checks the rule kernels and every classification engine
+    against the scalar reference implementation of the Jenkinson and Collison rules.
+
+    Args:
+        n_random (int, optional): Random cases per rule check, on top of the boundary cases.
+        n_time (int, optional): Random fields per engine check.
+        seed (int, optional): Seed of the random cases.
+
+    Returns:
+        dict: Number of values compared per check.
+
+    Raises:
+        AssertionError: If any engine differs from the reference.
+
+    Example:
+        >>> from jcclass.compute.equivalence import check_equivalence
+        >>> check_equivalence()
+    """
+    results = check_kernels(n_random, seed)
+    results.update(check_engines(n_time, seed))
+    logger.info(f"Equivalence checks passed: {len(results)} checks, {sum(results.values())} values.")
+    return results
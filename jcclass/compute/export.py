@@ -0,0 +1,171 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+from .classifier import LAT_NAMES, LON_NAMES, find_coord
+from .functions.kernels import ct_positions, type_codes, type_names
+from .functions.spatial_index import nearest_points
+from .functions.chunks import CHUNK_SIZE, time_chunks
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Exporting to Parquet requires pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _select_cells(cts: xr.DataArray, points: list = None, region: tuple = None) -> xr.DataArray:
+    """
+    Returns the circulation types at the nearest cells to `points`, along a "point"
+    dimension, or within `region` = (lat_south, lat_north, lon_west, lon_east). On native
+    grids the nearest cells are found with a KD-tree (see `nearest_points`).
+    """
+    lat_name, lon_name = find_coord(cts, LAT_NAMES), find_coord(cts, LON_NAMES)
+    if points is not None:
+        lats, lons = np.asarray(points, dtype=float).T
+        if lat_name in cts.dims and lon_name in cts.dims:
+            return cts.sel({lat_name: xr.DataArray(lats, dims="point"), lon_name: xr.DataArray(lons, dims="point")},
+                           method="nearest")
+        latitude, longitude = xr.broadcast(cts[lat_name], cts[lon_name])
+        spatial_dims = latitude.dims
+        cells = nearest_points(latitude.values, longitude.values, lats, lons)
+        indices = np.unravel_index(cells, latitude.shape)
+        return cts.isel({dim: xr.DataArray(index, dims="point") for dim, index in zip(spatial_dims, indices)})
+    if region is not None:
+        lat_south, lat_north, lon_west, lon_east = region
+        latitude, longitude = cts[lat_name], cts[lon_name]
+        inside = ((latitude >= lat_south) & (latitude <= lat_north)
+                  & (longitude >= lon_west) & (longitude <= lon_east))
+        if latitude.dims == (lat_name,) and longitude.dims == (lon_name,):
+            return cts.isel({lat_name: inside.any(lon_name).values, lon_name: inside.any(lat_name).values})
+        return cts.where(inside)
+    return cts
+
+
+def _cell_coordinates(cts: xr.DataArray) -> tuple:
+    """Returns the latitude and longitude of every cell, in the flattened order of the grid."""
+    spatial_dims = cts.dims[1:]
+    latitude, longitude = xr.broadcast(cts[find_coord(cts, LAT_NAMES)], cts[find_coord(cts, LON_NAMES)])
+    return (latitude.transpose(*spatial_dims).values.ravel().astype(np.float32),
+            longitude.transpose(*spatial_dims).values.ravel().astype(np.float32))
+
+
+def _datetimes(time: xr.DataArray) -> np.ndarray:
+    """Returns the time coordinate as datetime64[ns], converting cftime dates if needed."""
+    if np.issubdtype(time.dtype, np.datetime64):
+        return time.values.astype("datetime64[ns]")
+    try:
+        return time.to_index().to_datetimeindex().values
+    except (AttributeError, ValueError) as e:
+        raise ValueError("The time coordinate must be convertible to datetime64 for the export.") from e
+
+
+def export_parquet(cts: xr.DataArray, path, points: list = None, region: tuple = None,
+                   eleven: bool = False, chunk_size: int = CHUNK_SIZE, compression: str = "snappy",
+                   overwrite: bool = False) -> list:
+    """
+    Writes circulation types as a long-format Parquet dataset, partitioned by year.
+
+    Every row is one classified (time, cell) with the columns time, latitude, longitude,
+    code (int8) and type (the type abbreviation, dictionary-encoded). Unclassified cells are
+    not written. The archive is streamed in chunks of time steps: each chunk becomes Arrow
+    buffers and one row group in the file of its year, so no DataFrame of the whole archive
+    is built. The files are laid out as `path/year=YYYY/part-0.parquet` (hive partitioning),
+    and can be read with e.g. `pandas.read_parquet(path)`.
+
+    Requires the optional dependency pyarrow.
+
+    Args:
+        cts (xr.DataArray): Circulation types (27 types) with a "time" dimension, on a regular
+            or native grid.
+        path (str or Path): Output directory.
+        points (list, optional): (latitude, longitude) pairs; only the nearest cells are written.
+        region (tuple, optional): (lat_south, lat_north, lon_west, lon_east); only the cells
+            within are written.
+        eleven (bool, optional): Write the 11 reduced types (default: False).
+        chunk_size (int, optional): Number of time steps read (and row groups written) at once.
+        compression (str, optional): Parquet compression codec (default: "snappy").
+        overwrite (bool, optional): Replace the partitions of an existing export (default: False).
+            Only the `year=*` directories are removed; a non-empty directory holding anything
+            else is never overwritten.
+
+    Returns:
+        list: Paths of the written files.
+
+    Raises:
+        FileExistsError: If `path` is not empty and `overwrite` is False, or if it holds
+            anything other than `year=*` partitions.
+
+    Example:
+        >>> from jcclass.compute import export_parquet
+        >>> export_parquet(cts, "cts_parquet", region=(35, 70, -15, 30))
+    """
+    pa = _import_pyarrow()
+    if "time" not in cts.dims:
+        raise ValueError("The circulation types must have a 'time' dimension.")
+    path = Path(path)
+    if path.exists() and any(path.iterdir()):
+        if not overwrite:
+            raise FileExistsError(f"{path} already exists. Use overwrite=True to replace it.")
+        others = [entry.name for entry in path.iterdir() if not (entry.is_dir() and entry.name.startswith("year="))]
+        if others:
+            raise FileExistsError(f"{path} does not look like a Parquet export (found {', '.join(sorted(others))}); "
+                                  "not overwriting it.")
+        for partition in path.glob("year=*"):
+            shutil.rmtree(partition)
+
+    cts = _select_cells(cts, points, region).transpose("time", ...)
+    latitude, longitude = _cell_coordinates(cts)
+    times = _datetimes(cts.time)
+    years = times.astype("datetime64[Y]").astype(np.int64) + 1970
+    codes = type_codes(eleven).astype(np.int8)
+    names = pa.array(type_names(eleven))
+    schema = pa.schema([
+        ("time", pa.timestamp("ns")),
+        ("latitude", pa.float32()),
+        ("longitude", pa.float32()),
+        ("code", pa.int8()),
+        ("type", pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+    logger.info(f"Exporting {cts.sizes['time']} time steps of {latitude.size} cells to {path}.")
+    writers, files = {}, []
+    start = 0
+    try:
+        for chunk in time_chunks(cts, chunk_size):
+            positions = ct_positions(chunk, eleven=eleven)
+            step, cell = np.nonzero(positions >= 0)
+            position = positions[step, cell].astype(np.int8)
+            step += start
+            start += chunk.shape[0]
+            for year in np.unique(years[step]):
+                rows = years[step] == year
+                table = pa.Table.from_arrays([
+                    pa.array(times[step[rows]]),
+                    pa.array(latitude[cell[rows]]),
+                    pa.array(longitude[cell[rows]]),
+                    pa.array(codes[position[rows]]),
+                    pa.DictionaryArray.from_arrays(pa.array(position[rows]), names),
+                ], schema=schema)
+                if year not in writers:
+                    # Times are usually sorted: the files of earlier years are complete
+                    for previous in list(writers):
+                        writers.pop(previous).close()
+                    directory = path / f"year={year}"
+                    directory.mkdir(parents=True, exist_ok=True)
+                    file = directory / f"part-{len(list(directory.glob('part-*.parquet')))}.parquet"
+                    writers[year] = pa.parquet.ParquetWriter(file, schema, compression=compression)
+                    files.append(file)
+                writers[year].write_table(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return files
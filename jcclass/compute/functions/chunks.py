@@ -0,0 +1,29 @@
+import xarray as xr
+
+# Number of time steps read at once from circulation type archives
+CHUNK_SIZE = 3650
+
+
+def time_chunks(cts: xr.DataArray, size: int = CHUNK_SIZE):
+    """
+    Yields the values of an archive along its first dimension ("time") as numpy arrays of
+    shape (n, ncells), reading at most `size` time steps at a time.
+
+    Args:
+        cts (xr.DataArray): Archive with "time" as its first dimension.
+        size (int, optional): Maximum number of time steps per chunk.
+
+    Yields:
+        np.ndarray: The values of the next chunk, flattened over the other dimensions.
+    """
+    for start in range(0, cts.sizes["time"], size):
+        values = cts.isel(time=slice(start, start + size)).values
+        yield values.reshape(values.shape[0], -1)
+
+
+def spatial_coords(cts: xr.DataArray) -> dict:
+    """
+    Returns the coordinates of the dimensions after the first one (the grid of an archive
+    with "time" first), to build results on the same grid.
+    """
+    return {dim: cts[dim] for dim in cts.dims[1:] if dim in cts.coords}
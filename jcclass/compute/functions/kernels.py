@@ -0,0 +1,240 @@
+import numpy as np
+
+
+# Upper bounds (degrees) of the eight direction sectors, starting with N (337-22)
+_SECTOR_BOUNDS = np.array([22, 67, 112, 157, 202, 247, 292, 337])
+
+# Direction codes per sector: 1=NE, 2=E, 3=SE, 4=S, 5=SW, 6=W, 7=NW, 8=N, 0=undefined
+_NH_SECTOR_CODES = np.array([8, 1, 2, 3, 4, 5, 6, 7, 8], dtype=np.int8)
+_SH_SECTOR_CODES = np.array([4, 5, 6, 7, 8, 1, 2, 3, 4], dtype=np.int8)
+
+DIRECTION_LABELS = {1: "NE", 2: "E", 3: "SE", 4: "S", 5: "SW", 6: "W", 7: "NW", 8: "N"}
+
+
+def gather_gridpoints(field: np.ndarray, table: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Gathers the 16 grid points of every central point from a flattened MSLP field.
+
+    Args:
+        field (np.ndarray): MSLP values, shape (n, npoints).
+        table (np.ndarray): Flat stencil indices, shape (16, ncells).
+        out (np.ndarray, optional): Buffer of shape (16, n, ncells) to write into.
+
+    Returns:
+        np.ndarray: Grid point values p1 to p16, shape (16, n, ncells).
+    """
+    if out is None:
+        out = np.empty((table.shape[0], field.shape[0], table.shape[1]), dtype=field.dtype)
+    for k in range(table.shape[0]):
+        np.take(field, table[k], axis=1, out=out[k], mode="clip")
+    return out
+
+
+def flow_terms(gridpoints, sc, zwa, zwb, zsc) -> tuple:
+    """
+    Array counterpart of `flows`: computes the flow and vorticity terms from the
+    16 grid points using exactly the same arithmetic.
+
+    Args:
+        gridpoints (sequence of np.ndarray): The 16 grid point values (p1 to p16).
+        sc (np.ndarray): Longitudinal scaling factor per cell.
+        zwa (np.ndarray): Zonal weighting factor (latitude - 5 degrees) per cell.
+        zwb (np.ndarray): Zonal weighting factor (latitude + 5 degrees) per cell.
+        zsc (np.ndarray): Shear constant per cell.
+
+    Returns:
+        tuple: (W, S, F, ZW, ZS, Z) as numpy arrays.
+    """
+    (p1, p2, p3, p4, p5, p6, p7, p8,
+     p9, p10, p11, p12, p13, p14, p15, p16) = gridpoints
+
+    W = (0.5 * (p12 + p13)) - (0.5 * (p4 + p5))
+    S = sc * ((0.25 * (p5 + 2 * p9 + p13)) - (0.25 * (p4 + 2 * p8 + p12)))
+    F = np.sqrt(S**2 + W**2)
+    ZW = (zwa * (0.5 * (p15 + p16) - 0.5 * (p8 + p9))) - (zwb * (0.5 * (p8 + p9) - 0.5 * (p1 + p2)))
+    ZS = zsc * ((0.25 * (p6 + 2 * p10 + p14)) - (0.25 * (p5 + 2 * p9 + p13)) - (0.25 * (p4 + 2 * p8 + p12)) + (0.25 * (p3 + 2 * p7 + p11)))
+    Z = ZW + ZS
+
+    return W, S, F, ZW, ZS, Z
+
+
+def direction_codes(W: np.ndarray, S: np.ndarray, northern: np.ndarray) -> np.ndarray:
+    """
+    Array counterpart of `compute_direction`: assigns integer direction codes
+    (see `DIRECTION_LABELS`) instead of string labels.
+
+    Args:
+        W (np.ndarray): Westerly flow.
+        S (np.ndarray): Southerly flow.
+        northern (np.ndarray): Boolean mask of Northern Hemisphere cells, broadcastable to W.
+
+    Returns:
+        np.ndarray: Direction codes as int8, 0 where the direction is undefined.
+    """
+    deg = np.mod(180 + np.rad2deg(np.arctan2(W, S)), 360)
+    return direction_from_degrees(deg, northern)
+
+
+def direction_from_degrees(deg: np.ndarray, northern: np.ndarray) -> np.ndarray:
+    """
+    Assigns integer direction codes (see `DIRECTION_LABELS`) to flow directions in degrees,
+    with the same sectors as `compute_direction`.
+
+    Args:
+        deg (np.ndarray): Flow direction in degrees [0, 360).
+        northern (np.ndarray): Boolean mask of Northern Hemisphere cells, broadcastable to deg.
+
+    Returns:
+        np.ndarray: Direction codes as int8, 0 where the direction is undefined.
+    """
+    sector = np.searchsorted(_SECTOR_BOUNDS, deg, side="left")
+    direction = np.where(northern, _NH_SECTOR_CODES[sector], _SH_SECTOR_CODES[sector])
+    direction[np.isnan(deg)] = 0
+    return direction
+
+
+def lwt_codes(F: np.ndarray, Z: np.ndarray, direction: np.ndarray) -> np.ndarray:
+    """
+    Array counterpart of `assign_lwt`, applying the same rules in the same order.
+
+    Args:
+        F (np.ndarray): Total flow term.
+        Z (np.ndarray): Total shear vorticity term.
+        direction (np.ndarray): Direction codes from `direction_codes`.
+
+    Returns:
+        np.ndarray: Circulation type codes as float64, NaN where no rule applies.
+    """
+    abs_z = np.abs(Z)
+    has_direction = direction > 0
+
+    # Hybrid Anticyclonic flows
+    lwt = np.where((Z < 0) & has_direction, direction, np.nan)
+    # Hybrid Cyclonic flows
+    lwt = np.where((abs_z < F) & has_direction, direction + 10, lwt)
+    # Purely Cyclonic
+    lwt = np.where((abs_z > (2 * F)) & (Z > 0), 20, lwt)
+    # Purely Anticyclonic
+    lwt = np.where((abs_z > (2 * F)) & (Z < 0), 0, lwt)
+    # Directional flows
+    lwt = np.where((abs_z > F) & (abs_z < (2 * F)) & (Z > 0) & has_direction, direction + 20, lwt)
+    # Low Flow / Unclassified / Weak Flow
+    lwt = np.where((F < 6) & (abs_z < 6), -1, lwt)
+
+    return lwt
+
+
+# Codes of the 27 circulation types (LF, A, hybrid anticyclonic, directional, C, hybrid cyclonic)
+CT_CODES = np.array([-1, 0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 12, 13, 14, 15, 16, 17, 18,
+                     20, 21, 22, 23, 24, 25, 26, 27, 28])
+
+# Position of every code in CT_CODES, indexed by code + 1 (-1 for codes that are not used)
+_CT_POSITIONS = np.full(CT_CODES.max() + 2, -1, dtype=np.intp)
+_CT_POSITIONS[CT_CODES + 1] = np.arange(CT_CODES.size)
+
+
+# Codes of the 11 reduced circulation types (see `eleven_cts`) and the reduced type of every CT_CODES entry
+ELEVEN_CT_CODES = np.arange(-1, 10)
+_ELEVEN_POSITIONS = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 2, 3, 4, 5, 6, 7, 8, 9,
+                              10, 2, 3, 4, 5, 6, 7, 8, 9])
+
+
+# Abbreviations of the types of CT_CODES and ELEVEN_CT_CODES
+_DIRECTIONS = [DIRECTION_LABELS[code] for code in range(1, 9)]
+CT_NAMES = np.array(["LF", "A"] + [f"A{label}" for label in _DIRECTIONS] + _DIRECTIONS
+                    + ["C"] + [f"C{label}" for label in _DIRECTIONS])
+ELEVEN_CT_NAMES = np.array(["LF", "A"] + _DIRECTIONS + ["C"])
+
+
+def type_codes(eleven: bool = False) -> np.ndarray:
+    """
+    Returns the codes of the 27 circulation types, or of the 11 reduced types.
+    """
+    return ELEVEN_CT_CODES if eleven else CT_CODES
+
+
+def type_names(eleven: bool = False) -> np.ndarray:
+    """
+    Returns the abbreviations (e.g. "LF", "ANE", "C") of the types of `type_codes`.
+    """
+    return ELEVEN_CT_NAMES if eleven else CT_NAMES
+
+
+def ct_positions(lwt: np.ndarray, eleven: bool = False) -> np.ndarray:
+    """
+    Converts circulation type codes to their position in `CT_CODES`.
+
+    Args:
+        lwt (np.ndarray): Circulation type codes (27 types), NaN where unclassified.
+        eleven (bool, optional): Return positions in `ELEVEN_CT_CODES` instead, reducing the
+            27 types to 11 as `eleven_cts` does (default: False).
+
+    Returns:
+        np.ndarray: Positions in `CT_CODES` or `ELEVEN_CT_CODES` (intp), -1 where unclassified.
+    """
+    valid = np.isfinite(lwt)
+    codes = np.where(valid, lwt, -1).astype(np.intp)
+    positions = np.where(valid, _CT_POSITIONS[codes + 1], -1)
+    if eleven:
+        positions = np.where(positions >= 0, _ELEVEN_POSITIONS[positions], -1)
+    return positions
+
+
+def count_types(positions: np.ndarray, n_types: int, out: np.ndarray = None) -> np.ndarray:
+    """
+    Counts the occurrences of every type along the first axis with a single `bincount`.
+
+    Args:
+        positions (np.ndarray): Type positions (e.g. from `ct_positions`), shape (n, ...).
+            Negative values are ignored.
+        n_types (int): Number of types.
+        out (np.ndarray, optional): Counts of shape (n_types, ...) to add to.
+
+    Returns:
+        np.ndarray: Counts per type, shape (n_types, ...).
+    """
+    cells = int(np.prod(positions.shape[1:], dtype=np.int64))
+    flat = positions.reshape(positions.shape[0], cells)
+    valid = flat >= 0
+    index = flat * cells + np.arange(cells)
+    counts = np.bincount(index[valid], minlength=n_types * cells).reshape((n_types,) + positions.shape[1:])
+    if out is None:
+        return counts
+    out += counts
+    return out
+
+
+def accumulate_by_type(positions: np.ndarray, values: np.ndarray, n_types: int, weights: np.ndarray = None,
+                       out: np.ndarray = None) -> np.ndarray:
+    """
+    Adds the weights, weighted values and weighted squared values of every (type, cell) with
+    `bincount` scatter-adds, skipping unclassified time steps and missing values.
+
+    Args:
+        positions (np.ndarray): Type positions (e.g. from `ct_positions`), shape (n, ncells),
+            or (n, 1) to use the same type for every cell.
+        values (np.ndarray): Field values, shape (n, ncells).
+        n_types (int): Number of types.
+        weights (np.ndarray, optional): Weight of every time step, shape (n,).
+        out (np.ndarray, optional): Sums of shape (3, n_types, ncells) to add to.
+
+    Returns:
+        np.ndarray: Sums of weights, of weighted values and of weighted squares, shape (3, n_types, ncells).
+    """
+    n, cells = values.shape
+    valid = (positions >= 0) & np.isfinite(values)
+    index = (positions * cells + np.arange(cells))[valid]
+    w = np.ones(n) if weights is None else np.asarray(weights, dtype=np.float64)
+    w = np.broadcast_to(w[:, None], values.shape)[valid]
+    x = values[valid].astype(np.float64)
+
+    size = n_types * cells
+    sums = np.stack([
+        np.bincount(index, weights=w, minlength=size),
+        np.bincount(index, weights=w * x, minlength=size),
+        np.bincount(index, weights=w * x * x, minlength=size),
+    ]).reshape(3, n_types, cells)
+    if out is None:
+        return sums
+    out += sums
+    return out
@@ -0,0 +1,212 @@
+from collections import OrderedDict
+import hashlib
+
+import numpy as np
+from scipy import sparse
+
+from .stencil import OFFSETS, stencil_indices
+
+
+# Weights of the 16 grid points (p1 to p16) in the flow and vorticity terms, before scaling
+_W = np.zeros(16)
+_W[[11, 12]] = 0.5
+_W[[3, 4]] = -0.5
+
+_S = np.zeros(16)
+_S[[4, 12]] = 0.25
+_S[8] = 0.5
+_S[[3, 11]] = -0.25
+_S[7] = -0.5
+
+_ZWA = np.zeros(16)
+_ZWA[[14, 15]] = 0.5
+_ZWA[[7, 8]] = -0.5
+
+_ZWB = np.zeros(16)
+_ZWB[[7, 8]] = -0.5
+_ZWB[[0, 1]] = 0.5
+
+_ZS = np.zeros(16)
+_ZS[[5, 13, 2, 10]] = 0.25
+_ZS[[9, 6]] = 0.5
+_ZS[[4, 12, 3, 11]] = -0.25
+_ZS[[8, 7]] = -0.5
+
+INTERPOLATION_METHODS = ("nearest", "bilinear")
+
+# Operators of the most recently used grids
+_OPERATOR_CACHE = OrderedDict()
+_OPERATOR_CACHE_SIZE = 8
+
+
+def bracket_weights(coord: np.ndarray, targets: np.ndarray, periodic: bool) -> tuple:
+    """
+    Finds the two nodes of `coord` around every target and the linear weight of each.
+    Targets outside the coordinate range are clamped to the edge, unless `periodic`.
+
+    Args:
+        coord (np.ndarray): Ascending coordinate values.
+        targets (np.ndarray): Values to interpolate at.
+        periodic (bool): Whether the coordinate wraps around every 360 degrees.
+
+    Returns:
+        tuple: (lower, upper, lower_weight, upper_weight) for every target.
+    """
+    n = coord.size
+    if periodic:
+        coord = np.append(coord, coord[0] + 360)
+        targets = coord[0] + np.mod(targets - coord[0], 360)
+    else:
+        targets = np.clip(targets, coord[0], coord[-1])
+
+    lower = np.clip(np.searchsorted(coord, targets, side="right") - 1, 0, coord.size - 2)
+    weight = (targets - coord[lower]) / (coord[lower + 1] - coord[lower])
+    weight = np.clip(weight, 0, 1)
+    upper = lower + 1
+    if periodic:
+        upper = np.mod(upper, n)
+
+    return lower, upper, 1 - weight, weight
+
+
+def _bilinear_points(lat_full: np.ndarray, lon: np.ndarray, latitude: np.ndarray, is_global: bool) -> tuple:
+    """
+    Returns the bilinear (row, column, weight) entries of the 16 grid points of every
+    central point, each of shape (16, 4, nlat, nlon).
+    """
+    rows, cols, weights = [], [], []
+    for lat_offset, lon_offset in OFFSETS:
+        i0, i1, a0, a1 = bracket_weights(lat_full, latitude + lat_offset, periodic=False)
+        j0, j1, b0, b1 = bracket_weights(lon, lon + lon_offset, periodic=is_global)
+        rows.append([np.broadcast_to(i[:, None], (latitude.size, lon.size)) for i in (i0, i0, i1, i1)])
+        cols.append([np.broadcast_to(j[None, :], (latitude.size, lon.size)) for j in (j0, j1, j0, j1)])
+        weights.append([a[:, None] * b[None, :] for a, b in ((a0, b0), (a0, b1), (a1, b0), (a1, b1))])
+
+    return np.array(rows), np.array(cols), np.array(weights)
+
+
+def _nearest_points(lat_start: int, latitude, longitude, is_global: bool) -> tuple:
+    """
+    Returns the nearest-neighbour (row, column, weight) entries of the 16 grid points,
+    with the same selection as `extracting_gridpoints_*`, each of shape (16, 1, nlat, nlon).
+    """
+    lat_idx, lon_idx = stencil_indices(latitude, longitude, is_global)
+    shape = (len(OFFSETS), 1, latitude.size, longitude.size)
+    rows = np.broadcast_to(lat_start + lat_idx[:, None, :, None], shape)
+    cols = np.broadcast_to(lon_idx[:, None, None, :], shape)
+    return rows, cols, np.ones(shape)
+
+
+def stencil_operator(positions: np.ndarray, lat_full: np.ndarray, latitude, longitude, is_global: bool,
+                     sc: np.ndarray, zwa: np.ndarray, zwb: np.ndarray, zsc: np.ndarray,
+                     method: str = "nearest") -> tuple:
+    """
+    Builds sparse operators that map a flattened MSLP field directly to the westerly flow (W),
+    southerly flow (S), westerly shear vorticity (ZW) and southerly shear vorticity (ZS) of
+    every central point.
+
+    Args:
+        positions (np.ndarray): Flat index of every cell of the source field, in the
+            prepared (ascending latitude, [-180, 180] longitude) order, shape (nlat_full, nlon).
+        lat_full (np.ndarray): Latitude values of all the rows of `positions`.
+        latitude (xr.DataArray): Latitude values of the central points.
+        longitude (xr.DataArray): Longitude values of the central points (and of the grid).
+        is_global (bool): Whether longitudes wrap around the 180°E/-180°W boundary.
+        sc, zwa, zwb, zsc (np.ndarray): Constants per central point (see `compute_constants`).
+        method (str, optional): "nearest" snaps every grid point to the nearest node, as
+            `extracting_gridpoints_*` do; "bilinear" interpolates between the four
+            surrounding nodes (default: "nearest").
+
+    Returns:
+        tuple: CSR matrices (W, S, ZW, ZS), each of shape (ncells, npoints).
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"method must be one of {INTERPOLATION_METHODS}. Found: {method}.")
+
+    if method == "nearest":
+        lat_start = int(np.searchsorted(lat_full, latitude.values[0]))
+        rows, cols, weights = _nearest_points(lat_start, latitude, longitude, is_global)
+    else:
+        rows, cols, weights = _bilinear_points(lat_full, longitude.values, latitude.values, is_global)
+
+    n_cells = latitude.size * longitude.size
+    sources = positions[rows, cols].reshape(len(OFFSETS), -1, n_cells)
+    weights = weights.reshape(len(OFFSETS), -1, n_cells)
+    cells = np.broadcast_to(np.arange(n_cells), sources.shape)
+
+    # Central points at ±5° have one infinite zonal weight, which dominates the other term.
+    # Their ZW row holds the unweighted difference; `apply_operator` applies the weight.
+    finite_a, finite_b = np.isfinite(zwa), np.isfinite(zwb)
+    weight_a = np.where(finite_a, zwa, 1.0) * finite_b
+    weight_b = np.where(finite_b, zwb, 1.0) * finite_a
+    coefficients = (
+        np.broadcast_to(_W[:, None], (len(OFFSETS), n_cells)),
+        _S[:, None] * sc[None, :],
+        _ZWA[:, None] * weight_a[None, :] + _ZWB[:, None] * weight_b[None, :],
+        _ZS[:, None] * zsc[None, :],
+    )
+
+    operators = []
+    for coefficient in coefficients:
+        with np.errstate(invalid="ignore"):
+            values = coefficient[:, None, :] * weights
+        operator = sparse.coo_matrix(
+            (values.ravel(), (cells.ravel(), sources.ravel())), shape=(n_cells, positions.size)
+        ).tocsr()
+        operator.eliminate_zeros()
+        operators.append(operator)
+
+    return tuple(operators)
+
+
+def grid_key(*coords) -> str:
+    """
+    Returns a short digest identifying a grid from its coordinate values.
+    """
+    digest = hashlib.sha1()
+    for coord in coords:
+        coord = np.ascontiguousarray(coord)
+        digest.update(str((coord.dtype, coord.shape)).encode())
+        digest.update(coord.tobytes())
+    return digest.hexdigest()
+
+
+def cached_stencil_operator(key, *args, **kwargs) -> tuple:
+    """
+    Returns the operators of `stencil_operator`, building them only the first time a
+    given `key` is seen. The most recently used grids are kept in memory.
+    """
+    if key in _OPERATOR_CACHE:
+        _OPERATOR_CACHE.move_to_end(key)
+        return _OPERATOR_CACHE[key]
+
+    operators = stencil_operator(*args, **kwargs)
+    _OPERATOR_CACHE[key] = operators
+    if len(_OPERATOR_CACHE) > _OPERATOR_CACHE_SIZE:
+        _OPERATOR_CACHE.popitem(last=False)
+    return operators
+
+
+def apply_operator(operators: tuple, field: np.ndarray, zwa: np.ndarray = None, zwb: np.ndarray = None) -> tuple:
+    """
+    Applies the stencil operators to a batch of flattened fields, one sparse-dense
+    product per term.
+
+    Args:
+        operators (tuple): CSR matrices (W, S, ZW, ZS) from `stencil_operator`.
+        field (np.ndarray): MSLP values, shape (n, npoints).
+        zwa, zwb (np.ndarray, optional): Zonal weighting factors of the cells of the
+            operators. Their infinite values (central points at ±5°) are applied to ZW,
+            giving the same infinite vorticity as `flow_terms`.
+
+    Returns:
+        tuple: (W, S, ZW, ZS), each of shape (n, ncells).
+    """
+    columns = field.T
+    W, S, ZW, ZS = ((operator @ columns).T for operator in operators)
+    for weights in (zwa, zwb):
+        if weights is not None:
+            infinite = ~np.isfinite(weights)
+            if infinite.any():
+                ZW[:, infinite] *= weights[infinite]
+    return W, S, ZW, ZS
@@ -0,0 +1,57 @@
+from typing import NamedTuple
+
+import numpy as np
+import xarray as xr
+
+
+class Packing(NamedTuple):
+    """CF packing attributes of integer MSLP data: decoded = raw * scale_factor + add_offset."""
+    scale_factor: float
+    add_offset: float
+    missing_values: tuple
+
+
+def packing_of(data: xr.DataArray) -> Packing:
+    """
+    Returns the packing of MSLP data that still holds its raw integers, e.g. a NetCDF
+    variable opened with `mask_and_scale=False`.
+
+    Args:
+        data (xr.DataArray): MSLP data.
+
+    Returns:
+        Packing: The scale factor, offset and missing values, or None if the data is not
+            packed (floating point, or integers without `scale_factor`/`add_offset`).
+    """
+    if not np.issubdtype(data.dtype, np.integer):
+        return None
+    attrs = data.attrs
+    if "scale_factor" not in attrs and "add_offset" not in attrs:
+        return None
+    missing = []
+    for name in ("_FillValue", "missing_value"):
+        missing.extend(np.atleast_1d(attrs.get(name, [])).tolist())
+    return Packing(float(np.asarray(attrs.get("scale_factor", 1.0))),
+                   float(np.asarray(attrs.get("add_offset", 0.0))), tuple(missing))
+
+
+def unpack_raw(values: np.ndarray, packing: Packing) -> np.ndarray:
+    """
+    Converts raw packed values to float32 with NaN at missing values, without applying
+    the scale factor and offset. Integers below 2**24 are exact in float32, so the stencil
+    differences computed from them are exact. Floating point values are returned as they are.
+
+    Args:
+        values (np.ndarray): Raw values.
+        packing (Packing): Packing of the values (see `packing_of`).
+
+    Returns:
+        np.ndarray: The raw values as floating point.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.floating):
+        return values
+    raw = values.astype(np.float32)
+    if packing.missing_values:
+        raw[np.isin(values, packing.missing_values)] = np.nan
+    return raw
@@ -0,0 +1,146 @@
+import numpy as np
+
+
+# Direction sectors (lower, upper] in degrees, as in `compute_direction`
+NH_SECTORS = {
+    "W": (247, 292),
+    "NW": (292, 337),
+    "N": (337, 22),
+    "NE": (22, 67),
+    "E": (67, 112),
+    "SE": (112, 157),
+    "S": (157, 202),
+    "SW": (202, 247),
+}
+
+SH_SECTORS = {
+    "E": (247, 292),
+    "SE": (292, 337),
+    "S": (337, 22),
+    "SW": (22, 67),
+    "W": (67, 112),
+    "NW": (112, 157),
+    "N": (157, 202),
+    "NE": (202, 247),
+}
+
+# Offset of every direction within the hybrid and directional circulation types
+DIRECTION_OFFSETS = {"NE": 1, "E": 2, "SE": 3, "S": 4, "SW": 5, "W": 6, "NW": 7, "N": 8}
+
+
+def reference_flows(p, sc, zwa, zwb, zsc) -> tuple:
+    """
+    Scalar reference of the flow and vorticity terms of a single central point.
+
+    The arithmetic follows `flows` term by term, so numpy scalars (e.g. np.float32 grid
+    points) give the same rounding as the vectorized engines.
+
+    Args:
+        p (sequence): The 16 grid point values (p1 to p16).
+        sc, zwa, zwb, zsc: Constants of the central point (see `compute_constants`).
+
+    Returns:
+        tuple: (W, S, F, ZW, ZS, Z)
+    """
+    (p1, p2, p3, p4, p5, p6, p7, p8,
+     p9, p10, p11, p12, p13, p14, p15, p16) = p
+
+    W = (0.5 * (p12 + p13)) - (0.5 * (p4 + p5))
+    S = sc * ((0.25 * (p5 + 2 * p9 + p13)) - (0.25 * (p4 + 2 * p8 + p12)))
+    F = np.sqrt(S**2 + W**2)
+    ZW = (zwa * (0.5 * (p15 + p16) - 0.5 * (p8 + p9))) - (zwb * (0.5 * (p8 + p9) - 0.5 * (p1 + p2)))
+    ZS = zsc * ((0.25 * (p6 + 2 * p10 + p14)) - (0.25 * (p5 + 2 * p9 + p13)) - (0.25 * (p4 + 2 * p8 + p12)) + (0.25 * (p3 + 2 * p7 + p11)))
+    Z = ZW + ZS
+
+    return W, S, F, ZW, ZS, Z
+
+
+def reference_degrees(W, S):
+    """
+    Scalar reference of the flow direction in degrees.
+    """
+    return np.mod(180 + np.rad2deg(np.arctan2(W, S)), 360)
+
+
+def reference_direction(deg, latitude):
+    """
+    Scalar reference of `compute_direction`.
+
+    Args:
+        deg (float): Flow direction in degrees.
+        latitude (float): Latitude of the central point.
+
+    Returns:
+        str or None: Direction label, None if the direction is undefined (NaN).
+    """
+    if deg != deg:
+        return None
+    sectors = NH_SECTORS if latitude >= 0 else SH_SECTORS
+    for label, (lower, upper) in sectors.items():
+        if lower <= upper:
+            if lower < deg <= upper:
+                return label
+        elif deg > lower or deg <= upper:
+            return label
+    return None
+
+
+def reference_lwt(F, Z, direction):
+    """
+    Scalar reference of `assign_lwt`: the Jenkinson and Collison rules, checked from the
+    rule applied last in `assign_lwt` (which takes precedence) to the first.
+
+    Args:
+        F (float): Total flow.
+        Z (float): Total shear vorticity.
+        direction (str or None): Direction label.
+
+    Returns:
+        int or None: Circulation type code, None if no rule applies.
+    """
+    offset = DIRECTION_OFFSETS.get(direction)
+
+    # Low Flow / Unclassified / Weak Flow
+    if F < 6 and abs(Z) < 6:
+        return -1
+    # Directional flows
+    if abs(Z) > F and abs(Z) < 2 * F and Z > 0 and offset is not None:
+        return 20 + offset
+    # Purely Anticyclonic
+    if abs(Z) > 2 * F and Z < 0:
+        return 0
+    # Purely Cyclonic
+    if abs(Z) > 2 * F and Z > 0:
+        return 20
+    # Hybrid Cyclonic flows
+    if abs(Z) < F and offset is not None:
+        return 10 + offset
+    # Hybrid Anticyclonic flows
+    if Z < 0 and offset is not None:
+        return offset
+    return None
+
+
+def reference_classify(field: np.ndarray, table: np.ndarray, latitude: np.ndarray,
+                       sc: np.ndarray, zwa: np.ndarray, zwb: np.ndarray, zsc: np.ndarray) -> np.ndarray:
+    """
+    Classifies flattened MSLP fields one central point at a time with the scalar rules.
+
+    Args:
+        field (np.ndarray): MSLP values, shape (n, npoints).
+        table (np.ndarray): Flat stencil indices, shape (16, ncells) (see `stencil_table`).
+        latitude (np.ndarray): Latitude of every central point, shape (ncells,).
+        sc, zwa, zwb, zsc (np.ndarray): Constants of every central point, shape (ncells,).
+
+    Returns:
+        np.ndarray: Circulation type codes, shape (n, ncells), NaN where unclassified.
+    """
+    lwt = np.full((field.shape[0], table.shape[1]), np.nan)
+    for t in range(field.shape[0]):
+        for cell in range(table.shape[1]):
+            p = [field[t, table[k, cell]] for k in range(table.shape[0])]
+            W, S, F, ZW, ZS, Z = reference_flows(p, sc[cell], zwa[cell], zwb[cell], zsc[cell])
+            code = reference_lwt(F, Z, reference_direction(reference_degrees(W, S), latitude[cell]))
+            if code is not None:
+                lwt[t, cell] = code
+    return lwt
@@ -0,0 +1,126 @@
+import os
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from .operator import bracket_weights, grid_key
+
+from jcclass.utils.cache import cache_dir
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+# Version of the cached weights, part of the file names: increase it whenever
+# `bilinear_regrid_weights` or the file format changes, so stale files are not reused
+REGRID_VERSION = 1
+
+# Regridding weights already loaded in this process
+_WEIGHTS_CACHE = {}
+
+
+def _to_180(lon: np.ndarray) -> np.ndarray:
+    return np.where(lon > 180, lon - 360, lon)
+
+
+def bilinear_regrid_weights(src_lat: np.ndarray, src_lon: np.ndarray,
+                            dst_lat: np.ndarray, dst_lon: np.ndarray) -> sparse.csr_matrix:
+    """
+    Builds the bilinear interpolation weights from a regular (1D latitude and longitude)
+    source grid to a target grid.
+
+    Coordinates can be in any order and longitudes in [0, 360] or [-180, 180]. Longitudes
+    wrap around when the source grid covers the globe; targets outside the source domain
+    take the value of the nearest edge.
+
+    Args:
+        src_lat (np.ndarray): Source latitudes.
+        src_lon (np.ndarray): Source longitudes.
+        dst_lat (np.ndarray): Target latitudes.
+        dst_lon (np.ndarray): Target longitudes.
+
+    Returns:
+        sparse.csr_matrix: Weights of shape (ndst_lat * ndst_lon, nsrc_lat * nsrc_lon), mapping
+            flattened source fields to flattened target fields.
+    """
+    src_lat, dst_lat = np.asarray(src_lat, dtype=float), np.asarray(dst_lat, dtype=float)
+    src_lon, dst_lon = _to_180(np.asarray(src_lon, dtype=float)), _to_180(np.asarray(dst_lon, dtype=float))
+    if src_lat.size < 2 or src_lon.size < 2:
+        raise ValueError("The source grid must have at least two latitudes and two longitudes.")
+
+    lat_order = np.argsort(src_lat, kind="stable")
+    lon_order = np.argsort(src_lon, kind="stable")
+    lat_sorted, lon_sorted = src_lat[lat_order], src_lon[lon_order]
+    step = np.min(np.diff(lon_sorted))
+    periodic = bool(lon_sorted[-1] - lon_sorted[0] + step >= 360 - 1e-6)
+
+    i0, i1, a0, a1 = bracket_weights(lat_sorted, dst_lat, periodic=False)
+    j0, j1, b0, b1 = bracket_weights(lon_sorted, dst_lon, periodic=periodic)
+
+    shape = (dst_lat.size, dst_lon.size)
+    rows = np.broadcast_to(np.arange(dst_lat.size * dst_lon.size).reshape(shape), (4,) + shape)
+    lat_rows = [lat_order[i][:, None] for i in (i0, i0, i1, i1)]
+    lon_cols = [lon_order[j][None, :] for j in (j0, j1, j0, j1)]
+    cols = np.array([np.broadcast_to(i * src_lon.size + j, shape) for i, j in zip(lat_rows, lon_cols)])
+    values = np.array([a[:, None] * b[None, :] for a, b in ((a0, b0), (a0, b1), (a1, b0), (a1, b1))])
+
+    weights = sparse.coo_matrix(
+        (values.ravel(), (rows.ravel(), cols.ravel())),
+        shape=(dst_lat.size * dst_lon.size, src_lat.size * src_lon.size),
+    ).tocsr()
+    weights.eliminate_zeros()
+    return weights
+
+
+def regrid_weights(src_lat: np.ndarray, src_lon: np.ndarray,
+                   dst_lat: np.ndarray, dst_lon: np.ndarray, directory=None) -> sparse.csr_matrix:
+    """
+    Returns the bilinear regridding weights of a (source grid, target grid) pair, building
+    them only once: they are kept in memory and saved to disk for later runs.
+
+    Args:
+        src_lat, src_lon (np.ndarray): Source grid coordinates.
+        dst_lat, dst_lon (np.ndarray): Target grid coordinates.
+        directory (str or Path, optional): Cache directory (default: `cache_dir()`).
+
+    Returns:
+        sparse.csr_matrix: Weights from `bilinear_regrid_weights`.
+    """
+    key = grid_key(src_lat, src_lon, dst_lat, dst_lon)
+    if key in _WEIGHTS_CACHE:
+        return _WEIGHTS_CACHE[key]
+
+    directory = Path(directory) if directory is not None else cache_dir()
+    path = directory / f"regrid_v{REGRID_VERSION}_{key}.npz"
+    if path.exists():
+        weights = sparse.load_npz(path).tocsr()
+    else:
+        logger.info("Computing regridding weights.")
+        weights = bilinear_regrid_weights(src_lat, src_lon, dst_lat, dst_lon)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+            sparse.save_npz(tmp_path, weights)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache the regridding weights in {directory}: {e}")
+
+    _WEIGHTS_CACHE[key] = weights
+    return weights
+
+
+def apply_regrid(weights: sparse.csr_matrix, values: np.ndarray, shape: tuple) -> np.ndarray:
+    """
+    Regrids a block of fields with precomputed weights.
+
+    Args:
+        weights (sparse.csr_matrix): Weights from `regrid_weights`.
+        values (np.ndarray): Source fields with shape (..., nsrc_lat, nsrc_lon).
+        shape (tuple): Target grid shape (ndst_lat, ndst_lon).
+
+    Returns:
+        np.ndarray: Target fields with shape (..., ndst_lat, ndst_lon).
+    """
+    leading = values.shape[:-2]
+    flat = values.reshape(-1, values.shape[-2] * values.shape[-1])
+    return (weights @ flat.T).T.reshape(leading + tuple(shape))
@@ -0,0 +1,92 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .stencil import OFFSETS
+
+
+def unit_sphere(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """
+    Converts latitudes and longitudes (degrees) to 3-D coordinates on the unit sphere.
+
+    Returns:
+        np.ndarray: Cartesian coordinates, shape (npoints, 3).
+    """
+    phi, lam = np.deg2rad(np.ravel(latitude)), np.deg2rad(np.ravel(longitude))
+    return np.column_stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)])
+
+
+def chord_length(degrees: float) -> float:
+    """Straight-line distance on the unit sphere between two points `degrees` apart."""
+    return 2 * np.sin(np.deg2rad(degrees) / 2)
+
+
+def nearest_points(latitude: np.ndarray, longitude: np.ndarray, point_lat: np.ndarray,
+                   point_lon: np.ndarray) -> np.ndarray:
+    """
+    Finds the nearest grid point to each of a list of positions on an arbitrary grid, with a
+    KD-tree on unit-sphere coordinates (see `kdtree_stencil`).
+
+    Args:
+        latitude (np.ndarray): Latitude of every grid point (any shape, flattened).
+        longitude (np.ndarray): Longitude of every grid point, with the shape of `latitude`.
+        point_lat, point_lon (np.ndarray): Positions to look up.
+
+    Returns:
+        np.ndarray: Flat index of the nearest grid point to every position.
+    """
+    tree = cKDTree(unit_sphere(latitude, longitude))
+    return tree.query(unit_sphere(point_lat, point_lon), k=1)[1].astype(np.intp)
+
+
+def kdtree_stencil(latitude: np.ndarray, longitude: np.ndarray, centres: np.ndarray,
+                   max_distance: float = 2.5) -> tuple:
+    """
+    Finds the nearest grid point to each of the 16 stencil points of every central point on
+    an arbitrary (curvilinear or unstructured) grid, with a KD-tree on unit-sphere coordinates.
+    Distances are measured on the sphere, so longitudes wrap around and no regular structure
+    is assumed.
+
+    Args:
+        latitude (np.ndarray): Latitude of every grid point (any shape, flattened).
+        longitude (np.ndarray): Longitude of every grid point, with the shape of `latitude`.
+        centres (np.ndarray): Flat indices of the grid points to use as central points.
+        max_distance (float, optional): Largest great-circle distance (degrees) between a
+            stencil point and its nearest grid point (default: 2.5, half the stencil spacing).
+
+    Returns:
+        tuple:
+            table (np.ndarray): Flat indices of the 16 grid points, shape (16, ncentres).
+            found (np.ndarray): Whether all 16 points lie within `max_distance` of the grid,
+                shape (ncentres,).
+    """
+    latitude, longitude = np.ravel(latitude), np.ravel(longitude)
+    tree = cKDTree(unit_sphere(latitude, longitude))
+    lat0, lon0 = latitude[centres], longitude[centres]
+
+    offsets = np.array(OFFSETS, dtype=float)
+    targets = unit_sphere(lat0[None, :] + offsets[:, :1], lon0[None, :] + offsets[:, 1:])
+    distance, table = tree.query(targets, k=1, distance_upper_bound=chord_length(max_distance))
+
+    found = np.isfinite(distance).reshape(len(OFFSETS), -1).all(axis=0)
+    table = np.where(np.isfinite(distance), table, 0).reshape(len(OFFSETS), -1).astype(np.intp)
+    return table, found
+
+
+def point_constants(latitude: np.ndarray) -> tuple:
+    """
+    Computes the constants of `compute_constants` for central points at arbitrary latitudes.
+
+    Args:
+        latitude (np.ndarray): Latitude of every central point.
+
+    Returns:
+        tuple: (sc, zwa, zwb, zsc) as numpy arrays.
+    """
+    phi = np.asarray(latitude, dtype=float)
+    sc = 1 / np.cos(np.deg2rad(phi))
+    # Infinite at ±5°, as in `compute_constants`
+    with np.errstate(divide="ignore"):
+        zwa = np.sin(np.deg2rad(phi)) / np.sin(np.deg2rad(phi - 5))
+        zwb = np.sin(np.deg2rad(phi)) / np.sin(np.deg2rad(phi + 5))
+    zsc = 1 / (2 * (np.cos(np.deg2rad(phi)) ** 2))
+    return sc, zwa, zwb, zsc
@@ -0,0 +1,75 @@
+import numpy as np
+import xarray as xr
+
+
+# Latitude and longitude offsets (degrees) of the 16 grid points around the central point
+OFFSETS = (
+    (10, -5), (10, 5), (5, -15), (5, -5), (5, 5), (5, 15), (0, -15), (0, -5),
+    (0, 5), (0, 15), (-5, -15), (-5, -5), (-5, 5), (-5, 15), (-10, -5), (-10, 5)
+)
+
+
+def _nearest_positions(coord: xr.DataArray, targets) -> np.ndarray:
+    """
+    Returns the positions along `coord` of the nearest values to `targets`, using the
+    same nearest-neighbour lookup as `xr.DataArray.sel(..., method="nearest")`.
+    """
+    dim = coord.dims[0]
+    positions = xr.DataArray(np.arange(coord.size), coords={dim: coord.values}, dims=[dim])
+    return positions.sel({dim: np.asarray(targets)}, method="nearest").values
+
+
+def stencil_indices(latitude: xr.DataArray, longitude: xr.DataArray, is_global: bool) -> tuple:
+    """
+    Computes the positions of the 16 grid points around every central point, reproducing
+    the nearest-neighbour selection of `extracting_gridpoints_area` and
+    `extracting_gridpoints_globe` without touching the MSLP values.
+
+    Args:
+        latitude (xr.DataArray): Latitude values of the central points (ascending).
+        longitude (xr.DataArray): Longitude values of the central points (ascending, [-180, 180]).
+        is_global (bool): Whether longitudes wrap around the 180°E/-180°W boundary.
+
+    Returns:
+        tuple:
+            lat_idx (np.ndarray): Positions along `latitude`, shape (16, nlat).
+            lon_idx (np.ndarray): Positions along `longitude`, shape (16, nlon).
+    """
+    lat = latitude.values
+    lon = longitude.values
+
+    lat_idx = np.empty((len(OFFSETS), lat.size), dtype=np.intp)
+    lon_idx = np.empty((len(OFFSETS), lon.size), dtype=np.intp)
+
+    for k, (lat_offset, lon_offset) in enumerate(OFFSETS):
+        lat_point = lat + lat_offset
+        if is_global:
+            lon_point = np.where(
+                lon < -175, 360 + lon + lon_offset,
+                np.where(lon > 175, lon + lon_offset - 360, lon + lon_offset)
+            )
+            lon_point = np.where(lon_point == 180, -180, lon_point)
+        else:
+            lon_point = lon + lon_offset
+
+        lat_idx[k] = _nearest_positions(latitude, lat_point)
+        lon_idx[k] = _nearest_positions(longitude, lon_point)
+
+    return lat_idx, lon_idx
+
+
+def stencil_table(positions: np.ndarray, lat_idx: np.ndarray, lon_idx: np.ndarray) -> np.ndarray:
+    """
+    Combines the latitude and longitude stencil positions into a table of flat indices.
+
+    Args:
+        positions (np.ndarray): Flat index of every (latitude, longitude) cell in the source
+            field, shape (nlat, nlon).
+        lat_idx (np.ndarray): Positions along latitude, shape (16, nlat).
+        lon_idx (np.ndarray): Positions along longitude, shape (16, nlon).
+
+    Returns:
+        np.ndarray: Flat source indices of the 16 grid points, shape (16, nlat * nlon).
+    """
+    table = positions[lat_idx[:, :, None], lon_idx[:, None, :]]
+    return table.reshape(len(OFFSETS), -1)
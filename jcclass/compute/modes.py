@@ -0,0 +1,125 @@
+import numpy as np
+import xarray as xr
+from .functions.kernels import ct_positions, type_codes
+from .pipeline import plan_blocks
+from .functions.chunks import spatial_coords
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+TIE_BREAKS = ("first", "last", "order")
+
+
+def window_modes(positions: np.ndarray, starts: np.ndarray, n_types: int, tie_break: str = "first") -> tuple:
+    """
+    Finds the most frequent type of every cell in consecutive windows of time steps, by
+    counting all (window, type, cell) triples with a single `bincount`.
+
+    Args:
+        positions (np.ndarray): Type positions (see `ct_positions`), shape (n, ncells).
+        starts (np.ndarray): Offset of the first time step of every window, ascending from 0.
+        n_types (int): Number of types.
+        tie_break (str, optional): Type chosen among equally frequent ones:
+            - "first": the one that occurs first in the window (default).
+            - "last": the one that occurs last in the window.
+            - "order": the first one in the order of `type_codes`.
+
+    Returns:
+        tuple:
+            mode (np.ndarray): Position of the modal type, shape (nwindows, ncells), -1
+                where the window has no classified time step.
+            count (np.ndarray): Occurrences of the modal type, shape (nwindows, ncells).
+            classified (np.ndarray): Classified time steps, shape (nwindows, ncells).
+    """
+    if tie_break not in TIE_BREAKS:
+        raise ValueError(f"Unknown tie_break '{tie_break}'. Use one of {', '.join(TIE_BREAKS)}.")
+    n, cells = positions.shape
+    lengths = np.diff(np.r_[starts, n])
+    window = np.repeat(np.arange(starts.size), lengths)
+
+    step, cell = np.nonzero(positions >= 0)
+    index = (window[step] * n_types + positions[step, cell]) * cells + cell
+    counts = np.bincount(index, minlength=starts.size * n_types * cells).reshape(starts.size, n_types, cells)
+
+    # Ranks the types by count, then by the tie-break key (larger wins)
+    longest = int(lengths.max()) if lengths.size else 0
+    if tie_break == "order":
+        key = np.arange(n_types - 1, -1, -1)[None, :, None]
+    else:
+        offset = np.arange(n) - np.repeat(starts, lengths)
+        key = np.full(counts.shape, -1 if tie_break == "last" else longest, dtype=np.int64).ravel()
+        if tie_break == "first":
+            np.minimum.at(key, index, offset[step])
+            key = longest - key.reshape(counts.shape)
+        else:
+            np.maximum.at(key, index, offset[step])
+            key = key.reshape(counts.shape)
+    mode = np.argmax(counts * (max(longest, n_types) + 1) + key, axis=1)
+
+    count = np.take_along_axis(counts, mode[:, None], axis=1)[:, 0]
+    classified = counts.sum(axis=1)
+    return np.where(classified > 0, mode, -1), count, classified
+
+
+def daily_modes(cts: xr.DataArray, tie_break: str = "first", eleven: bool = False,
+                freq: str = "1D", block_size: int = None) -> xr.Dataset:
+    """
+    Reduces sub-daily circulation types (e.g. 6-hourly or hourly) to the dominant type of
+    every day and cell, and the fraction of the day it held.
+
+    The archive is read in blocks of whole days (see `plan_blocks`), so dask-backed or
+    lazily loaded data is only loaded a block at a time. The types of every block are
+    counted per day and cell at once with `window_modes`, without grouping cell by cell.
+
+    Args:
+        cts (xr.DataArray): Circulation types (27 types) with a "time" dimension, in
+            ascending order.
+        tie_break (str, optional): Type chosen when several are equally frequent in a day:
+            "first" (first to occur in the day, default), "last" (last to occur) or "order"
+            (first in the order of the type codes).
+        eleven (bool, optional): Compute the mode of the 11 reduced types (default: False).
+        freq (str, optional): Length of the periods (default: "1D"). Periods are labelled
+            with their start.
+        block_size (int, optional): Maximum number of time steps read at once.
+
+    Returns:
+        xr.Dataset: Dataset with the variables
+            - mode: code of the modal type of every period, NaN where no time step is classified.
+            - fraction: occurrences of the modal type divided by the classified time steps.
+
+    Example:
+        >>> from jcclass.compute import daily_modes
+        >>> daily = daily_modes(cts_6h, tie_break="order")
+        >>> daily.mode.where(daily.fraction >= 0.75)
+    """
+    if "time" not in cts.dims:
+        raise ValueError("The circulation types must have a 'time' dimension.")
+    cts = cts.transpose("time", ...)
+    codes = type_codes(eleven)
+    spatial_shape = cts.shape[1:]
+
+    blocks = plan_blocks(cts.time, block_size, resample=freq)
+    logger.info(f"Computing the modal types of {sum(len(block.time) for block in blocks)} periods "
+                f"in {len(blocks)} blocks.")
+    modes, fractions = [], []
+    for block in blocks:
+        values = cts.isel(time=block.source).values
+        positions = ct_positions(values.reshape(values.shape[0], -1), eleven=eleven)
+        mode, count, classified = window_modes(positions, block.starts, codes.size, tie_break)
+        modes.append(np.where(mode >= 0, codes[mode], np.nan))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fractions.append((count / classified).astype(np.float32))
+
+    n_periods = sum(len(block.time) for block in blocks)
+    mode = np.concatenate(modes) if blocks else np.empty((0, int(np.prod(spatial_shape))))
+    fraction = np.concatenate(fractions) if blocks else mode.astype(np.float32)
+    time = np.concatenate([block.time for block in blocks]) if blocks else cts.time.values[:0]
+    dims = cts.dims
+    shape = (n_periods,) + spatial_shape
+    daily = xr.Dataset({"mode": (dims, mode.reshape(shape)), "fraction": (dims, fraction.reshape(shape))},
+                       coords={"time": time, **spatial_coords(cts)})
+    daily["mode"].attrs["long_name"] = "Modal circulation type"
+    daily["fraction"].attrs["long_name"] = "Fraction of the classified time steps with the modal type"
+    daily.attrs["tie_break"] = tie_break
+    return daily
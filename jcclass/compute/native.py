@@ -0,0 +1,163 @@
+import numpy as np
+import xarray as xr
+from .classifier import JCClassifier, LAT_NAMES, LON_NAMES, EQUATOR_BAND, find_coord
+from .functions.spatial_index import kdtree_stencil, point_constants
+from .functions.format_data import enhance_and_validate_dataarray
+from .pipeline import plan_blocks, iter_blocks
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+# Latitude range of the central points, as in `extract_lat_lon_points`
+MAX_LATITUDE = 80.0
+
+
+def is_native_grid(data: xr.DataArray) -> bool:
+    """
+    Whether the latitude and longitude of `data` are coordinates on other dimensions
+    (a curvilinear or unstructured grid) rather than 1-D dimension coordinates.
+    """
+    return (not any(name in data.dims for name in LAT_NAMES)
+            and any(name in data.coords for name in LAT_NAMES)
+            and any(name in data.coords for name in LON_NAMES))
+
+
+class NativeGridClassifier(JCClassifier):
+    """
+    Jenkinson and Collison classifier for curvilinear (2-D latitude and longitude) and
+    unstructured (1-D list of points) grids, classifying every grid point on the native grid.
+
+    The 16 grid points of every central point are the nearest grid points to the stencil
+    positions (±5°/10° of latitude, ±5°/15° of longitude), found once with a KD-tree on
+    unit-sphere coordinates. The resulting index table drives the same gather and
+    classification kernels as `JCClassifier`, so no regridding is needed. Grid points beyond
+    ±80° latitude, or whose stencil reaches outside the grid, are not classified (NaN).
+
+    Args:
+        grid (xr.DataArray): Any DataArray on the native grid, with latitude ("latitude" or
+            "lat") and longitude ("longitude" or "lon") coordinates on the same dimensions,
+            e.g. ("y", "x") or ("ncells",).
+        mask (xr.DataArray or np.ndarray or str, optional): Grid points to classify (True) or
+            skip (False), with the shape of the grid, or "equator" to skip |latitude| < 10°.
+        max_distance (float, optional): Largest distance (degrees) between a stencil position
+            and its nearest grid point for the central point to be classified (default: 2.5).
+        threads (int, optional): Number of threads that classify a field at once (default: 1).
+
+    Attributes:
+        spatial_dims (tuple): Dimensions of the native grid.
+        latitude (xr.DataArray): Latitude of every grid point.
+        longitude (xr.DataArray): Longitude of every grid point.
+        cells (np.ndarray): Flat indices of the classified grid points.
+
+    Example:
+        >>> from jcclass.compute.native import NativeGridClassifier
+        >>> classifier = NativeGridClassifier(ds_mslp.isel(time=0))
+        >>> cts = classifier.classify(ds_mslp)
+    """
+
+    def __init__(self, grid: xr.DataArray, mask=None, max_distance: float = 2.5, threads: int = 1):
+        self.max_distance = max_distance
+        super().__init__(grid, stencil="kdtree", mask=mask, threads=threads)
+
+    def _build(self, grid: xr.DataArray, stencil: str, mask) -> None:
+        """Finds the stencil of every grid point with a KD-tree (see `kdtree_stencil`)."""
+        lat_name, lon_name = find_coord(grid, LAT_NAMES), find_coord(grid, LON_NAMES)
+        latitude, longitude = grid[lat_name], grid[lon_name]
+        if latitude.dims != longitude.dims or not latitude.dims:
+            raise ValueError("Latitude and longitude must be defined on the same grid dimensions.")
+
+        self.stencil = stencil
+        self.is_global = False
+        self.spatial_dims = latitude.dims
+        self.lat_dim, self.lon_dim = lat_name, lon_name
+        self.grid_shape = latitude.shape
+        self.latitude = latitude.reset_coords(drop=True)
+        self.longitude = longitude.reset_coords(drop=True)
+
+        lat = latitude.values.ravel()
+        keep = np.abs(lat) <= MAX_LATITUDE
+        if mask is not None:
+            keep &= self._native_mask(mask)
+        centres = np.flatnonzero(keep)
+
+        logger.info(f"Searching the stencils of {centres.size} grid points.")
+        table, found = kdtree_stencil(lat, longitude.values.ravel(), centres, self.max_distance)
+        self.cells = centres[found]
+        self.table = table[:, found]
+        self.operators = None
+        self.sc, self.zwa, self.zwb, self.zsc = point_constants(lat[self.cells])
+        self.northern = lat[self.cells] >= 0
+
+    def _native_mask(self, mask) -> np.ndarray:
+        """Returns the mask as a flat boolean array over the grid points."""
+        if isinstance(mask, str):
+            if mask != "equator":
+                raise ValueError(f"Unknown mask '{mask}'. Use 'equator', a boolean DataArray or array.")
+            return np.abs(self.latitude.values.ravel()) >= EQUATOR_BAND
+        mask = np.asarray(mask)
+        if mask.shape != self.grid_shape:
+            raise ValueError(f"The mask must have the shape of the grid {self.grid_shape}. Found: {mask.shape}.")
+        return mask.astype(bool).ravel()
+
+    @property
+    def shape(self) -> tuple:
+        """Shape of the native grid."""
+        return self.grid_shape
+
+    def _as_dataarray(self, lwt: np.ndarray, coords: dict, dims: tuple) -> xr.DataArray:
+        """Wraps codes on the native grid with the leading `coords` and the grid coordinates."""
+        lwt = enhance_and_validate_dataarray(xr.DataArray(lwt, coords=coords, dims=dims))
+        lwt.coords[self.lat_dim] = self.latitude
+        lwt.coords[self.lon_dim] = self.longitude
+        return lwt
+
+    def classify(self, field: xr.DataArray) -> xr.DataArray:
+        """
+        Computes the circulation types of MSLP fields on the native grid.
+
+        Args:
+            field (xr.DataArray or np.ndarray): MSLP data on the classifier grid. Other
+                dimensions (e.g. "time") are kept. Numpy arrays are passed to `classify_array`.
+
+        Returns:
+            xr.DataArray: Circulation types on the native grid, NaN where not classified.
+        """
+        if not isinstance(field, xr.DataArray):
+            return self.classify_array(field)
+        field = field.transpose(..., *self.spatial_dims)
+        coords = {dim: field[dim] for dim in field.dims[:-len(self.spatial_dims)] if dim in field.coords}
+        return self._as_dataarray(self.classify_array(field.values), coords, field.dims)
+
+
+def classify_native(data_mslp: xr.DataArray, classifier: NativeGridClassifier = None,
+                    block_size: int = None, resample=None) -> xr.DataArray:
+    """
+    Computes the circulation types of MSLP data on a curvilinear or unstructured grid,
+    reading and classifying one time block at a time (see `plan_blocks`).
+
+    Args:
+        data_mslp (xr.DataArray): MSLP data with a "time" dimension on a native grid.
+        classifier (NativeGridClassifier, optional): Classifier for the grid of `data_mslp`.
+        block_size (int, optional): Maximum number of input time steps per block.
+        resample (int or str, optional): Temporal reduction (see `plan_blocks`).
+
+    Returns:
+        xr.DataArray: Circulation types on the native grid.
+    """
+    if "time" not in data_mslp.dims and "valid_time" in data_mslp.dims:
+        data_mslp = data_mslp.rename({"valid_time": "time"})
+    if classifier is None:
+        classifier = NativeGridClassifier(data_mslp)
+    data_mslp = data_mslp.transpose("time", ..., *classifier.spatial_dims)
+
+    blocks = plan_blocks(data_mslp.time, block_size, resample)
+    logger.info(f"Classifying {sum(len(block.time) for block in blocks)} time steps in {len(blocks)} blocks.")
+    results = [lwt for _, lwt in iter_blocks(data_mslp, classifier, blocks)]
+
+    lwt = np.concatenate(results) if results else np.empty((0,) + data_mslp.shape[1:])
+    time = np.concatenate([block.time for block in blocks]) if blocks else data_mslp.time.values[:0]
+    coords = {"time": time}
+    coords.update({dim: data_mslp[dim] for dim in data_mslp.dims[1:-len(classifier.spatial_dims)]
+                   if dim in data_mslp.coords})
+    return classifier._as_dataarray(lwt, coords, data_mslp.dims)
@@ -0,0 +1,516 @@
+import re
+from typing import NamedTuple, Union
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from .classifier import JCClassifier, LAT_NAMES, LON_NAMES, find_dim
+from .functions.format_data import enhance_and_validate_dataarray
+from .functions.regrid import regrid_weights, apply_regrid
+from .functions.packing import packing_of, unpack_raw
+from .tiling import plan_tiles, classify_tiles
+from .streaming import PipelineStats, stream_blocks
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+# Number of input time steps read and classified at once when none is given
+DEFAULT_BLOCK_SIZE = 240
+
+# Bytes per unit of the memory sizes accepted by `parse_memory`
+_MEMORY_UNITS = {
+    "": 1, "B": 1,
+    "KB": 10**3, "MB": 10**6, "GB": 10**9, "TB": 10**12,
+    "KIB": 2**10, "MIB": 2**20, "GIB": 2**30, "TIB": 2**40,
+    "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40,
+}
+
+# A number followed by an optional unit, as accepted by `parse_memory`
+_MEMORY_PATTERN = re.compile(r"(\d+(?:\.\d*)?|\.\d+)([A-Z]*)")
+
+# Float arrays of one field held at once by the flow and vorticity kernels (terms and temporaries)
+_KERNEL_ARRAYS = 10
+
+# Bytes per cell of the direction and circulation type rules (angles, sectors, masks, codes)
+_RULE_BYTES = 48
+
+
+class TimeBlock(NamedTuple):
+    """
+    A block of input time steps and how they are reduced before classification.
+
+    Attributes:
+        source (slice or np.ndarray): Input time steps of the block.
+        starts (np.ndarray or None): Offsets within the block where every resampling
+            window starts, or None if the time steps are classified as they are.
+        time (np.ndarray): Time labels of the classified fields.
+    """
+    source: object
+    starts: object
+    time: np.ndarray
+
+
+def _window_labels(time: xr.DataArray, window: str) -> np.ndarray:
+    """Returns the start of the resampling window of every time step."""
+    try:
+        offset = pd.tseries.frequencies.to_offset(window)
+    except ValueError as e:
+        raise ValueError(f"Unknown resampling frequency '{window}'.") from e
+    # Only fixed windows (hours, days, ...) have a length; months, weeks or years raise
+    try:
+        offset.nanos
+    except ValueError:
+        raise ValueError(f"resample='{window}' is a calendar frequency. Only fixed windows such as "
+                         "'6h' or '1D' are supported.") from None
+    return time.dt.floor(window).values
+
+
+def plan_blocks(time: xr.DataArray, block_size: int = None, resample=None) -> list:
+    """
+    Splits the time axis into blocks of at most `block_size` input time steps, keeping
+    every resampling window within a single block.
+
+    Args:
+        time (xr.DataArray): Time coordinate of the input data (ascending).
+        block_size (int, optional): Maximum number of input time steps per block
+            (default: `DEFAULT_BLOCK_SIZE`). A window longer than this forms its own block.
+        resample (int or str, optional): Temporal reduction applied before classification.
+            - None: every time step is classified.
+            - int: only the time steps at this hour (e.g. 12 for 12 UTC) are classified.
+            - str: mean over windows of this fixed frequency (e.g. "1D" for daily means,
+              "6h"), labelled with the start of the window. Calendar frequencies such as
+              "MS" (month start) are not supported.
+
+    Returns:
+        list: `TimeBlock` objects covering the time axis in order.
+    """
+    block_size = block_size or DEFAULT_BLOCK_SIZE
+    if block_size < 1:
+        raise ValueError("block_size must be a positive integer.")
+    n_time = time.size
+
+    if resample is None:
+        return [TimeBlock(slice(start, min(start + block_size, n_time)), None,
+                          time.values[start:start + block_size])
+                for start in range(0, n_time, block_size)]
+
+    if isinstance(resample, (int, np.integer)) and not isinstance(resample, bool):
+        if not 0 <= resample < 24:
+            raise ValueError("The synoptic hour must be between 0 and 23.")
+        selected = np.flatnonzero((time.dt.hour == resample) & (time.dt.minute == 0))
+        return [TimeBlock(selected[start:start + block_size], None, time.values[selected[start:start + block_size]])
+                for start in range(0, selected.size, block_size)]
+
+    if not isinstance(resample, str):
+        raise TypeError("resample must be None, an hour (int) or a frequency string such as '1D'.")
+
+    labels = _window_labels(time, resample)
+    if not (labels[1:] >= labels[:-1]).all():
+        raise ValueError("The time coordinate must be in ascending order to be resampled.")
+    window_starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    window_ends = np.r_[window_starts[1:], n_time]
+
+    blocks = []
+    first = 0
+    while first < window_starts.size:
+        last = first + 1
+        while last < window_starts.size and window_ends[last] - window_starts[first] <= block_size:
+            last += 1
+        start, end = window_starts[first], window_ends[last - 1]
+        blocks.append(TimeBlock(slice(start, end), window_starts[first:last] - start, labels[window_starts[first:last]]))
+        first = last
+
+    return blocks
+
+
+def _block_length(block: TimeBlock, n_time: int) -> int:
+    """Number of input time steps read for a block."""
+    if isinstance(block.source, slice):
+        return len(range(*block.source.indices(n_time)))
+    return len(block.source)
+
+
+class MemoryPlan(NamedTuple):
+    """
+    Estimated memory use of a blocked classification run (see `plan_memory`).
+
+    Attributes:
+        block_size (int): Input time steps read and classified at once.
+        n_blocks (int): Number of blocks.
+        n_time (int): Number of classified time steps.
+        step_bytes (int): Working set per input time step of a block.
+        fixed_bytes (int): Classifier tables, regridding weights and the output array (unless
+            it is streamed to disk).
+        peak_bytes (int): Estimated peak memory of the run.
+        max_memory (int or None): Memory budget the plan was made for.
+    """
+    block_size: int
+    n_blocks: int
+    n_time: int
+    step_bytes: int
+    fixed_bytes: int
+    peak_bytes: int
+    max_memory: object
+
+    def __str__(self) -> str:
+        budget = "" if self.max_memory is None else f" of {format_memory(self.max_memory)}"
+        return (f"{self.n_time} time steps in {self.n_blocks} blocks of up to {self.block_size} input "
+                f"time steps: {format_memory(self.step_bytes)} per time step, "
+                f"{format_memory(self.fixed_bytes)} fixed, "
+                f"estimated peak {format_memory(self.peak_bytes)}{budget}")
+
+
+def parse_memory(value) -> int:
+    """
+    Converts a memory size to bytes.
+
+    Args:
+        value (int or str): Number of bytes, or a size with a unit such as "4GB", "512 MiB"
+            or "1.5G" (decimal KB/MB/GB/TB, binary KiB/MiB/GiB/TiB and K/M/G/T).
+
+    Returns:
+        int: Size in bytes.
+    """
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        size = int(value)
+    elif isinstance(value, str):
+        match = _MEMORY_PATTERN.fullmatch(value.strip().upper().replace(" ", ""))
+        if match is None or match.group(2) not in _MEMORY_UNITS:
+            raise ValueError(f"Could not read the memory size '{value}'. Use e.g. '4GB' or '512MiB'.")
+        size = int(float(match.group(1)) * _MEMORY_UNITS[match.group(2)])
+    else:
+        raise TypeError("The memory size must be a number of bytes or a string such as '4GB'.")
+    if size <= 0:
+        raise ValueError("The memory size must be positive.")
+    return size
+
+
+def format_memory(size: int) -> str:
+    """Formats a number of bytes with a binary unit, e.g. "1.5 GiB"."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def step_memory(classifier: JCClassifier, source_shape: tuple, dtype, resample=None, regrid: bool = False,
+                ratio: float = 1.0, buffers: int = 1, packed: bool = False) -> int:
+    """
+    Estimates the memory needed per input time step of a block: the fields as read and their
+    temporal reduction, plus, per classified field, the regridded field, the 16 grid points
+    and the kernel arrays.
+
+    Args:
+        classifier (JCClassifier): Classifier of the run.
+        source_shape (tuple): Shape of one input field (latitude, longitude).
+        dtype (np.dtype): Data type of the input.
+        resample (int or str, optional): Temporal reduction (see `plan_blocks`).
+        regrid (bool, optional): Whether the input is regridded before classification.
+        ratio (float, optional): Classified fields per input time step, e.g. 1/24 for daily
+            means of hourly data (default: 1).
+        buffers (int, optional): Number of blocks of input fields held at once, e.g. with
+            blocks read ahead (default: 1).
+        packed (bool, optional): Whether integer input is packed and classified from its raw
+            values in float32 (default: False, integers are converted to float64).
+
+    Returns:
+        int: Bytes per input time step.
+    """
+    dtype = np.dtype(dtype)
+    floating = np.issubdtype(dtype, np.floating)
+    itemsize = dtype.itemsize if floating else (4 if packed else 8)
+    n_source = int(np.prod(source_shape))
+    n_cells = classifier.n_cells
+
+    # Input fields as read, converted to floating point if needed
+    total = buffers * n_source * dtype.itemsize + (0 if floating else n_source * itemsize)
+    if isinstance(resample, str):
+        # Filled copy and validity mask; the window means are float64
+        total += n_source * (itemsize + 1)
+        itemsize = 8
+
+    field = 0
+    if isinstance(resample, str):
+        # Window sums, counts and means
+        field += 3 * n_source * 8
+    if regrid:
+        field += 2 * int(np.prod(classifier.grid_shape)) * 8
+    if classifier.table is not None:
+        field += (len(classifier.table) + _KERNEL_ARRAYS) * n_cells * itemsize
+    else:
+        field += _KERNEL_ARRAYS * n_cells * 8
+    field += _RULE_BYTES * n_cells
+    if classifier.cells is not None:
+        field += int(np.prod(classifier.shape)) * 8
+    return int(np.ceil(total + ratio * field))
+
+
+def plan_memory(data_mslp: xr.DataArray, classifier: JCClassifier, max_memory=None, block_size: int = None,
+                resample=None, regrid=None, prefetch: int = 0, streamed: bool = False) -> MemoryPlan:
+    """
+    Chooses the largest block size whose estimated peak memory fits in `max_memory`.
+
+    The peak is the output array (float64, all classified time steps), the classifier tables
+    and regridding weights, plus the working set of one block (see `step_memory`). A streamed
+    output (the `out` of `classify_in_blocks`) is not held in memory and not counted.
+
+    Args:
+        data_mslp (xr.DataArray): MSLP data with "time", "latitude" and "longitude" dimensions.
+        classifier (JCClassifier): Classifier of the run.
+        max_memory (int or str, optional): Memory budget, e.g. "4GB" (see `parse_memory`).
+            Without a budget, the plan uses `block_size` as given.
+        block_size (int, optional): Maximum number of input time steps per block.
+        resample (int or str, optional): Temporal reduction (see `plan_blocks`).
+        regrid (sparse.csr_matrix, optional): Regridding weights applied to every field.
+        prefetch (int, optional): Number of blocks read ahead (see `stream_blocks`).
+        streamed (bool, optional): Whether the output is written block by block rather than
+            kept in memory (default: False).
+
+    Returns:
+        MemoryPlan: The chosen block size and the memory estimates.
+
+    Raises:
+        ValueError: If the output and a single time step do not fit in `max_memory`.
+    """
+    source_shape = (data_mslp.sizes["latitude"], data_mslp.sizes["longitude"])
+    n_other = int(np.prod([size for dim, size in data_mslp.sizes.items()
+                           if dim not in ("time", "latitude", "longitude")]))
+    n_input = data_mslp.sizes["time"]
+    blocks = plan_blocks(data_mslp.time, max(n_input, 1), resample)
+    n_time = sum(len(block.time) for block in blocks)
+    n_read = sum(_block_length(block, n_input) for block in blocks)
+
+    ratio = n_time / n_read if n_read else 1.0
+    step_bytes = n_other * step_memory(classifier, source_shape, data_mslp.dtype, resample, regrid is not None,
+                                       ratio, buffers=1 + prefetch, packed=packing_of(data_mslp) is not None)
+    fixed_bytes = classifier.nbytes
+    if not streamed:
+        fixed_bytes += n_other * n_time * int(np.prod(classifier.shape)) * 8
+    if regrid is not None:
+        fixed_bytes += regrid.data.nbytes + regrid.indices.nbytes + regrid.indptr.nbytes
+
+    block_size = block_size or (None if max_memory is not None else DEFAULT_BLOCK_SIZE)
+    if max_memory is not None:
+        max_memory = parse_memory(max_memory)
+        fitting = (max_memory - fixed_bytes) // step_bytes
+        if fitting < 1:
+            raise ValueError(
+                f"max_memory={format_memory(max_memory)} is too small: the output and classifier need "
+                f"{format_memory(fixed_bytes)} and each time step {format_memory(step_bytes)}."
+            )
+        block_size = int(min(fitting, block_size or fitting, max(n_input, 1)))
+
+    blocks = plan_blocks(data_mslp.time, block_size, resample)
+    # A resampling window longer than the block size forms its own, larger block
+    largest = max((_block_length(block, n_input) for block in blocks), default=0)
+    peak_bytes = fixed_bytes + largest * step_bytes
+
+    return MemoryPlan(block_size, len(blocks), n_time, step_bytes, fixed_bytes, peak_bytes, max_memory)
+
+
+def reduce_block(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Averages consecutive windows of time steps (first axis), ignoring missing values.
+
+    Args:
+        values (np.ndarray): Input fields of the block.
+        starts (np.ndarray): Offsets where every window starts.
+
+    Returns:
+        np.ndarray: One mean field per window.
+    """
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0), starts, axis=0)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def target_template(target_grid) -> xr.DataArray:
+    """
+    Returns an empty field on the latitude and longitude coordinates of `target_grid`.
+    """
+    lat_dim, lon_dim = find_dim(target_grid, LAT_NAMES), find_dim(target_grid, LON_NAMES)
+    lat, lon = target_grid[lat_dim].values, target_grid[lon_dim].values
+    return xr.DataArray(np.zeros((lat.size, lon.size)), coords={lat_dim: lat, lon_dim: lon}, dims=[lat_dim, lon_dim])
+
+
+def _read_block(data_mslp: xr.DataArray, block: TimeBlock, packing=None, **indexers) -> np.ndarray:
+    """
+    Reads the input fields of a block (optionally a subset of the grid) and reduces them.
+    Packed fields are kept as raw values (see `unpack_raw`).
+    """
+    values = data_mslp.isel(time=block.source, **indexers).values
+    if packing is not None:
+        values = unpack_raw(values, packing)
+    if block.starts is not None:
+        values = reduce_block(values, block.starts)
+    return values
+
+
+def iter_blocks(data_mslp: xr.DataArray, classifier: JCClassifier, blocks: list, regrid=None,
+                tiles: list = None, workers: int = 1):
+    """
+    Reads, reduces, regrids and classifies the input block by block.
+
+    Packed integer input (see `packing_of`) is classified from its raw values, applying the
+    scale factor only to the flow and vorticity terms.
+
+    Args:
+        data_mslp (xr.DataArray): MSLP data with a "time" dimension, on the classifier grid
+            or on the source grid of `regrid`.
+        classifier (JCClassifier): Classifier for the grid of `data_mslp` (or target grid),
+            e.g. a `NativeGridClassifier` on curvilinear or unstructured grids.
+        blocks (list): `TimeBlock` objects from `plan_blocks`.
+        regrid (sparse.csr_matrix, optional): Weights from the grid of `data_mslp` to the
+            classifier grid (see `regrid_weights`).
+        tiles (list, optional): `Tile` objects from `plan_tiles`. Every tile reads only its
+            halo of the input and is classified separately.
+        workers (int, optional): Number of tiles classified at once (default: 1).
+
+    Yields:
+        tuple: (block, circulation types of the block as np.ndarray).
+    """
+    if regrid is None and set(classifier.spatial_dims) <= set(data_mslp.dims):
+        # The grid of the classifier, e.g. ("y", "x") of a native grid
+        spatial_dims = classifier.spatial_dims
+    else:
+        spatial_dims = (find_dim(data_mslp, LAT_NAMES), find_dim(data_mslp, LON_NAMES))
+    lat_dim, lon_dim = spatial_dims[0], spatial_dims[-1]
+    data_mslp = data_mslp.transpose("time", ..., *spatial_dims)
+    packing = packing_of(data_mslp)
+    scale = packing.scale_factor if packing is not None else None
+    for block in blocks:
+        if tiles is not None:
+            shape = (len(block.time),) + data_mslp.shape[1:-2]
+            lwt = np.full(shape + (classifier.shape[0] * classifier.shape[1],), np.nan)
+            classify_tiles(lambda tile: _read_block(data_mslp, block, packing,
+                                                    **{lat_dim: tile.rows, lon_dim: tile.cols}),
+                           tiles, lwt, workers=workers, scale=scale)
+            yield block, lwt.reshape(shape + classifier.shape)
+            continue
+
+        values = _read_block(data_mslp, block, packing)
+        if regrid is not None:
+            values = apply_regrid(regrid, values, classifier.grid_shape)
+        yield block, classifier.classify_array(values, scale)
+
+
+def classify_in_blocks(data_mslp: xr.DataArray, classifier: JCClassifier = None,
+                       block_size: int = None, resample=None, target_grid=None,
+                       max_memory=None, dry_run: bool = False, tile_shape: tuple = None,
+                       workers: int = 1, prefetch: int = 0, out=None,
+                       stats: PipelineStats = None) -> Union[xr.DataArray, MemoryPlan]:
+    """
+    Computes the circulation types reading and classifying the input one time block at a
+    time, with an optional temporal reduction applied to each block as it is read.
+
+    Only one block of input fields is held in memory at a time, which keeps e.g. hourly
+    data from being loaded in full when daily circulation types are wanted. Packed integer
+    input (e.g. int16 opened with `mask_and_scale=False`) is not decoded: the stencil
+    differences are computed from the raw values in float32 and only the flow and vorticity
+    terms are scaled (see `JCClassifier.classify_array`).
+
+    Args:
+        data_mslp (xr.DataArray): MSLP data with a "time" dimension (can be lazily loaded).
+        classifier (JCClassifier, optional): Classifier for the grid of `data_mslp`.
+        block_size (int, optional): Maximum number of input time steps per block.
+        resample (int or str, optional): Temporal reduction (see `plan_blocks`).
+        target_grid (xr.DataArray or xr.Dataset, optional): Grid to interpolate the input to
+            before classification, with latitude and longitude coordinates. The bilinear
+            weights are computed once per (source grid, target grid) pair and cached on disk.
+            `classifier`, if given, must be built on this grid.
+        max_memory (int or str, optional): Memory budget of the run, e.g. "4GB". The block
+            size is chosen so that the estimated peak memory stays within it (see `plan_memory`).
+        dry_run (bool, optional): Only plan the run and return the `MemoryPlan` (default: False).
+        tile_shape (tuple, optional): Classify the grid in tiles of at most (latitude, longitude)
+            cells, each reading only the input it needs (see `plan_tiles`). Cannot be combined
+            with `target_grid`.
+        workers (int, optional): Number of tiles classified in parallel threads (default: 1).
+        prefetch (int, optional): Number of blocks read ahead on a background thread while
+            the current block is classified (see `stream_blocks`). 0 (default) reads every
+            block when it is needed. Cannot be combined with `tile_shape`.
+        out (callable, optional): Writes the result block by block instead of holding it in
+            memory. Called once with the output template (the coordinates and attributes of
+            the result, without values); it returns the array-like (e.g. a netCDF4 variable)
+            every block is assigned to, as `array[start:stop] = codes`. With `prefetch`, the
+            assignments run on the background writer thread, overlapping the disk writes with
+            the classification of the next block.
+        stats (PipelineStats, optional): Filled in with the read, classify and write throughput
+            of the `prefetch` pipeline.
+
+    Returns:
+        xr.DataArray: Circulation types, as returned by `compute_cts`, or the `MemoryPlan`
+            if `dry_run`. With `out`, the template.
+    """
+    lat_dim, lon_dim = find_dim(data_mslp, LAT_NAMES), find_dim(data_mslp, LON_NAMES)
+    if tile_shape is not None and (target_grid is not None or prefetch):
+        raise ValueError("tile_shape cannot be combined with target_grid or prefetch.")
+    regrid = None
+    if target_grid is not None:
+        template = target_template(target_grid)
+        regrid = regrid_weights(data_mslp[lat_dim].values, data_mslp[lon_dim].values,
+                                template[template.dims[0]].values, template[template.dims[1]].values)
+        if classifier is None:
+            classifier = JCClassifier(template)
+    elif classifier is None:
+        classifier = JCClassifier(data_mslp)
+
+    data_mslp = data_mslp.transpose("time", ..., lat_dim, lon_dim)
+    packing = packing_of(data_mslp)
+    if packing is not None:
+        logger.info(f"Classifying packed {data_mslp.dtype} values (scale_factor={packing.scale_factor}).")
+    if max_memory is not None or dry_run:
+        plan = plan_memory(data_mslp.rename({lat_dim: "latitude", lon_dim: "longitude"}), classifier,
+                           max_memory=max_memory, block_size=block_size, resample=resample, regrid=regrid,
+                           prefetch=prefetch, streamed=out is not None)
+        logger.info(f"Memory plan: {plan}.")
+        if dry_run:
+            return plan
+        block_size = plan.block_size
+    blocks = plan_blocks(data_mslp.time, block_size, resample)
+    n_time = sum(len(block.time) for block in blocks)
+    other_dims = data_mslp.dims[1:-2]
+    shape = (n_time,) + data_mslp.shape[1:-2] + classifier.shape
+
+    time = np.concatenate([block.time for block in blocks]) if blocks else data_mslp.time.values[:0]
+    coords = {"time": time}
+    coords.update({dim: data_mslp[dim] for dim in other_dims if dim in data_mslp.coords})
+    coords["latitude"] = classifier.latitude
+    coords["longitude"] = classifier.longitude
+    dims = ("time",) + other_dims + ("latitude", "longitude")
+    if out is not None:
+        # Read-only NaN values that take no memory
+        result = enhance_and_validate_dataarray(
+            xr.DataArray(np.broadcast_to(np.float64(np.nan), shape), coords=coords, dims=dims))
+        lwt = out(result)
+    else:
+        lwt = np.empty(shape)
+
+    logger.info(f"Classifying {n_time} time steps in {len(blocks)} blocks.")
+    if prefetch:
+        offsets = np.cumsum([0] + [len(block.time) for block in blocks])
+
+        def classify(values):
+            if regrid is not None:
+                values = apply_regrid(regrid, values, classifier.grid_shape)
+            return classifier.classify_array(values, packing.scale_factor if packing is not None else None)
+
+        def write(item, block_lwt):
+            lwt[offsets[item[0]]:offsets[item[0] + 1]] = block_lwt
+
+        stream_blocks(lambda item: _read_block(data_mslp, item[1], packing), classify, write,
+                      list(enumerate(blocks)), depth=prefetch, stats=stats)
+    else:
+        position = 0
+        tiles = plan_tiles(classifier, tile_shape) if tile_shape is not None else None
+        for block, block_lwt in iter_blocks(data_mslp, classifier, blocks, regrid=regrid, tiles=tiles,
+                                            workers=workers):
+            lwt[position:position + len(block.time)] = block_lwt
+            position += len(block.time)
+
+    if out is not None:
+        return result
+    return enhance_and_validate_dataarray(xr.DataArray(lwt, coords=coords, dims=dims))
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from .functions.chunks import time_chunks
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+EARTH_RADIUS = 6371.0  # km
+
+# Number of time steps labelled at once
+REGION_CHUNK_SIZE = 365
+
+
+def _components(n_nodes: int, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Returns the connected component of every node of the graph with edges (first, second),
+    numbered so that node 0 (the background) stays in component 0.
+    """
+    graph = coo_matrix((np.ones(first.size, dtype=np.int8), (first, second)), shape=(n_nodes, n_nodes))
+    _, component = connected_components(graph, directed=False)
+    background = component[0]
+    swap = np.arange(component.max() + 1)
+    swap[[0, background]] = swap[[background, 0]]
+    return swap[component]
+
+
+def label_regions(mask: np.ndarray, wrap: bool = False, connectivity: int = 1) -> tuple:
+    """
+    Labels the connected regions of boolean fields, every field (leading index) separately.
+
+    All fields are labelled with one `ndimage.label` call, with a structuring element that
+    only connects cells within the same field. On global grids, regions touching both ends
+    of the longitude axis are then joined.
+
+    Args:
+        mask (np.ndarray): Cells belonging to a region, shape (..., nlat, nlon).
+        wrap (bool, optional): Join the first and last longitude columns (default: False).
+        connectivity (int, optional): 1 to connect the 4 edge neighbours of a cell, 2 to also
+            connect the diagonal ones (default: 1).
+
+    Returns:
+        tuple: (labels, n) with the region of every cell (0 outside regions, 1..n inside,
+            unique over all fields) and the number of regions.
+    """
+    if connectivity not in (1, 2):
+        raise ValueError("connectivity must be 1 or 2.")
+    mask = np.asarray(mask, dtype=bool)
+    leading = mask.shape[:-2]
+    fields = mask.reshape((-1,) + mask.shape[-2:])
+    structure = np.zeros((3, 3, 3), dtype=bool)
+    structure[1] = ndimage.generate_binary_structure(2, connectivity)
+    labels, n = ndimage.label(fields, structure=structure)
+
+    if wrap and n:
+        east, west = labels[:, :, -1], labels[:, :, 0]
+        pairs = [(east, west)]
+        if connectivity == 2:
+            pairs += [(east[:, :-1], west[:, 1:]), (east[:, 1:], west[:, :-1])]
+        first = np.concatenate([a[(a > 0) & (b > 0)] for a, b in pairs])
+        second = np.concatenate([b[(a > 0) & (b > 0)] for a, b in pairs])
+        if first.size:
+            component = _components(n + 1, first, second)
+            labels = component[labels]
+            n = int(component.max())
+
+    return labels.reshape(leading + mask.shape[-2:]), n
+
+
+def _is_periodic(longitude: np.ndarray) -> bool:
+    """Whether a regular longitude axis covers the whole globe."""
+    if longitude.size < 2:
+        return False
+    step = abs(float(np.median(np.diff(longitude))))
+    return abs(longitude.size * step - 360) < step / 2
+
+
+class RegionTracker:
+    """
+    Labels the regions of every time step and links them through time, fed one block of
+    time steps at a time. Only the labels of the last time step are kept between blocks,
+    so memory does not grow with the length of the archive.
+
+    A region continues the track of the region of the previous time step it overlaps most.
+    When several regions continue the same track (a split), the one with the largest overlap
+    keeps it and the others start new tracks.
+
+    Args:
+        latitude (np.ndarray): Latitudes of the grid.
+        longitude (np.ndarray): Longitudes of the grid.
+        wrap (bool, optional): Join regions across the date line (default: whether the
+            longitudes cover the globe).
+        connectivity (int, optional): See `label_regions` (default: 1).
+        min_size (int, optional): Regions with fewer cells are ignored (default: 1).
+    """
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, wrap: bool = None,
+                 connectivity: int = 1, min_size: int = 1):
+        latitude, longitude = np.asarray(latitude, dtype=float), np.asarray(longitude, dtype=float)
+        self.wrap = _is_periodic(longitude) if wrap is None else wrap
+        self.connectivity = connectivity
+        self.min_size = min_size
+
+        # Area (km²) and centroid terms of every cell
+        dlat = np.deg2rad(np.abs(np.gradient(latitude))) if latitude.size > 1 else np.ones(1)
+        dlon = np.deg2rad(np.abs(np.gradient(longitude))) if longitude.size > 1 else np.ones(1)
+        area = EARTH_RADIUS**2 * np.outer(np.cos(np.deg2rad(latitude)) * dlat, dlon)
+        lat2d, lon2d = np.meshgrid(latitude, np.deg2rad(longitude), indexing="ij")
+        self._weights = np.stack([np.ones(area.size), area.ravel(), (area * lat2d).ravel(),
+                                  (area * np.cos(lon2d)).ravel(), (area * np.sin(lon2d)).ravel()])
+
+        self._previous = None  # labels of the last time step, as track ids
+        self._next_track = 1
+
+    def update(self, mask: np.ndarray, time: np.ndarray) -> pd.DataFrame:
+        """
+        Adds the next time steps.
+
+        Args:
+            mask (np.ndarray): Cells belonging to a region, shape (n, nlat, nlon).
+            time (np.ndarray): Time of every step, shape (n,).
+
+        Returns:
+            pd.DataFrame: One row per region, see `track_regions`.
+        """
+        n, n_lat, n_lon = mask.shape
+        cells = n_lat * n_lon
+        labels, n_regions = label_regions(mask, wrap=self.wrap, connectivity=self.connectivity)
+        labels = labels.reshape(n, cells)
+
+        # Size, area and centroid terms of every region, and its time step
+        step_of_cell, cell = np.nonzero(labels)
+        region = labels[step_of_cell, cell]
+        sums = np.stack([np.bincount(region, weights=w[cell], minlength=n_regions + 1) for w in self._weights])
+        step = np.zeros(n_regions + 1, dtype=np.intp)
+        step[region] = step_of_cell
+
+        keep = sums[0] >= self.min_size
+        keep[0] = False
+        renumber = np.where(keep, np.cumsum(keep), 0)
+        labels = renumber[labels]
+        sums, step = sums[:, keep], step[keep]
+        n_regions = int(keep.sum())
+
+        track = self._link(labels, n_regions, step)
+        self._previous = np.where(labels[-1] > 0, np.r_[0, track][labels[-1]], 0) if n else self._previous
+
+        count, area, lat_area, cos_area, sin_area = sums
+        return pd.DataFrame({
+            "time": np.asarray(time)[step],
+            "track": track,
+            "cells": count.astype(np.int64),
+            "area": area,
+            "latitude": lat_area / area,
+            "longitude": np.rad2deg(np.arctan2(sin_area, cos_area)),
+        })
+
+    def _link(self, labels: np.ndarray, n_regions: int, step: np.ndarray) -> np.ndarray:
+        """
+        Returns the track id of every region, linking consecutive time steps by overlap.
+        Regions of the block are the nodes 1..n_regions; the tracks of the last time step of
+        the previous block enter as the following nodes.
+        """
+        carried = np.array([], dtype=np.int64)
+        steps = labels
+        if self._previous is not None:
+            carried = np.unique(self._previous[self._previous > 0])
+            previous = np.where(self._previous > 0, n_regions + 1 + np.searchsorted(carried, self._previous), 0)
+            steps = np.concatenate([previous[None], labels])
+        n_nodes = n_regions + 1 + carried.size
+
+        before, after = steps[:-1].ravel(), steps[1:].ravel()
+        both = (before > 0) & (after > 0)
+        pairs, overlap = np.unique(before[both].astype(np.int64) * n_nodes + after[both], return_counts=True)
+        parent, child = np.divmod(pairs, n_nodes)
+
+        # Every child keeps its largest overlap, then every parent its largest child
+        order = np.lexsort((-overlap, child))
+        first = np.r_[True, child[order][1:] != child[order][:-1]]
+        parent, child, overlap = parent[order][first], child[order][first], overlap[order][first]
+        order = np.lexsort((-overlap, parent))
+        first = np.r_[True, parent[order][1:] != parent[order][:-1]]
+        parent, child = parent[order][first], child[order][first]
+
+        # Linked regions form chains, one per track
+        component = _components(n_nodes, parent, child)
+        track_of_component = np.zeros(component.max() + 1, dtype=np.int64)
+        track_of_component[component[n_regions + 1:]] = carried
+        regions = component[1:n_regions + 1]
+        new = track_of_component[regions] == 0
+        # New tracks are numbered in order of their first time step
+        order = np.argsort(step[new], kind="stable")
+        _, first = np.unique(regions[new][order], return_index=True)
+        new_components = regions[new][order][np.sort(first)]
+        track_of_component[new_components] = np.arange(self._next_track, self._next_track + new_components.size)
+        self._next_track += new_components.size
+        return track_of_component[regions]
+
+
+def track_regions(cts: xr.DataArray, types=20, wrap: bool = None, connectivity: int = 1,
+                  min_size: int = 1, chunk_size: int = REGION_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Finds the connected regions of given circulation types at every time step (e.g. cyclonic
+    or anticyclonic areas) and tracks them through time by overlap.
+
+    The archive is read in chunks of time steps; every chunk is labelled with one
+    `ndimage.label` call (see `label_regions`) and only the labels of its last time step are
+    kept for linking to the next chunk (see `RegionTracker`).
+
+    Args:
+        cts (xr.DataArray): Circulation types with dimensions ("time", "latitude", "longitude").
+        types (int or list, optional): Circulation type codes forming the regions (default: 20,
+            cyclonic). E.g. [20, 21, ..., 28] for all cyclonic types.
+        wrap (bool, optional): Join regions across the date line (default: on global grids).
+        connectivity (int, optional): 1 for edge neighbours only, 2 to include diagonal
+            neighbours (default: 1).
+        min_size (int, optional): Minimum number of cells of a region (default: 1).
+        chunk_size (int, optional): Number of time steps read at once.
+
+    Returns:
+        pd.DataFrame: One row per region and time step, with the columns
+            - time: time step of the region.
+            - track: id of the track the region belongs to.
+            - cells: number of grid cells.
+            - area: area in km².
+            - latitude, longitude: area-weighted centroid (longitude as a circular mean).
+
+    Example:
+        >>> from jcclass.compute import track_regions, summarize_tracks
+        >>> regions = track_regions(cts, types=20, min_size=4)
+        >>> tracks = summarize_tracks(regions)
+    """
+    if set(cts.dims) != {"time", "latitude", "longitude"}:
+        raise ValueError(f"The circulation types must have the dimensions time, latitude and longitude. "
+                         f"Found: {', '.join(cts.dims)}.")
+    cts = cts.transpose("time", "latitude", "longitude")
+    tracker = RegionTracker(cts.latitude.values, cts.longitude.values, wrap=wrap,
+                            connectivity=connectivity, min_size=min_size)
+    types = np.atleast_1d(types)
+    shape = cts.shape[1:]
+
+    logger.info(f"Tracking regions of types {types.tolist()} over {cts.sizes['time']} time steps.")
+    tables = []
+    start = 0
+    for chunk in time_chunks(cts, chunk_size):
+        n = chunk.shape[0]
+        mask = np.isin(chunk, types).reshape((n,) + shape)
+        tables.append(tracker.update(mask, cts.time.values[start:start + n]))
+        start += n
+    return pd.concat(tables, ignore_index=True) if tables else tracker.update(
+        np.zeros((0,) + shape, dtype=bool), cts.time.values[:0])
+
+
+def summarize_tracks(regions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarizes the regions of `track_regions` per track.
+
+    Returns:
+        pd.DataFrame: Indexed by track, with the columns start, end (first and last time),
+            steps (number of time steps), max_area, mean_area and the mean centroid latitude
+            and longitude (circular mean).
+    """
+    lon = np.deg2rad(regions.longitude)
+    grouped = regions.assign(cos=np.cos(lon), sin=np.sin(lon)).groupby("track")
+    summary = grouped.agg(start=("time", "min"), end=("time", "max"), steps=("time", "size"),
+                          max_area=("area", "max"), mean_area=("area", "mean"),
+                          latitude=("latitude", "mean"), cos=("cos", "mean"), sin=("sin", "mean"))
+    summary["longitude"] = np.rad2deg(np.arctan2(summary.pop("sin"), summary.pop("cos")))
+    return summary
@@ -0,0 +1,148 @@
+import numpy as np
+import xarray as xr
+from .functions.kernels import ct_positions, type_codes
+from .functions.chunks import time_chunks, spatial_coords
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+# Number of time steps read at once; the cumulative counts of a chunk take
+# (chunk + longest window) x types x cells x 4 bytes
+ROLLING_CHUNK_SIZE = 365
+
+
+class RollingCounter:
+    """
+    Trailing-window frequencies of circulation types from cumulative counts, fed one block
+    of time steps at a time.
+
+    For every type, the number of occurrences since the start of the record is accumulated
+    along time once; the count in a window ending at step t is then cum[t] - cum[t - window],
+    for any number of windows at the same cost. The cumulative counts of the last
+    `max(windows)` steps are carried from one block to the next, so the result does not
+    depend on how the record is split into blocks.
+
+    Args:
+        windows (tuple): Window lengths in time steps, e.g. (30, 90) for daily data.
+        types (np.ndarray): Positions (see `ct_positions`) of the types to count.
+        min_periods (int, optional): Minimum number of classified steps in a window for a
+            frequency to be computed (default: the window length, as `xarray` rolling).
+
+    Example:
+        >>> counter = RollingCounter((30, 90), np.arange(27))
+        >>> for block in blocks:
+        ...     frequencies = counter.update(ct_positions(block))
+    """
+
+    def __init__(self, windows: tuple, types: np.ndarray, min_periods: int = None):
+        self.windows = tuple(int(window) for window in windows)
+        if not self.windows or min(self.windows) < 1:
+            raise ValueError("Windows must be positive integers.")
+        if min_periods is not None and min_periods < 1:
+            raise ValueError("min_periods must be a positive integer.")
+        self.types = np.asarray(types, dtype=np.intp)
+        self.min_periods = min_periods
+        self._history = None
+
+    def update(self, positions: np.ndarray) -> dict:
+        """
+        Adds the next time steps and returns their trailing-window frequencies.
+
+        Args:
+            positions (np.ndarray): Type positions of the next time steps, shape (n, ncells),
+                -1 where unclassified.
+
+        Returns:
+            dict: For every window, the relative frequency of every type in the window ending
+                at every step, shape (n, ntypes, ncells) as float32. NaN where the window has
+                fewer than `min_periods` classified steps.
+        """
+        n, cells = positions.shape
+        longest = max(self.windows)
+        if self._history is None:
+            # Cumulative counts before the record starts are zero
+            self._history = np.zeros((longest, self.types.size + 1, cells), dtype=np.int32)
+        history = self._history
+
+        # Cumulative counts of every type, and of classified steps (last row)
+        cumulative = np.empty((longest + n, self.types.size + 1, cells), dtype=np.int32)
+        cumulative[:longest] = history
+        for k, position in enumerate(self.types):
+            np.cumsum(positions == position, axis=0, dtype=np.int32, out=cumulative[longest:, k])
+        np.cumsum(positions >= 0, axis=0, dtype=np.int32, out=cumulative[longest:, -1])
+        cumulative[longest:] += history[-1]
+
+        frequencies = {}
+        for window in self.windows:
+            counts = cumulative[longest:] - cumulative[longest - window:longest - window + n]
+            classified = counts[:, -1:]
+            needed = window if self.min_periods is None else min(self.min_periods, window)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                frequency = np.divide(counts[:, :-1], classified, dtype=np.float32)
+            frequency[np.broadcast_to(classified < needed, frequency.shape)] = np.nan
+            frequencies[window] = frequency
+
+        self._history = cumulative[-longest:].copy()
+        return frequencies
+
+
+def rolling_frequencies(cts: xr.DataArray, windows=(30, 90), types=None, eleven: bool = False,
+                        min_periods: int = None, chunk_size: int = ROLLING_CHUNK_SIZE) -> xr.Dataset:
+    """
+    Computes running frequencies of circulation types in trailing windows, cell by cell.
+
+    Equivalent to `(cts == code).where(cts.notnull()).rolling(time=window).mean()` for every
+    type and window, but the archive is read once, in chunks of time steps, and every window
+    comes from a difference of cumulative counts (see `RollingCounter`).
+
+    Args:
+        cts (xr.DataArray): Circulation types (27 types) with a "time" dimension.
+        windows (int or tuple, optional): Window lengths in time steps (default: (30, 90)).
+        types (list, optional): Codes of the types to return (default: all types). Fewer types
+            take proportionally less memory and time.
+        eleven (bool, optional): Use the 11 reduced types; `types` are then reduced codes
+            (default: False).
+        min_periods (int, optional): Minimum number of classified steps in a window (default:
+            the window length).
+        chunk_size (int, optional): Number of time steps read at once.
+
+    Returns:
+        xr.Dataset: A variable "frequency_<window>" per window with dimensions ("time", "ct",
+            ...), as float32.
+
+    Example:
+        >>> from jcclass.compute import rolling_frequencies
+        >>> running = rolling_frequencies(cts, windows=(30, 90), types=[0, 20])
+        >>> running.frequency_90.sel(ct=20)
+    """
+    if "time" not in cts.dims:
+        raise ValueError("The circulation types must have a 'time' dimension.")
+    windows = (windows,) if np.isscalar(windows) else tuple(windows)
+    codes = type_codes(eleven)
+    if types is not None:
+        types = np.atleast_1d(types)
+        unknown = np.setdiff1d(types, codes)
+        if unknown.size:
+            raise ValueError(f"Unknown circulation types: {unknown.tolist()}.")
+        codes = codes[np.isin(codes, types)]
+    cts = cts.transpose("time", ...)
+
+    counter = RollingCounter(windows, np.flatnonzero(np.isin(type_codes(eleven), codes)), min_periods)
+    logger.info(f"Computing {len(windows)} running frequencies of {codes.size} types over "
+                f"{cts.sizes['time']} time steps.")
+    results = {window: [] for window in windows}
+    for chunk in time_chunks(cts, chunk_size):
+        for window, frequency in counter.update(ct_positions(chunk, eleven=eleven)).items():
+            results[window].append(frequency)
+
+    dims = ("time", "ct") + cts.dims[1:]
+    shape = (cts.sizes["time"], codes.size) + cts.shape[1:]
+    variables = {}
+    for window, chunks in results.items():
+        frequency = np.concatenate(chunks) if chunks else np.empty((0, codes.size, 0), dtype=np.float32)
+        variables[f"frequency_{window}"] = (dims, frequency.reshape(shape))
+    running = xr.Dataset(variables, coords={"time": cts.time, "ct": codes, **spatial_coords(cts)})
+    for window in windows:
+        running[f"frequency_{window}"].attrs["long_name"] = f"Relative frequency in the last {window} time steps"
+    return running
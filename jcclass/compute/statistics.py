@@ -0,0 +1,231 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import xarray as xr
+from .functions.chunks import CHUNK_SIZE, time_chunks, spatial_coords
+from .functions.kernels import ct_positions, count_types, type_codes
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+# Number of bootstrap resamples evaluated together
+RESAMPLE_BATCH = 50
+
+# Memory budget of the block counts of one chunk of cells in `compare_periods`
+BOOTSTRAP_CHUNK_BYTES = 256 * 2**20
+
+# Shared memory block of pooled counts attached by a bootstrap worker process
+_SHARED_COUNTS = None
+
+
+def block_type_counts(cts: xr.DataArray, block_length: int, eleven: bool = False,
+                      out: np.ndarray = None) -> np.ndarray:
+    """
+    Counts the circulation types of every cell in consecutive blocks of time steps,
+    streaming over the archive.
+
+    Args:
+        cts (xr.DataArray): Circulation types with a "time" dimension (27 types).
+        block_length (int): Number of time steps per block. The last block may be shorter.
+        eleven (bool, optional): Count the 11 reduced types instead (default: False).
+        out (np.ndarray, optional): Array of shape (nblocks, ntypes, ncells) to write into.
+
+    Returns:
+        np.ndarray: Counts with shape (nblocks, ntypes, ncells), as float32.
+    """
+    n_types = type_codes(eleven).size
+    n_blocks = -(-cts.sizes["time"] // block_length)
+    if out is None:
+        out = np.empty((n_blocks, n_types, int(np.prod(cts.shape[1:], dtype=np.int64))), dtype=np.float32)
+    chunk_size = max(CHUNK_SIZE // block_length, 1) * block_length
+    block = 0
+    for chunk in time_chunks(cts, chunk_size):
+        positions = ct_positions(chunk, eleven=eleven)
+        for start in range(0, positions.shape[0], block_length):
+            out[block] = count_types(positions[start:start + block_length], n_types)
+            block += 1
+    return out
+
+
+def _shared_counts(name: str, shape: tuple) -> np.ndarray:
+    """
+    Returns the pooled block counts the parent process placed in shared memory, attaching
+    to the block once per worker process.
+    """
+    global _SHARED_COUNTS
+    if _SHARED_COUNTS is None or _SHARED_COUNTS[0].name != name:
+        if _SHARED_COUNTS is not None:
+            _SHARED_COUNTS[0].close()
+        memory = shared_memory.SharedMemory(name=name)
+        _SHARED_COUNTS = (memory, np.ndarray(shape, dtype=np.float32, buffer=memory.buf))
+    return _SHARED_COUNTS[1]
+
+
+def _bootstrap_exceedances(n_blocks: tuple, observed: np.ndarray, n_resamples: int, seed,
+                           block_counts=None) -> np.ndarray:
+    """
+    Draws `n_resamples` pairs of pseudo-periods from the pooled blocks and counts, for every
+    type and cell, how often the absolute frequency difference reaches the observed one.
+    `block_counts` is the array of pooled counts, or the (name, shape) of a shared memory
+    block holding it.
+    """
+    if isinstance(block_counts, tuple):
+        block_counts = _shared_counts(*block_counts)
+    rng = np.random.default_rng(seed)
+    n_pooled = block_counts.shape[0]
+    flat = block_counts.reshape(n_pooled, -1)
+    exceedances = np.zeros(observed.shape, dtype=np.int64)
+
+    for start in range(0, n_resamples, RESAMPLE_BATCH):
+        batch = min(RESAMPLE_BATCH, n_resamples - start)
+        frequencies = []
+        for n in n_blocks:
+            draws = rng.integers(0, n_pooled, size=(batch, n))
+            # Number of times every pooled block is drawn, so sums become one matrix product
+            selection = np.zeros((batch, n_pooled), dtype=np.float32)
+            np.add.at(selection, (np.arange(batch)[:, None], draws), 1)
+            counts = (selection @ flat).reshape((batch,) + block_counts.shape[1:])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                frequencies.append(counts / counts.sum(axis=1, keepdims=True))
+        difference = frequencies[1] - frequencies[0]
+        exceedances += (np.abs(difference) >= np.abs(observed)).sum(axis=0)
+
+    return exceedances
+
+
+def _cell_chunks(cts: xr.DataArray, n_pooled: int, n_types: int, chunk_cells: int = None) -> list:
+    """
+    Splits the grid into ranges of its first spatial dimension holding about `chunk_cells`
+    cells, by default as many as keep the pooled block counts and the resample batches of a
+    chunk within `BOOTSTRAP_CHUNK_BYTES`.
+    """
+    if cts.ndim == 1:
+        return [{}]
+    dim = cts.dims[1]
+    row_cells = int(np.prod(cts.shape[2:], dtype=np.int64))
+    if chunk_cells is None:
+        cell_bytes = n_types * (4 * n_pooled + 8 * 4 * RESAMPLE_BATCH)
+        chunk_cells = BOOTSTRAP_CHUNK_BYTES // cell_bytes
+    rows = max(int(chunk_cells) // row_cells, 1)
+    return [{dim: slice(start, start + rows)} for start in range(0, cts.sizes[dim], rows)]
+
+
+def compare_periods(cts_a: xr.DataArray, cts_b: xr.DataArray, n_resamples: int = 1000,
+                    block_length: int = 10, eleven: bool = False, workers: int = 1,
+                    seed: int = None, chunk_cells: int = None) -> xr.Dataset:
+    """
+    Compares the circulation type frequencies of two periods cell by cell, with a block
+    bootstrap significance test.
+
+    Both archives are read in chunks and reduced to type counts per block of `block_length`
+    time steps. Under the null hypothesis of no change, pseudo-periods of the original
+    lengths are drawn with replacement from the pooled blocks; the p-value is the fraction
+    of resamples whose absolute frequency difference is at least the observed one. All types
+    are resampled at once, as matrix products of block selections and block counts.
+
+    The test is independent per cell, so the grid is processed in chunks of cells (whole
+    rows of the first spatial dimension) that reuse the same draws: only the block counts of
+    one chunk are held at a time, and the result does not depend on the chunk size. With
+    `workers`, the block counts are shared with the worker processes through shared memory.
+
+    Args:
+        cts_a (xr.DataArray): Circulation types of the reference period (e.g. historical).
+        cts_b (xr.DataArray): Circulation types of the other period (e.g. a scenario). Must be
+            on the same grid as `cts_a`.
+        n_resamples (int, optional): Number of bootstrap resamples (default: 1000).
+        block_length (int, optional): Time steps per bootstrap block, to keep the persistence
+            of circulation types (default: 10).
+        eleven (bool, optional): Compare the 11 reduced types (default: False).
+        workers (int, optional): Number of processes used for the resamples (default: 1).
+        seed (int, optional): Seed of the random generator, for reproducible p-values.
+        chunk_cells (int, optional): Approximate number of cells bootstrapped at once
+            (default: as many as fit in `BOOTSTRAP_CHUNK_BYTES`).
+
+    Returns:
+        xr.Dataset: Dataset with a "ct" dimension and the variables
+            - frequency_a, frequency_b: relative frequency of each type in each period.
+            - difference: frequency_b - frequency_a.
+            - p_value: bootstrap p-value of the difference.
+
+    Example:
+        >>> from jcclass.compute import compare_periods
+        >>> change = compare_periods(cts.sel(time=slice("1981", "2010")), cts.sel(time=slice("2071", "2100")))
+        >>> significant = change.difference.where(change.p_value < 0.05)
+    """
+    if block_length < 1 or n_resamples < 1:
+        raise ValueError("block_length and n_resamples must be positive integers.")
+    cts_a = cts_a.transpose("time", ...)
+    cts_b = cts_b.transpose("time", ...)
+    if cts_a.dims[1:] != cts_b.dims[1:] or cts_a.shape[1:] != cts_b.shape[1:]:
+        raise ValueError("Both periods must have the same dimensions and grid.")
+
+    n_types = type_codes(eleven).size
+    n_blocks = (-(-cts_a.sizes["time"] // block_length), -(-cts_b.sizes["time"] // block_length))
+    n_pooled = sum(n_blocks)
+    tasks = -(-n_resamples // RESAMPLE_BATCH)
+    sizes = [min(RESAMPLE_BATCH, n_resamples - i * RESAMPLE_BATCH) for i in range(tasks)]
+    seeds = np.random.SeedSequence(seed).spawn(tasks)
+    chunks = _cell_chunks(cts_a, n_pooled, n_types, chunk_cells)
+
+    logger.info(f"Drawing {n_resamples} bootstrap resamples in {len(chunks)} chunks of cells.")
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    results = []
+    try:
+        for chunk in chunks:
+            chunk_a, chunk_b = cts_a.isel(chunk), cts_b.isel(chunk)
+            cells = int(np.prod(chunk_a.shape[1:], dtype=np.int64))
+            shape = (n_pooled, n_types, cells)
+            memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 4, 1)) \
+                if executor is not None else None
+            try:
+                pooled = np.ndarray(shape, dtype=np.float32, buffer=memory.buf) if memory is not None \
+                    else np.empty(shape, dtype=np.float32)
+                # Both periods are counted straight into the pooled array
+                counts_a = block_type_counts(chunk_a, block_length, eleven=eleven, out=pooled[:n_blocks[0]])
+                counts_b = block_type_counts(chunk_b, block_length, eleven=eleven, out=pooled[n_blocks[0]:])
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    frequency_a = counts_a.sum(axis=0) / counts_a.sum(axis=(0, 1))
+                    frequency_b = counts_b.sum(axis=0) / counts_b.sum(axis=(0, 1))
+                observed = frequency_b - frequency_a
+
+                if executor is None:
+                    exceedances = sum(_bootstrap_exceedances(n_blocks, observed, size, task_seed, pooled)
+                                      for size, task_seed in zip(sizes, seeds))
+                else:
+                    exceedances = sum(executor.map(_bootstrap_exceedances, [n_blocks] * tasks,
+                                                   [observed] * tasks, sizes, seeds,
+                                                   [(memory.name, shape)] * tasks))
+            finally:
+                if memory is not None:
+                    # Views of the shared buffer must be released before closing it
+                    pooled = counts_a = counts_b = None
+                    memory.close()
+                    memory.unlink()
+            p_value = np.where(np.isnan(observed), np.nan, (exceedances + 1) / (n_resamples + 1))
+            results.append((frequency_a, frequency_b, observed, p_value))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    spatial_shape = cts_a.shape[1:]
+    dims = ("ct",) + cts_a.dims[1:]
+    shape = (-1,) + spatial_shape
+    # Chunks are ranges of the first spatial dimension, i.e. consecutive flattened cells
+    frequency_a, frequency_b, observed, p_value = (np.concatenate(values, axis=1) for values in zip(*results))
+    comparison = xr.Dataset(
+        {
+            "frequency_a": (dims, frequency_a.reshape(shape)),
+            "frequency_b": (dims, frequency_b.reshape(shape)),
+            "difference": (dims, observed.reshape(shape)),
+            "p_value": (dims, p_value.reshape(shape)),
+        },
+        coords={"ct": type_codes(eleven), **spatial_coords(cts_a)},
+    )
+    comparison["difference"].attrs["long_name"] = "Change in relative frequency (b - a)"
+    comparison["p_value"].attrs["long_name"] = "Block bootstrap p-value of the change"
+    comparison.attrs["n_resamples"] = n_resamples
+    comparison.attrs["block_length"] = block_length
+
+    return comparison
@@ -0,0 +1,219 @@
+import queue
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+# Marks the end of a stage queue
+_DONE = object()
+
+# Seconds between checks for a stopped pipeline while waiting on a full queue
+_POLL = 0.1
+
+
+class StageCounter:
+    """
+    Throughput counters of one pipeline stage.
+
+    Attributes:
+        items (int): Number of blocks processed.
+        nbytes (int): Number of bytes produced.
+        seconds (float): Time spent working (not waiting on the other stages).
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.nbytes = 0
+        self.seconds = 0.0
+
+    def record(self, nbytes: int, seconds: float) -> None:
+        self.items += 1
+        self.nbytes += int(nbytes)
+        self.seconds += seconds
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second of working time."""
+        return self.nbytes / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (f"{self.items} blocks, {self.nbytes / 2**20:.1f} MiB in {self.seconds:.2f} s "
+                f"({self.throughput / 2**20:.1f} MiB/s)")
+
+
+class PipelineStats:
+    """
+    Counters of the read, classify and write stages of a streamed run, and the wall time.
+    """
+
+    def __init__(self):
+        self.read = StageCounter()
+        self.classify = StageCounter()
+        self.write = StageCounter()
+        self.wall_seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (f"read: {self.read}; classify: {self.classify}; write: {self.write}; "
+                f"wall time {self.wall_seconds:.2f} s")
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Puts `item` on a bounded queue, giving up if the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def prefetch(read, items, depth: int = 2, counter: StageCounter = None):
+    """
+    Yields `(item, read(item))` for every item, reading ahead on a background thread so
+    that up to `depth` items are ready while the caller processes the current one.
+
+    Reading NetCDF data (I/O and decompression) releases the GIL, so it overlaps with the
+    classification of the previous block. Errors raised by `read` are re-raised here.
+
+    Args:
+        read (callable): Returns the data of an item, e.g. the MSLP values of a time block.
+        items (iterable): Items to read, in order.
+        depth (int, optional): Maximum number of items read ahead (default: 2).
+        counter (StageCounter, optional): Counter of the read stage.
+
+    Yields:
+        tuple: (item, data).
+    """
+    if depth < 1:
+        raise ValueError("The prefetch depth must be a positive integer.")
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def reader():
+        try:
+            for item in items:
+                start = time.perf_counter()
+                data = read(item)
+                if counter is not None:
+                    counter.record(getattr(data, "nbytes", 0), time.perf_counter() - start)
+                if not _put(ready, (item, data), stop):
+                    return
+        except BaseException as e:  # re-raised in the consumer thread
+            _put(ready, e, stop)
+            return
+        _put(ready, _DONE, stop)
+
+    thread = threading.Thread(target=reader, name="jcclass-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            entry = ready.get()
+            if entry is _DONE:
+                break
+            if isinstance(entry, BaseException):
+                raise entry
+            yield entry
+    finally:
+        stop.set()
+        thread.join()
+
+
+class BackgroundWriter:
+    """
+    Writes results on a background thread, so that e.g. encoding and disk writes of block N
+    overlap with the classification of block N+1. Used as a context manager; leaving the
+    context waits for all pending writes and re-raises the first write error.
+
+    Args:
+        write (callable): Called as `write(item, result)` for every submitted result, in order.
+        depth (int, optional): Maximum number of results waiting to be written (default: 2).
+        counter (StageCounter, optional): Counter of the write stage.
+
+    Example:
+        >>> with BackgroundWriter(lambda block, lwt: store(block, lwt)) as writer:
+        ...     for block, values in prefetch(read, blocks):
+        ...         writer.submit(block, classifier.classify_array(values))
+    """
+
+    def __init__(self, write, depth: int = 2, counter: StageCounter = None):
+        if depth < 1:
+            raise ValueError("The writer depth must be a positive integer.")
+        self._write = write
+        self._counter = counter
+        self._pending = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="jcclass-writer", daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            entry = self._pending.get()
+            if entry is _DONE:
+                return
+            if self._error is not None:
+                continue
+            item, result = entry
+            try:
+                start = time.perf_counter()
+                self._write(item, result)
+                if self._counter is not None:
+                    self._counter.record(getattr(result, "nbytes", 0), time.perf_counter() - start)
+            except BaseException as e:  # re-raised in the submitting thread
+                self._error = e
+
+    def submit(self, item, result) -> None:
+        """Queues a result for writing, waiting while `depth` results are pending."""
+        if self._error is not None:
+            raise self._error
+        _put(self._pending, (item, result), self._stop)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._pending.put(_DONE)
+        self._thread.join()
+        self._stop.set()
+        if self._error is not None and exc_type is None:
+            raise self._error
+        return False
+
+
+def stream_blocks(read, classify, write, blocks: list, depth: int = 2,
+                  stats: PipelineStats = None) -> PipelineStats:
+    """
+    Runs the read, classify and write stages of a block-wise classification concurrently:
+    block N+1 is read on a background thread and block N-1 is written on another while
+    block N is classified.
+
+    Args:
+        read (callable): Returns the input values of a block.
+        classify (callable): Returns the circulation types of the values of a block.
+        write (callable): Stores the circulation types of a block, as `write(block, lwt)`.
+        blocks (list): Blocks to process, in order.
+        depth (int, optional): Queue depth of the reader and of the writer (default: 2).
+        stats (PipelineStats, optional): Counters to add the throughput of this run to.
+
+    Returns:
+        PipelineStats: Throughput counters of every stage.
+    """
+    stats = stats if stats is not None else PipelineStats()
+    start = time.perf_counter()
+    # Closing the reader stops its thread as soon as a stage fails
+    with BackgroundWriter(write, depth=depth, counter=stats.write) as writer, \
+            closing(prefetch(read, blocks, depth=depth, counter=stats.read)) as ready:
+        for block, values in ready:
+            step = time.perf_counter()
+            lwt = classify(values)
+            stats.classify.record(np.asarray(lwt).nbytes, time.perf_counter() - step)
+            writer.submit(block, lwt)
+    stats.wall_seconds += time.perf_counter() - start
+    logger.info(f"Pipeline throughput: {stats}.")
+    return stats
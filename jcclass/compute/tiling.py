@@ -0,0 +1,134 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+from .classifier import JCClassifier
+
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+
+class Tile(NamedTuple):
+    """
+    A rectangle of classified cells and the halo of input grid points its stencils need.
+
+    Attributes:
+        cells (np.ndarray): Flat indices of the classified cells of the tile, in the
+            classified (latitude, longitude) grid.
+        rows (np.ndarray): Input grid rows (latitude indices) of the halo, ascending.
+        cols (np.ndarray): Input grid columns (longitude indices) of the halo, ascending.
+            On global grids, tiles next to the date line include columns from both ends.
+        classifier (JCClassifier): Classifier restricted to the tile, taking the halo
+            fields (rows x cols) as input.
+    """
+    cells: np.ndarray
+    rows: np.ndarray
+    cols: np.ndarray
+    classifier: JCClassifier
+
+
+def _tile_classifier(classifier: JCClassifier, compact: np.ndarray, rows: np.ndarray,
+                     cols: np.ndarray) -> JCClassifier:
+    """
+    Returns a shallow copy of `classifier` that classifies the cells at `compact` (positions
+    among the classified cells) from halo fields of shape (rows, cols).
+    """
+    tile = copy.copy(classifier)
+    tile.grid_shape = (rows.size, cols.size)
+    tile.sc, tile.zwa, tile.zwb, tile.zsc = (classifier.sc[compact], classifier.zwa[compact],
+                                             classifier.zwb[compact], classifier.zsc[compact])
+    tile.northern = classifier.northern[compact]
+    tile.cells = None
+    tile._buffer = None
+    # Tiles already run in parallel
+    tile.threads = 1
+    tile._bands = None
+    tile._executor = None
+    if classifier.table is not None:
+        row, col = np.divmod(classifier.table[:, compact], classifier.grid_shape[1])
+        tile.table = np.searchsorted(rows, row) * cols.size + np.searchsorted(cols, col)
+    else:
+        halo = (rows[:, None] * classifier.grid_shape[1] + cols[None, :]).ravel()
+        tile.operators = tuple(operator[compact][:, halo] for operator in classifier.operators)
+    return tile
+
+
+def plan_tiles(classifier: JCClassifier, tile_shape: tuple) -> list:
+    """
+    Splits the classified grid into tiles of at most `tile_shape` cells and finds the halo
+    of input grid points every tile needs: the rows and columns reached by the 16-point
+    stencils of its cells (10° of latitude and 15° of longitude around them, wrapping
+    around the date line on global grids, exactly as the untiled classification does).
+
+    Args:
+        classifier (JCClassifier): Classifier of the full grid.
+        tile_shape (tuple): Maximum number of classified cells per tile, (latitude, longitude).
+
+    Returns:
+        list: `Tile` objects covering the classified cells. Tiles with no cells left by the
+            classifier mask are dropped.
+    """
+    n_lat, n_lon = classifier.shape
+    tile_lat, tile_lon = tile_shape
+    if tile_lat < 1 or tile_lon < 1:
+        raise ValueError("tile_shape must contain two positive integers.")
+    classified = classifier.cells if classifier.cells is not None else np.arange(n_lat * n_lon)
+    nlon_in = classifier.grid_shape[1]
+
+    tiles = []
+    for lat_start in range(0, n_lat, tile_lat):
+        for lon_start in range(0, n_lon, tile_lon):
+            lat_range = np.arange(lat_start, min(lat_start + tile_lat, n_lat))
+            lon_range = np.arange(lon_start, min(lon_start + tile_lon, n_lon))
+            cells = (lat_range[:, None] * n_lon + lon_range[None, :]).ravel()
+            compact = np.flatnonzero(np.isin(classified, cells))
+            if compact.size == 0:
+                continue
+
+            if classifier.table is not None:
+                points = classifier.table[:, compact].ravel()
+            else:
+                points = np.concatenate([operator[compact].indices for operator in classifier.operators])
+            rows, cols = np.divmod(np.unique(points), nlon_in)
+            rows, cols = np.unique(rows), np.unique(cols)
+            tile = _tile_classifier(classifier, compact, rows, cols)
+            tiles.append(Tile(classified[compact], rows, cols, tile))
+
+    logger.info(f"Split the grid into {len(tiles)} tiles.")
+    return tiles
+
+
+def classify_tiles(read_halo, tiles: list, out: np.ndarray, workers: int = 1, scale: float = None) -> np.ndarray:
+    """
+    Classifies every tile from its halo fields and writes the codes of its cells into `out`.
+    Tiles only share read-only data, so they are run in parallel on a thread pool.
+
+    Args:
+        read_halo (callable): Returns the input fields of a tile, shape (..., rows, cols),
+            given the `Tile`.
+        tiles (list): `Tile` objects from `plan_tiles`.
+        out (np.ndarray): Output codes with shape (..., ncells) of the full classified grid,
+            pre-filled with NaN.
+        workers (int, optional): Number of tiles classified at once (default: 1).
+        scale (float, optional): Scale factor of packed halo fields (see `JCClassifier.classify_array`).
+
+    Returns:
+        np.ndarray: `out`.
+    """
+    def run(tile):
+        values = np.asarray(read_halo(tile))
+        leading = values.shape[:-2]
+        if not np.issubdtype(values.dtype, np.floating):
+            values = values.astype(np.float64 if scale is None else np.float32)
+        field = np.ascontiguousarray(values).reshape(-1, tile.rows.size * tile.cols.size)
+        out[..., tile.cells] = tile.classifier._classify_cells(field, scale).reshape(leading + (-1,))
+
+    if workers <= 1:
+        for tile in tiles:
+            run(tile)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(run, tiles))
+    return out
@@ -1,11 +1,13 @@
 import xarray as xr
 import numpy as np
 import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
+from matplotlib.collections import PathCollection
+from matplotlib.figure import Figure
 
 from .functions.tools import ensure_2d, crop_area
 from .functions.plot_utils import get_cmap_and_norm, add_legend, get_fig_size, \
-    configure_gridlines, format_time_string
+    configure_gridlines, configure_ticks, format_time_string
+from .functions.coastline import coastline_path
 from jcclass.compute.core import eleven_cts
 from jcclass.utils.logging_config import setup_logger
 logger = setup_logger("jcclass")
@@ -16,7 +18,8 @@ def plot_cts(ds: xr.DataArray,
              lat_north: int = 80,
              lon_west: int = -180,
              lon_east: int = 180,
-             show: bool = True):
+             show: bool = True,
+             backend: str = "cartopy"):
     """
     Plot the 27 circulation types on a map for a single time step.
 
@@ -46,6 +49,13 @@ def plot_cts(ds: xr.DataArray,
         Whether to display the plot immediately using `plt.show()`.
         If False, the figure is returned silently (default: True).
 
+    backend : str, optional
+        "cartopy" (default) draws the map on a cartopy PlateCarree axis. "headless"
+        rasterizes the field on a plain matplotlib axis with a cached coastline and never
+        imports cartopy, which is much faster for batch rendering (see `_draw_headless`).
+        With show=False, headless figures are not registered with pyplot, so they do
+        not need to be closed.
+
     Returns
     -------
     fig : matplotlib.figure.Figure
@@ -64,6 +74,8 @@ def plot_cts(ds: xr.DataArray,
     >>> fig = plot_cts(cts_day, lat_south=-60, lat_north=60, lon_west=-100, lon_east=20)
     >>> fig.savefig("my_cts_map.png")
     """
+    if backend not in ("cartopy", "headless"):
+        raise ValueError(f"Unknown backend '{backend}'. Use 'cartopy' or 'headless'.")
     logger.info("Plotting the circulation types to a map.")
     # Checking the xr.DataArray is 2D
     ensure_2d(ds)
@@ -84,13 +96,26 @@ def plot_cts(ds: xr.DataArray,
     cmap, norm = get_cmap_and_norm()
     # Compute the size of the figure
     size_x, size_y = get_fig_size(ds)
-    # Get the x and y coordinate values
-    lons, lats = ds.longitude, ds.latitude
 
-    # Plotting
+    extent = [float(lon_west), float(lon_east), float(lat_south), float(lat_north)]
+    if backend == "headless":
+        fig = _draw_headless(ds, extent, (size_x, size_y), cmap, norm, show)
+    else:
+        fig = _draw_cartopy(ds, extent, (size_x, size_y), cmap, norm)
+
+    if show:
+        plt.show()
+    return fig
+
+
+def _draw_cartopy(ds: xr.DataArray, extent: list, figsize: tuple, cmap, norm) -> Figure:
+    """Draws the 11 circulation types on a cartopy PlateCarree map."""
+    import cartopy.crs as ccrs
+
+    lons, lats = ds.longitude, ds.latitude
     proj = ccrs.PlateCarree()
-    fig, ax = plt.subplots(figsize=(size_x, size_y), subplot_kw={'projection': proj})
-    ax.set_extent([lon_west, lon_east, lat_south, lat_north], crs=proj)
+    fig, ax = plt.subplots(figsize=figsize, subplot_kw={'projection': proj})
+    ax.set_extent(extent, crs=proj)
 
     ax.pcolor(lons, lats, ds, transform=proj, norm=norm, cmap=cmap)
 
@@ -103,6 +128,48 @@ def plot_cts(ds: xr.DataArray,
     ax.set_title(time_string, size=12, loc='left')
 
     plt.tight_layout()
-    if show:
-        plt.show()
     return fig
+
+
+def _draw_headless(ds: xr.DataArray, extent: list, figsize: tuple, cmap, norm, show: bool) -> Figure:
+    """
+    Draws the 11 circulation types on a plain matplotlib axis in longitude and latitude
+    (the PlateCarree projection): regular grids are drawn as a single image, with the
+    coastline of the extent overlaid from the cache built by `coastline_path`.
+    """
+    ds = ds.transpose('latitude', 'longitude')
+    lons, lats = ds.longitude.values, ds.latitude.values
+    fig = plt.figure(figsize=figsize) if show else Figure(figsize=figsize)
+    ax = fig.add_subplot()
+
+    if _is_regular(lons) and _is_regular(lats):
+        # Cell edges half a grid step beyond the outer cell centres, as pcolor on centres
+        dx = (lons[-1] - lons[0]) / (lons.size - 1) / 2 if lons.size > 1 else 0.5
+        dy = (lats[-1] - lats[0]) / (lats.size - 1) / 2 if lats.size > 1 else 0.5
+        ax.imshow(ds.values, origin='lower', cmap=cmap, norm=norm, interpolation='nearest',
+                  extent=[lons[0] - dx, lons[-1] + dx, lats[0] - dy, lats[-1] + dy])
+    else:
+        ax.pcolormesh(lons, lats, ds.values, cmap=cmap, norm=norm, shading='nearest')
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.set_aspect('equal')
+
+    coastline = coastline_path(extent, '50m')
+    if coastline is not None:
+        ax.add_collection(PathCollection([coastline], facecolors='none', edgecolors='black',
+                                         linewidths=0.75), autolim=False)
+    configure_ticks(ax, extent)
+    add_legend(fig, ax)
+
+    # Add date title if available
+    time_string = format_time_string(ds)
+    ax.set_title(time_string, size=12, loc='left')
+
+    fig.tight_layout()
+    return fig
+
+
+def _is_regular(values: np.ndarray) -> bool:
+    """Whether coordinate values are evenly spaced."""
+    steps = np.diff(values)
+    return steps.size == 0 or np.allclose(steps, steps[0], rtol=1e-3)
@@ -0,0 +1,170 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+from matplotlib.path import Path as MplPath
+
+from jcclass.utils.cache import cache_dir
+from jcclass.utils.logging_config import setup_logger
+logger = setup_logger("jcclass")
+
+# Coastline paths already built in this process, by (source key, resolution, extent)
+_COASTLINE_CACHE = {}
+
+# Margin (degrees) kept around the extent, so lines leave the map at its edges
+_MARGIN = 1.0
+
+
+def coastline_file(resolution: str = "50m") -> Path:
+    """
+    Locates a Natural Earth coastline shapefile without importing cartopy.
+
+    The JCCLASS_COASTLINE environment variable takes precedence. Otherwise the file
+    downloaded by cartopy to its data directory (CARTOPY_DATA_DIR, default
+    ~/.local/share/cartopy) is used, downloading it through cartopy only if it is missing.
+
+    Args:
+        resolution (str, optional): Natural Earth resolution: "10m", "50m" or "110m" (default: "50m").
+
+    Returns:
+        Path or None: Path of the shapefile, or None if no coastline is available.
+    """
+    if os.environ.get("JCCLASS_COASTLINE"):
+        return Path(os.environ["JCCLASS_COASTLINE"])
+
+    data_dir = Path(os.environ.get("CARTOPY_DATA_DIR", Path.home() / ".local" / "share" / "cartopy"))
+    path = data_dir / "shapefiles" / "natural_earth" / "physical" / f"ne_{resolution}_coastline.shp"
+    if path.exists():
+        return path
+    try:
+        import cartopy.io.shapereader as shapereader
+        return Path(shapereader.natural_earth(resolution=resolution, category="physical", name="coastline"))
+    except Exception as e:
+        logger.warning(f"No {resolution} coastline available: {e}")
+        return None
+
+
+def read_coastlines(path: Path) -> list:
+    """
+    Reads the lines of a coastline shapefile.
+
+    Returns:
+        list: One (npoints, 2) array of (longitude, latitude) vertices per line part.
+    """
+    import shapefile
+
+    lines = []
+    with shapefile.Reader(str(path)) as reader:
+        for shape in reader.iterShapes():
+            points = np.asarray(shape.points, dtype=float)
+            bounds = list(shape.parts) + [len(points)]
+            lines.extend(points[start:end] for start, end in zip(bounds[:-1], bounds[1:]) if end - start > 1)
+    return lines
+
+
+def clip_lines(lines: list, extent: tuple) -> list:
+    """
+    Clips every line to the extent (plus a margin), so that only the visible part of the
+    coastline is drawn. Segments crossing the edges are cut where they cross them, and
+    segments with both ends outside are kept if they pass through the extent.
+
+    Args:
+        lines (list): (npoints, 2) vertex arrays.
+        extent (tuple): (lon_west, lon_east, lat_south, lat_north).
+
+    Returns:
+        list: Clipped (npoints, 2) vertex arrays.
+    """
+    west, east, south, north = extent
+    low = np.array([west - _MARGIN, south - _MARGIN])
+    high = np.array([east + _MARGIN, north + _MARGIN])
+    clipped = []
+    for line in lines:
+        if (line.max(axis=0) < low).any() or (line.min(axis=0) > high).any():
+            continue
+        # Liang-Barsky: the visible part of every segment start + t * delta is t0 <= t <= t1
+        start, delta = line[:-1], np.diff(line, axis=0)
+        t0, t1 = np.zeros(len(start)), np.ones(len(start))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for axis in range(2):
+                moving = delta[:, axis] != 0
+                ta = (low[axis] - start[:, axis]) / delta[:, axis]
+                tb = (high[axis] - start[:, axis]) / delta[:, axis]
+                t0 = np.where(moving, np.maximum(t0, np.minimum(ta, tb)), t0)
+                t1 = np.where(moving, np.minimum(t1, np.maximum(ta, tb)), t1)
+                outside = ~moving & ((start[:, axis] < low[axis]) | (start[:, axis] > high[axis]))
+                t1[outside] = -1.0
+        visible = np.flatnonzero(t0 <= t1)
+        if not len(visible):
+            continue
+        entries = start + t0[:, None] * delta
+        exits = start + t1[:, None] * delta
+        # Consecutive visible segments form one line when they share an unclipped vertex
+        joined = (np.diff(visible) == 1) & (t1[visible[:-1]] == 1) & (t0[visible[1:]] == 0)
+        breaks = np.flatnonzero(~joined) + 1
+        for run in np.split(visible, breaks):
+            clipped.append(np.vstack([entries[run[:1]], exits[run]]))
+    return clipped
+
+
+def _to_path(vertices: np.ndarray, offsets: np.ndarray) -> MplPath:
+    codes = np.full(len(vertices), MplPath.LINETO, dtype=MplPath.code_type)
+    codes[offsets[:-1]] = MplPath.MOVETO
+    return MplPath(vertices, codes)
+
+
+def coastline_path(extent: tuple, resolution: str = "50m"):
+    """
+    Returns the coastline within `extent` as a single matplotlib Path, built once per
+    shapefile, extent and resolution: it is kept in memory and saved to the cache directory
+    (JCCLASS_CACHE_DIR, default ~/.cache/jcclass) for later runs. The cache key includes the
+    path and modification time of the shapefile, so a different or updated shapefile (e.g.
+    another JCCLASS_COASTLINE) is read again.
+
+    Args:
+        extent (tuple): (lon_west, lon_east, lat_south, lat_north) in degrees.
+        resolution (str, optional): Natural Earth resolution (default: "50m").
+
+    Returns:
+        matplotlib.path.Path or None: The coastline, or None if no coastline is available.
+    """
+    extent = tuple(round(float(value), 4) for value in extent)
+    if (None, resolution) in _COASTLINE_CACHE:
+        return None
+    source = coastline_file(resolution)
+    if source is None:
+        # Not downloaded again in this process
+        _COASTLINE_CACHE[(None, resolution)] = None
+        return None
+    try:
+        stat = source.stat()
+    except OSError as e:
+        logger.warning(f"No {resolution} coastline available: {e}")
+        return None
+    source_key = hashlib.sha1(f"{source.resolve()}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()[:16]
+    key = (source_key, resolution, extent)
+    if key in _COASTLINE_CACHE:
+        return _COASTLINE_CACHE[key]
+
+    name = "_".join(f"{value:g}" for value in extent)
+    path = cache_dir() / f"coastline_{resolution}_{source_key}_{name}.npz"
+    if path.exists():
+        cached = np.load(path)
+        coastline = _to_path(cached["vertices"], cached["offsets"])
+    else:
+        logger.info(f"Building the {resolution} coastline of {extent}.")
+        lines = clip_lines(read_coastlines(source), extent)
+        vertices = np.concatenate(lines) if lines else np.empty((0, 2))
+        offsets = np.cumsum([0] + [len(line) for line in lines])
+        coastline = _to_path(vertices, offsets)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+            np.savez(tmp_path, vertices=vertices, offsets=offsets)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache the coastline in {path.parent}: {e}")
+
+    _COASTLINE_CACHE[key] = coastline
+    return coastline
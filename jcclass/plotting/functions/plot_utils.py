@@ -2,12 +2,14 @@ import numpy as np
 import pandas as pd
 import xarray as xr
 import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
 from matplotlib.colors import ListedColormap, BoundaryNorm
 from matplotlib.lines import Line2D
-from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
 import matplotlib.ticker as mticker
 
+# Latitudes and longitudes of the map labels
+LAT_TICKS = [-80, -60, -40, -20, 0, 20, 40, 60, 80]
+LON_TICKS = [-180, -120, -60, 0, 60, 120, 180]
+
 
 def get_cmap_and_norm():
     """
@@ -65,6 +67,9 @@ def configure_gridlines(ax: plt.Axes) -> None:
     - Gridlines themselves are hidden (no xlines or ylines), only labels are displayed.
     - Gridline locators and formatters are fixed to common global coordinates.
     """
+    import cartopy.crs as ccrs
+    from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
+
     gl = ax.gridlines(crs=ccrs.PlateCarree(), draw_labels=True)
     gl.top_labels = False
     gl.bottom_labels = True
@@ -72,12 +77,41 @@ def configure_gridlines(ax: plt.Axes) -> None:
     gl.right_labels = False
     gl.xlines = False  # disables grid lines
     gl.ylines = False
-    gl.ylocator = mticker.FixedLocator([-80, -60, -40, -20, 0, 20, 40, 60, 80])
-    gl.xlocator = mticker.FixedLocator([-180, -120, -60, 0, 60, 120, 180])
+    gl.ylocator = mticker.FixedLocator(LAT_TICKS)
+    gl.xlocator = mticker.FixedLocator(LON_TICKS)
     gl.xformatter = LONGITUDE_FORMATTER
     gl.yformatter = LATITUDE_FORMATTER
 
 
+def _degree_label(value: float, positive: str, negative: str) -> str:
+    """Formats a coordinate as e.g. '60°W', '0°' or '20°N', as the cartopy formatters do."""
+    hemisphere = positive if value > 0 else negative if value < 0 else ""
+    if abs(value) == 180:
+        hemisphere = ""
+    return f"{abs(value):g}\u00b0{hemisphere}"
+
+
+def configure_ticks(ax: plt.Axes, extent: tuple) -> None:
+    """
+    Adds the labels of `configure_gridlines` to a plain matplotlib axis in longitude and
+    latitude coordinates, without cartopy.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        The axis to which the labels will be added.
+
+    extent : tuple
+        (lon_west, lon_east, lat_south, lat_north) of the map; labels outside are dropped.
+    """
+    lon_west, lon_east, lat_south, lat_north = extent
+    lon_ticks = [lon for lon in LON_TICKS if lon_west <= lon <= lon_east]
+    lat_ticks = [lat for lat in LAT_TICKS if lat_south <= lat <= lat_north]
+    ax.set_xticks(lon_ticks, [_degree_label(lon, "E", "W") for lon in lon_ticks])
+    ax.set_yticks(lat_ticks, [_degree_label(lat, "N", "S") for lat in lat_ticks])
+    ax.tick_params(top=False, right=False, length=0)
+
+
 def add_legend(fig: plt.Figure, ax: plt.Axes) -> None:
     """
     Adds a custom legend for 11 circulation types to the plot.
@@ -2,8 +2,6 @@ import xarray as xr
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
 
-import cartopy.crs as ccrs
-from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
 import matplotlib.ticker as mticker
 from jcclass.utils.logging_config import setup_logger
 logger = setup_logger("jcclass")
@@ -75,6 +73,9 @@ def define_colormap() -> ListedColormap:
 
 
 def configure_gridlines(ax: plt.Axes) -> None:
+    import cartopy.crs as ccrs
+    from cartopy.mpl.gridliner import LONGITUDE_FORMATTER, LATITUDE_FORMATTER
+
     gl = ax.gridlines(crs=ccrs.PlateCarree(), draw_labels=True)
     gl.top_labels = False
     gl.bottom_labels = True
@@ -0,0 +1,408 @@
+import argparse
+import http.client
+import io
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import xarray as xr
+
+from jcclass.cli import select_variable, to_int8
+from jcclass.compute import JCClassifier
+from jcclass.compute.classifier import LAT_NAMES, LON_NAMES, find_dim
+from jcclass.compute.functions.operator import grid_key
+from jcclass.utils.logging_config import setup_logger
+
+logger = setup_logger("jcclass")
+
+DEFAULT_PORT = 8765
+
+# Content types of the request and response bodies
+NPZ_CONTENT = "application/x-npz"
+NETCDF_CONTENT = "application/x-netcdf"
+
+
+class _Batcher:
+    """
+    Classifies the fields submitted by concurrent requests on one grid together: requests
+    arriving within `max_wait` seconds of each other (up to `max_batch` time steps) are
+    stacked and classified with one `classify_array` call on a dedicated thread.
+
+    The classifier is only used on that thread (its scratch buffers are shared between
+    calls, see `JCClassifier`), and is closed when the thread stops.
+    """
+
+    def __init__(self, classifier: JCClassifier, max_batch: int, max_wait: float):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self._pending = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="jcclass-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, field: np.ndarray) -> Future:
+        """
+        Queues a field for classification.
+
+        Returns:
+            Future: The int8 circulation types of the field, or None if the batcher was
+                closed (e.g. dropped from the service after the request picked it).
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                return None
+            self._pending.put((field, future))
+        return future
+
+    def close(self) -> None:
+        """Stops the batching thread, which closes the classifier, once the submitted fields are classified."""
+        with self._lock:
+            self._closed = True
+            self._pending.put(None)
+
+    def _run(self) -> None:
+        try:
+            while True:
+                entry = self._pending.get()
+                if entry is None:
+                    return
+                batch = [entry]
+                steps = entry[0].shape[0]
+                deadline = time.perf_counter() + self.max_wait
+                while steps < self.max_batch:
+                    try:
+                        entry = self._pending.get(timeout=max(deadline - time.perf_counter(), 0))
+                    except queue.Empty:
+                        break
+                    if entry is None:
+                        self._pending.put(None)
+                        break
+                    batch.append(entry)
+                    steps += entry[0].shape[0]
+                self._classify(batch)
+        finally:
+            self.classifier.close()
+
+    def _classify(self, batch: list) -> None:
+        # Fields of different dtypes are classified separately, as they would be on their own
+        for dtype in {field.dtype for field, _ in batch}:
+            entries = [(field, future) for field, future in batch if field.dtype == dtype]
+            try:
+                lwt = to_int8(self.classifier.classify_array(np.concatenate([field for field, _ in entries])))
+            except Exception as e:
+                for _, future in entries:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            start = 0
+            for field, future in entries:
+                future.set_result(lwt[start:start + field.shape[0]])
+                start += field.shape[0]
+
+
+class ClassificationService:
+    """
+    Classifies MSLP fields for many small requests, keeping the classifier of every grid
+    warm: the grid checks, constants, stencil tables and worker threads are built for the
+    first request on a grid and reused by the following ones. Concurrent requests on the
+    same grid are micro-batched into a single classification.
+
+    Args:
+        max_classifiers (int, optional): Number of grids kept warm (default: 8). The least
+            recently used classifier is dropped beyond this.
+        threads (int, optional): Threads of every classifier (see `JCClassifier`).
+        max_batch (int, optional): Maximum number of time steps classified together (default: 64).
+        max_wait (float, optional): Seconds a request waits for others to join its batch
+            (default: 0.005).
+
+    Example:
+        >>> service = ClassificationService()
+        >>> cts, lat, lon = service.classify(mslp, latitude, longitude)
+    """
+
+    def __init__(self, max_classifiers: int = 8, threads: int = 1, max_batch: int = 64,
+                 max_wait: float = 0.005):
+        self.max_classifiers = max_classifiers
+        self.threads = threads
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = 0
+        self._batchers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _batcher(self, latitude: np.ndarray, longitude: np.ndarray, stencil: str, mask) -> _Batcher:
+        """Returns the batcher of a grid, building its classifier on first use."""
+        key = (grid_key(latitude, longitude), stencil, mask)
+        with self._lock:
+            if key in self._batchers:
+                self._batchers.move_to_end(key)
+                return self._batchers[key]
+            logger.info(f"Building a classifier for a {latitude.size} x {longitude.size} grid.")
+            grid = xr.DataArray(np.zeros((latitude.size, longitude.size)), dims=["latitude", "longitude"],
+                                coords={"latitude": latitude, "longitude": longitude})
+            classifier = JCClassifier(grid, stencil=stencil, mask=mask, threads=self.threads)
+            batcher = _Batcher(classifier, self.max_batch, self.max_wait)
+            self._batchers[key] = batcher
+            if len(self._batchers) > self.max_classifiers:
+                self._batchers.popitem(last=False)[1].close()
+            return batcher
+
+    def classify(self, mslp: np.ndarray, latitude: np.ndarray, longitude: np.ndarray,
+                 stencil: str = "gather", mask: str = None) -> tuple:
+        """
+        Computes the circulation types of MSLP fields.
+
+        Args:
+            mslp (np.ndarray): MSLP values, shape (..., nlat, nlon).
+            latitude (np.ndarray): Latitudes of the grid (nlat,).
+            longitude (np.ndarray): Longitudes of the grid (nlon,).
+            stencil (str, optional): Stencil of the classifier (see `JCClassifier`).
+            mask (str, optional): "equator" to skip |latitude| < 10°.
+
+        Returns:
+            tuple: (cts, latitude, longitude) with the int8 circulation types (`CTS_FILL_VALUE`
+                where unclassified) and the coordinates of the classified grid.
+        """
+        mslp, latitude, longitude = np.asarray(mslp), np.asarray(latitude), np.asarray(longitude)
+        if mslp.ndim < 2 or mslp.shape[-2:] != (latitude.size, longitude.size):
+            raise ValueError(f"The MSLP fields must end with the grid dimensions ({latitude.size}, "
+                             f"{longitude.size}). Found: {mslp.shape}.")
+        leading = mslp.shape[:-2]
+        fields = mslp.reshape((-1,) + mslp.shape[-2:])
+        with self._lock:
+            self.requests += 1
+        future = None
+        while future is None:
+            # A batcher dropped after it was picked refuses the fields: pick the grid's new one
+            batcher = self._batcher(latitude, longitude, stencil, mask)
+            future = batcher.submit(fields)
+        cts = future.result()
+        classifier = batcher.classifier
+        return (cts.reshape(leading + classifier.shape), classifier.latitude.values,
+                classifier.longitude.values)
+
+    def stats(self) -> dict:
+        """Numbers of warm grids, requests and classified batches."""
+        with self._lock:
+            batches = sum(batcher.batches for batcher in self._batchers.values())
+            return {"classifiers": len(self._batchers), "requests": self.requests, "batches": batches}
+
+    def close(self) -> None:
+        with self._lock:
+            for batcher in self._batchers.values():
+                batcher.close()
+            self._batchers.clear()
+
+
+def read_request(body: bytes, content_type: str) -> tuple:
+    """
+    Decodes a request body into (mslp, latitude, longitude).
+
+    Bodies are either an `.npz` archive (`numpy.savez`) with the arrays "mslp" (..., nlat,
+    nlon), "latitude" and "longitude", or the bytes of a NetCDF file with an MSLP variable
+    ("msl" or "psl").
+    """
+    if content_type == NETCDF_CONTENT:
+        import netCDF4
+
+        store = xr.backends.NetCDF4DataStore(netCDF4.Dataset("request.nc", memory=body))
+        with xr.open_dataset(store) as ds:
+            data = select_variable(ds).load()
+        lat_dim, lon_dim = find_dim(data, LAT_NAMES), find_dim(data, LON_NAMES)
+        data = data.transpose(..., lat_dim, lon_dim)
+        return data.values, data[lat_dim].values, data[lon_dim].values
+    with np.load(io.BytesIO(body), allow_pickle=False) as arrays:
+        return arrays["mslp"], arrays["latitude"], arrays["longitude"]
+
+
+def write_response(cts: np.ndarray, latitude: np.ndarray, longitude: np.ndarray) -> bytes:
+    """Encodes circulation types and their coordinates as an `.npz` archive."""
+    buffer = io.BytesIO()
+    np.savez(buffer, cts=cts, latitude=latitude, longitude=longitude)
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP handler of `POST /classify` and `GET /health`."""
+    server_version = "jcclass"
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/health":
+            self._send(404, b"Not found", "text/plain")
+            return
+        self._send(200, json.dumps(self.server.service.stats()).encode(), "application/json")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/classify":
+            self._send(404, b"Not found", "text/plain")
+            return
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            mslp, latitude, longitude = read_request(body, self.headers.get("Content-Type", NPZ_CONTENT))
+            result = self.server.service.classify(mslp, latitude, longitude,
+                                                  stencil=params.get("stencil", "gather"),
+                                                  mask=params.get("mask"))
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            self._send(400, str(e).encode(), "text/plain")
+            return
+        except Exception as e:
+            logger.exception("Classification request failed.")
+            self._send(500, str(e).encode(), "text/plain")
+            return
+        self._send(200, write_response(*result), NPZ_CONTENT)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def make_server(service: ClassificationService = None, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                socket_path: str = None):
+    """
+    Creates the HTTP server of a classification service, on a TCP port or a Unix socket.
+
+    Args:
+        service (ClassificationService, optional): Service answering the requests.
+        host (str, optional): Address to listen on (default: 127.0.0.1, local clients only).
+        port (int, optional): TCP port (default: 8765). 0 picks a free port.
+        socket_path (str, optional): Listen on this Unix socket instead of a TCP port.
+
+    Returns:
+        socketserver.BaseServer: Server to run with `serve_forever()`.
+    """
+    if socket_path is not None:
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.service = service or ClassificationService()
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request_cts(mslp: np.ndarray, latitude: np.ndarray, longitude: np.ndarray, host: str = "127.0.0.1",
+                port: int = DEFAULT_PORT, socket_path: str = None, stencil: str = "gather",
+                mask: str = None, timeout: float = 60.0) -> tuple:
+    """
+    Sends MSLP fields to a running classification service and returns its answer.
+
+    Args:
+        mslp (np.ndarray): MSLP values, shape (..., nlat, nlon).
+        latitude (np.ndarray): Latitudes of the grid.
+        longitude (np.ndarray): Longitudes of the grid.
+        host (str, optional): Address of the service.
+        port (int, optional): TCP port of the service.
+        socket_path (str, optional): Unix socket of the service, instead of host and port.
+        stencil (str, optional): Stencil of the classifier (see `JCClassifier`).
+        mask (str, optional): "equator" to skip |latitude| < 10°.
+        timeout (float, optional): Seconds to wait for the answer.
+
+    Returns:
+        tuple: (cts, latitude, longitude), see `ClassificationService.classify`.
+
+    Raises:
+        RuntimeError: If the service rejects the request.
+    """
+    if socket_path is not None:
+        connection = _UnixHTTPConnection(socket_path, timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    query = f"stencil={stencil}" + (f"&mask={mask}" if mask else "")
+    buffer = io.BytesIO()
+    np.savez(buffer, mslp=mslp, latitude=latitude, longitude=longitude)
+    try:
+        connection.request("POST", f"/classify?{query}", body=buffer.getvalue(),
+                           headers={"Content-Type": NPZ_CONTENT})
+        response = connection.getresponse()
+        body = response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"The classification service answered {response.status}: {body.decode(errors='replace')}")
+    with np.load(io.BytesIO(body), allow_pickle=False) as arrays:
+        return arrays["cts"], arrays["latitude"], arrays["longitude"]
+
+
+def main(argv: list = None) -> int:
+    """
+    Entry point of the `jcclass-serve` command line tool.
+    """
+    parser = argparse.ArgumentParser(
+        prog="jcclass-serve",
+        description="Run a local Jenkinson and Collison classification service.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT}).")
+    parser.add_argument("--socket", default=None, help="Listen on this Unix socket instead of a TCP port.")
+    parser.add_argument("--threads", type=int, default=1, help="Threads of every classifier (default: 1).")
+    parser.add_argument("--max-batch", type=int, default=64,
+                        help="Maximum number of time steps classified together (default: 64).")
+    parser.add_argument("--max-wait", type=float, default=0.005,
+                        help="Seconds a request waits for others to join its batch (default: 0.005).")
+    args = parser.parse_args(argv)
+
+    service = ClassificationService(threads=args.threads, max_batch=args.max_batch, max_wait=args.max_wait)
+    server = make_server(service, host=args.host, port=args.port, socket_path=args.socket)
+    logger.info(f"Serving on {args.socket or f'{args.host}:{server.server_port}'}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,10 @@
+import os
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """
+    Returns the directory where jcclass caches data between runs (regridding weights,
+    coastlines), set by the JCCLASS_CACHE_DIR environment variable (default: ~/.cache/jcclass).
+    """
+    return Path(os.environ.get("JCCLASS_CACHE_DIR", Path.home() / ".cache" / "jcclass"))
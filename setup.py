@@ -16,13 +16,21 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     python_requires='>=3.7',
+    entry_points={
+        'console_scripts': ['jcclass=jcclass.cli:main', 'jcclass-serve=jcclass.service:main'],
+    },
     install_requires=[
         'numpy>=1.19.5',
+        'scipy',
         'xarray>=0.16.2',
         'matplotlib>=3.2.0',
         'pyproj',
         'cartopy>=0.17.0',
         'cftime',
-        'netCDF4'
+        'netCDF4',
+        'pyshp'
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+    },
 )
@@ -0,0 +1,123 @@
+import pytest
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compute_cts, JCClassifier
+
+
+def create_global_mslp(n_time=3):
+    """
+    Create a coarse global MSLP dataset with descending latitudes and 0-360 longitudes.
+    """
+    lat = np.arange(90, -90.1, -5.0)
+    lon = np.arange(0, 360, 5.0)
+    time = np.arange('2000-01-01', '2000-01-04', dtype='datetime64[D]')[:n_time]
+    mslp_data = 101325 + 3000 * np.random.rand(n_time, len(lat), len(lon))
+
+    return xr.DataArray(
+        mslp_data,
+        dims=['time', 'lat', 'lon'],
+        coords={'time': time, 'lat': lat, 'lon': lon},
+        name='msl'
+    )
+
+
+def test_classifier_matches_compute_cts():
+    ds_mslp = create_global_mslp()
+    classifier = JCClassifier(ds_mslp.isel(time=0))
+
+    xr.testing.assert_identical(classifier.classify(ds_mslp), compute_cts(ds_mslp))
+
+
+def test_classifier_regional_array():
+    lat = np.arange(30, 70, 2.5)
+    lon = np.arange(-30, 40, 2.5)
+    ds_mslp = xr.DataArray(
+        101325 + 3000 * np.random.rand(2, len(lat), len(lon)),
+        dims=['time', 'latitude', 'longitude'],
+        coords={'time': np.arange(2), 'latitude': lat, 'longitude': lon},
+    )
+    classifier = JCClassifier(ds_mslp)
+    cts = classifier.classify_array(ds_mslp.values[0])
+
+    assert not classifier.is_global
+    assert cts.shape == classifier.shape
+    np.testing.assert_array_equal(cts, compute_cts(ds_mslp).values[0])
+
+
+def test_classifier_rejects_other_grid():
+    classifier = JCClassifier(create_global_mslp(n_time=1))
+    with pytest.raises(ValueError):
+        classifier.classify_array(np.zeros((10, 10)))
+
+
+def test_sparse_stencil_matches_gather():
+    ds_mslp = create_global_mslp()
+    expected = compute_cts(ds_mslp)
+    cts = compute_cts(ds_mslp, stencil="nearest")
+
+    assert expected.sel(latitude=[-5, 5]).notnull().all()
+    xr.testing.assert_equal(cts, expected)
+    assert JCClassifier(ds_mslp, stencil="nearest").operators is JCClassifier(ds_mslp, stencil="nearest").operators
+
+
+def test_bilinear_stencil_on_aligned_grid():
+    lat = np.arange(20, 80.1, 2.5)
+    lon = np.arange(-40, 40.1, 2.5)
+    ds_mslp = xr.DataArray(
+        101325 + 3000 * np.random.rand(2, len(lat), len(lon)),
+        dims=['time', 'latitude', 'longitude'],
+        coords={'time': np.arange(2), 'latitude': lat, 'longitude': lon},
+    )
+    # Grid points fall on grid nodes away from the edges, so interpolation changes nothing there
+    interior = dict(latitude=slice(30, 70), longitude=slice(-25, 25))
+    bilinear = compute_cts(ds_mslp, stencil="bilinear").sel(interior)
+    nearest = compute_cts(ds_mslp).sel(interior)
+
+    np.testing.assert_allclose(bilinear, nearest)
+
+
+def test_mask_skips_cells():
+    ds_mslp = create_global_mslp()
+    expected = compute_cts(ds_mslp)
+    cts = compute_cts(ds_mslp, mask="equator")
+    tropics = np.abs(cts.latitude) < 10
+
+    assert cts.sel(latitude=tropics).isnull().all()
+    xr.testing.assert_equal(cts.sel(latitude=~tropics), expected.sel(latitude=~tropics))
+
+    land = xr.DataArray(
+        np.random.rand(ds_mslp.sizes['lat'], ds_mslp.sizes['lon']) > 0.5,
+        dims=['lat', 'lon'], coords={'lat': ds_mslp.lat, 'lon': ds_mslp.lon},
+    )
+    classifier = JCClassifier(ds_mslp, mask=land)
+    cts = classifier.classify(ds_mslp)
+    kept = land.assign_coords(lon=xr.where(land.lon > 180, land.lon - 360, land.lon)).sortby('lon')
+    kept = kept.rename(lat='latitude', lon='longitude').sel(latitude=cts.latitude, longitude=cts.longitude)
+
+    assert classifier.cells.size == int(kept.sum())
+    xr.testing.assert_equal(cts.where(kept), expected.where(kept))
+    assert cts.where(~kept).isnull().all()
+
+
+def test_classifier_threads_match_single_thread():
+    ds_mslp = create_global_mslp()
+
+    for kwargs in ({}, {'mask': 'equator'}, {'stencil': 'nearest'}):
+        expected = JCClassifier(ds_mslp, **kwargs).classify_array(ds_mslp.values)
+        threaded = JCClassifier(ds_mslp, threads=4, **kwargs)
+        np.testing.assert_array_equal(threaded.classify_array(ds_mslp.values), expected)
+        np.testing.assert_array_equal(threaded.classify_array(ds_mslp.values[:1]), expected[:1])
+
+
+def test_classifier_close_and_context_manager():
+    ds_mslp = create_global_mslp()
+    expected = JCClassifier(ds_mslp).classify_array(ds_mslp.values)
+
+    with JCClassifier(ds_mslp, threads=2) as classifier:
+        np.testing.assert_array_equal(classifier.classify_array(ds_mslp.values), expected)
+        executor = classifier._executor
+    assert classifier._executor is None and executor._shutdown
+    # A closed classifier restarts its threads when used again
+    np.testing.assert_array_equal(classifier.classify_array(ds_mslp.values), expected)
+    classifier.close()
@@ -0,0 +1,110 @@
+import json
+import numpy as np
+import xarray as xr
+
+from jcclass import cli
+from jcclass.cli import main
+
+
+def write_mslp_file(path, variable='msl'):
+    """
+    Write a small regional MSLP NetCDF file.
+    """
+    lat = np.arange(30, 70, 2.5)
+    lon = np.arange(-30, 40, 2.5)
+    time = np.arange('2000-01-01', '2000-01-03', dtype='datetime64[D]')
+    mslp_data = 101325 + 3000 * np.random.rand(len(time), len(lat), len(lon))
+    ds = xr.DataArray(
+        mslp_data,
+        dims=['time', 'latitude', 'longitude'],
+        coords={'time': time, 'latitude': lat, 'longitude': lon},
+        name=variable
+    ).to_dataset()
+    ds.to_netcdf(path)
+
+
+def test_cli_batch_and_resume(tmp_path):
+    write_mslp_file(tmp_path / 'a.nc')
+    write_mslp_file(tmp_path / 'b.nc', variable='psl')
+    (tmp_path / 'broken.nc').write_text('not a netcdf file')
+    out = tmp_path / 'out'
+
+    assert main([str(tmp_path / '*.nc'), '-o', str(out)]) == 1
+    manifest = json.loads((out / 'manifest.json').read_text())['files']
+    status = {name.split('/')[-1]: entry['status'] for name, entry in manifest.items()}
+    assert status == {'a.nc': 'completed', 'b.nc': 'completed', 'broken.nc': 'failed'}
+
+    cts = xr.open_dataset(out / 'a_cts.nc').cts
+    assert cts.shape == (2, 16, 28)
+    assert ((cts >= -1) & (cts <= 28)).all()
+
+    # Completed outputs are not recomputed when the job is restarted
+    mtime = (out / 'a_cts.nc').stat().st_mtime_ns
+    (tmp_path / 'broken.nc').unlink()
+    assert main([str(tmp_path / '*.nc'), '-o', str(out), '-j', '2']) == 0
+    assert (out / 'a_cts.nc').stat().st_mtime_ns == mtime
+    last_run = json.loads((out / 'manifest.json').read_text())['last_run']
+    assert last_run == {'completed': 0, 'failed': 0, 'skipped': 2}
+
+
+def test_cli_mirrors_input_directories(tmp_path):
+    for year in ('1990', '1991'):
+        (tmp_path / 'era5' / year).mkdir(parents=True)
+        write_mslp_file(tmp_path / 'era5' / year / 'msl.nc')
+    out = tmp_path / 'out'
+
+    assert main([str(tmp_path / 'era5' / '*' / 'msl.nc'), '-o', str(out)]) == 0
+    assert (out / '1990' / 'msl_cts.nc').exists() and (out / '1991' / 'msl_cts.nc').exists()
+    manifest = json.loads((out / 'manifest.json').read_text())
+    assert len({entry['output'] for entry in manifest['files'].values()}) == 2
+
+
+def test_cli_failure_removes_temporary_file(tmp_path, monkeypatch):
+    write_mslp_file(tmp_path / 'a.nc')
+    out = tmp_path / 'out'
+
+    def failing_write(self, path, **kwargs):
+        open(path, 'w').write('partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(xr.DataArray, 'to_netcdf', failing_write)
+    assert main([str(tmp_path / 'a.nc'), '-o', str(out)]) == 1
+    assert [f.name for f in out.iterdir()] == ['manifest.json']
+
+
+def test_cli_prefetch_writes_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr('jcclass.compute.pipeline.DEFAULT_BLOCK_SIZE', 1)
+    write_mslp_file(tmp_path / 'a.nc')
+
+    assert main([str(tmp_path / 'a.nc'), '-o', str(tmp_path / 'plain')]) == 0
+    assert main([str(tmp_path / 'a.nc'), '-o', str(tmp_path / 'prefetch'), '--prefetch', '2']) == 0
+    with xr.open_dataset(tmp_path / 'plain' / 'a_cts.nc') as plain, \
+            xr.open_dataset(tmp_path / 'prefetch' / 'a_cts.nc') as prefetched:
+        xr.testing.assert_identical(prefetched, plain)
+        assert prefetched.cts.encoding['dtype'] == plain.cts.encoding['dtype']
+
+
+def test_cli_packed(tmp_path, monkeypatch):
+    write_mslp_file(tmp_path / 'decoded.nc')
+    with xr.open_dataset(tmp_path / 'decoded.nc') as ds:
+        ds.load().to_netcdf(tmp_path / 'a.nc', encoding={'msl': {
+            'dtype': 'int16', 'scale_factor': 0.1, 'add_offset': 102825.0, '_FillValue': -32767}})
+    dtypes = []
+    compute_cts = cli.compute_cts
+
+    def record_dtype(data, **kwargs):
+        dtypes.append(data.dtype)
+        return compute_cts(data, **kwargs)
+
+    monkeypatch.setattr(cli, 'compute_cts', record_dtype)
+
+    assert main([str(tmp_path / 'a.nc'), '-o', str(tmp_path / 'decoded')]) == 0
+    assert main([str(tmp_path / 'a.nc'), '-o', str(tmp_path / 'packed'), '--packed']) == 0
+    assert main([str(tmp_path / 'a.nc'), '-o', str(tmp_path / 'prefetch'), '--packed', '--prefetch', '1']) == 0
+    assert dtypes == [np.float64, np.int16, np.int16]
+    with xr.open_dataset(tmp_path / 'decoded.nc') as original, xr.open_dataset(tmp_path / 'a.nc') as ds:
+        np.testing.assert_allclose(ds.msl, original.msl, atol=0.1)
+    with xr.open_dataset(tmp_path / 'decoded' / 'a_cts.nc') as decoded:
+        for name in ('packed', 'prefetch'):
+            with xr.open_dataset(tmp_path / name / 'a_cts.nc') as packed:
+                xr.testing.assert_identical(packed, decoded)
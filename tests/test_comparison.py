@@ -0,0 +1,78 @@
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compare_classifications, eleven_cts
+from jcclass.compute.functions.kernels import CT_CODES
+
+
+def create_dummy_pair(n_time=300, seed=0):
+    """
+    Create two partly agreeing classifications on a small grid, with a few unclassified values.
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.arange(40, 55, 5.0)
+    lon = np.arange(-10, 5, 5.0)
+    shape = (n_time, len(lat), len(lon))
+    values_a = rng.choice(CT_CODES, size=shape).astype(float)
+    values_b = np.where(rng.random(shape) < 0.6, values_a, rng.choice(CT_CODES, size=shape))
+    values_b[rng.random(shape) < 0.03] = np.nan
+    coords = {'latitude': lat, 'longitude': lon}
+    dims = ['time', 'latitude', 'longitude']
+    cts_a = xr.DataArray(values_a, dims=dims, coords={'time': np.arange(n_time), **coords})
+    # The second archive starts later, so only the common time steps are compared
+    cts_b = xr.DataArray(values_b, dims=dims, coords={'time': np.arange(n_time) + 50, **coords})
+    return cts_a, cts_b
+
+
+def reference_scores(a, b, codes):
+    """
+    Confusion matrix, agreement and kappa of one cell with explicit loops.
+    """
+    valid = np.isfinite(a) & np.isfinite(b)
+    a, b = a[valid], b[valid]
+    matrix = np.array([[np.sum((a == i) & (b == j)) for j in codes] for i in codes])
+    n = matrix.sum()
+    agreement = np.trace(matrix) / n
+    expected = (matrix.sum(axis=1) * matrix.sum(axis=0)).sum() / n**2
+    return matrix, agreement, (agreement - expected) / (1 - expected)
+
+
+def test_compare_classifications_matches_loops():
+    cts_a, cts_b = create_dummy_pair()
+
+    comparison = compare_classifications(cts_a, cts_b, chunk_size=64)
+
+    a = cts_a.sel(time=slice(50, None))
+    for lat, lon in [(40, -10), (50, 0)]:
+        matrix, agreement, kappa = reference_scores(a.sel(latitude=lat, longitude=lon).values,
+                                                    cts_b.sel(latitude=lat, longitude=lon, time=a.time).values,
+                                                    CT_CODES)
+        cell = comparison.sel(latitude=lat, longitude=lon)
+        np.testing.assert_array_equal(cell.confusion, matrix)
+        np.testing.assert_allclose(cell.agreement, agreement, rtol=1e-12)
+        np.testing.assert_allclose(cell.kappa, kappa, rtol=1e-12)
+    assert comparison.confusion.dims == ('ct_a', 'ct_b', 'latitude', 'longitude')
+
+
+def test_compare_classifications_without_matrices():
+    cts_a, cts_b = create_dummy_pair()
+
+    eleven = compare_classifications(cts_a, cts_b, eleven=True, chunk_size=64)
+    scores = compare_classifications(cts_a, cts_b, eleven=True, confusion=False, chunk_size=64)
+
+    assert eleven.confusion.shape[:2] == (11, 11)
+    assert 'confusion' not in scores
+    for name in ('agreement', 'kappa', 'count'):
+        np.testing.assert_allclose(scores[name], eleven[name], rtol=1e-12)
+    reduced_a, reduced_b = eleven_cts(cts_a), eleven_cts(cts_b).reindex(time=cts_a.time)
+    agreement = (reduced_a == reduced_b).where(reduced_a.notnull() & reduced_b.notnull()).mean('time')
+    np.testing.assert_allclose(eleven.agreement, agreement, rtol=1e-12)
+
+
+def test_compare_classifications_time_not_first():
+    cts_a, cts_b = create_dummy_pair()
+
+    comparison = compare_classifications(cts_a, cts_b, chunk_size=64)
+    transposed = compare_classifications(cts_a, cts_b.transpose('latitude', 'time', 'longitude'), chunk_size=64)
+
+    xr.testing.assert_identical(transposed, comparison)
@@ -0,0 +1,49 @@
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import ct_composites
+from jcclass.compute.functions.kernels import CT_CODES
+
+
+def create_dummy_data(n_time=400, seed=0):
+    """
+    Create random circulation types and a co-located field on a small grid.
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.arange(40, 60, 5.0)
+    lon = np.arange(-10, 10, 5.0)
+    coords = {'time': np.arange(n_time), 'latitude': lat, 'longitude': lon}
+    dims = ['time', 'latitude', 'longitude']
+    cts = xr.DataArray(rng.choice(CT_CODES, size=(n_time, len(lat), len(lon))).astype(float),
+                       dims=dims, coords=coords, name='cts')
+    field = xr.DataArray(rng.gamma(2, 3, size=cts.shape) + 280, dims=dims, coords=coords, name='t2m')
+    return cts, field
+
+
+def test_composites_match_masked_means():
+    cts, field = create_dummy_data()
+    field[5, 1, 1] = np.nan
+
+    composites = ct_composites(cts, field, chunk_size=64)
+
+    for code in (-1, 0, 20, 24):
+        masked = field.where(cts == code)
+        np.testing.assert_allclose(composites.t2m_mean.sel(ct=code), masked.mean('time'), rtol=1e-12)
+        np.testing.assert_allclose(composites.t2m_std.sel(ct=code), masked.std('time'), rtol=1e-9)
+        np.testing.assert_array_equal(composites.t2m_count.sel(ct=code), masked.count('time'))
+    anomaly = composites.t2m_mean - field.mean('time')
+    np.testing.assert_allclose(composites.t2m_anomaly, anomaly, rtol=1e-9, atol=1e-9)
+
+
+def test_composites_at_reference_point_with_weights():
+    cts, field = create_dummy_data()
+    weights = xr.DataArray(np.random.default_rng(1).random(cts.sizes['time']), dims='time',
+                           coords={'time': cts.time})
+
+    composites = ct_composites(cts, xr.Dataset({'t2m': field}), point=(45, 0), weights=weights)
+
+    reference = cts.sel(latitude=45, longitude=0)
+    selected = reference == 20
+    expected = (field * weights).where(selected).sum('time') / weights.where(selected).sum('time')
+    np.testing.assert_allclose(composites.t2m_mean.sel(ct=20), expected, rtol=1e-12)
+    assert composites.t2m_mean.dims == ('ct', 'latitude', 'longitude')
@@ -0,0 +1,41 @@
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compute_cts, ensemble_probabilities
+
+
+def create_ensemble_mslp(n_members=5):
+    """
+    Create a small regional ensemble MSLP dataset (time, number, lat, lon).
+    """
+    lat = np.arange(30, 70, 2.5)
+    lon = np.arange(-30, 40, 2.5)
+    time = np.arange('2000-01-01', '2000-01-03', dtype='datetime64[D]')
+    mslp_data = 101325 + 3000 * np.random.rand(len(time), n_members, len(lat), len(lon))
+
+    return xr.DataArray(
+        mslp_data,
+        dims=['time', 'number', 'latitude', 'longitude'],
+        coords={'time': time, 'number': np.arange(n_members), 'latitude': lat, 'longitude': lon},
+        name='msl'
+    )
+
+
+def test_ensemble_probabilities_match_members():
+    ens = create_ensemble_mslp()
+    products = ensemble_probabilities(ens, chunk_size=2)
+    members = xr.concat([compute_cts(ens.isel(number=i)) for i in range(ens.sizes['number'])], dim='number')
+
+    assert products.probability.dims == ('time', 'ct', 'latitude', 'longitude')
+    np.testing.assert_allclose(products.probability.sum('ct'), 1.0)
+    expected = (members == products.ct).mean('number').transpose(*products.probability.dims)
+    np.testing.assert_allclose(products.probability, expected)
+
+
+def test_ensemble_mode_and_entropy():
+    ens = create_ensemble_mslp(n_members=3)
+    ens = xr.concat([ens.isel(number=0)] * 3, dim='number')
+    products = ensemble_probabilities(ens)
+
+    np.testing.assert_array_equal(products['mode'], compute_cts(ens.isel(number=0)))
+    np.testing.assert_allclose(products.entropy, 0.0)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from jcclass.compute.equivalence import check_kernels, check_engines
+from jcclass.compute.functions.reference import reference_direction, reference_lwt
+
+
+def test_reference_rules():
+    assert reference_direction(0.0, 45) == "N"
+    assert reference_direction(22.0, 45) == "N"
+    assert reference_direction(22.5, 45) == "NE"
+    assert reference_direction(22.5, -45) == "SW"
+    assert reference_direction(np.nan, 45) is None
+    assert reference_lwt(3, 2, "W") == -1
+    assert reference_lwt(10, -30, "W") == 0
+    assert reference_lwt(10, 30, None) == 20
+    assert reference_lwt(10, 15, "N") == 28
+    assert reference_lwt(10, 5, "N") == 18
+    assert reference_lwt(10, -15, "E") == 2
+
+
+def test_kernels_match_reference():
+    results = check_kernels(n_random=200, seed=1)
+
+    assert all(count > 0 for count in results.values())
+
+
+def test_engines_match_reference():
+    results = check_engines(n_time=2, seed=1)
+
+    assert "JCClassifier[float32]" in results
+    assert "sparse W[float64]" in results
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from jcclass.compute import export_parquet
+from jcclass.compute.functions.kernels import CT_CODES
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+
+def create_dummy_cts(seed=0):
+    """
+    Create random daily circulation types over three years, with unclassified cells.
+    """
+    rng = np.random.default_rng(seed)
+    time = pd.date_range("1999-12-01", "2001-01-31", freq="D")
+    lat = np.arange(40, 55, 5.0)
+    lon = np.arange(-10, 10, 5.0)
+    values = rng.choice(CT_CODES, size=(time.size, lat.size, lon.size)).astype(float)
+    values[:, 0, 0] = np.nan
+    return xr.DataArray(values, dims=['time', 'latitude', 'longitude'],
+                        coords={'time': time, 'latitude': lat, 'longitude': lon}, name='cts')
+
+
+def test_export_parquet_round_trip(tmp_path):
+    cts = create_dummy_cts()
+
+    files = export_parquet(cts, tmp_path / "cts", chunk_size=50)
+
+    assert sorted(file.parent.name for file in files) == ["year=1999", "year=2000", "year=2001"]
+    schema = pq.read_schema(files[0])
+    assert schema.field("code").type == pa.int8()
+    assert schema.field("type").type == pa.dictionary(pa.int8(), pa.string())
+
+    table = pd.read_parquet(tmp_path / "cts").sort_values(["time", "latitude", "longitude"])
+    expected = cts.to_dataframe().dropna().reset_index()
+    assert len(table) == len(expected)
+    np.testing.assert_array_equal(table.time.values, expected.time.values)
+    np.testing.assert_array_equal(table.longitude, expected.longitude)
+    np.testing.assert_array_equal(table.code, expected.cts)
+    assert set(table.loc[table.code == 20, "type"].astype(str)) == {"C"}
+    assert (table.year.astype(int) == table.time.dt.year).all()
+
+
+def test_export_parquet_points_and_eleven_types(tmp_path):
+    cts = create_dummy_cts()
+
+    export_parquet(cts, tmp_path / "cts", points=[(45, 0), (50.5, -9)], eleven=True)
+
+    table = pd.read_parquet(tmp_path / "cts")
+    assert set(zip(table.latitude, table.longitude)) == {(45, 0), (50, -10)}
+    assert table.code.between(-1, 9).all()
+    with pytest.raises(FileExistsError):
+        export_parquet(cts, tmp_path / "cts")
+
+
+def test_export_parquet_overwrite_only_replaces_partitions(tmp_path):
+    cts = create_dummy_cts()
+    export_parquet(cts, tmp_path / "cts")
+
+    files = export_parquet(cts.sel(time="2000"), tmp_path / "cts", overwrite=True)
+    assert [file.parent.name for file in files] == ["year=2000"]
+    assert sorted(entry.name for entry in (tmp_path / "cts").iterdir()) == ["year=2000"]
+
+    (tmp_path / "notes.txt").write_text("keep me")
+    with pytest.raises(FileExistsError, match="does not look like a Parquet export"):
+        export_parquet(cts, tmp_path, overwrite=True)
+    assert (tmp_path / "notes.txt").exists()
+
+
+def test_export_parquet_points_on_native_grid(tmp_path):
+    cts = create_dummy_cts()
+    lat2d, lon2d = xr.broadcast(cts.latitude, cts.longitude)
+    native = xr.DataArray(cts.values, dims=["time", "y", "x"],
+                          coords={"time": cts.time, "latitude": (("y", "x"), lat2d.values),
+                                  "longitude": (("y", "x"), lon2d.values)}, name="cts")
+
+    export_parquet(native, tmp_path / "native", points=[(45, 0), (50.5, -9)])
+    export_parquet(cts, tmp_path / "regular", points=[(45, 0), (50.5, -9)])
+
+    columns = ["time", "latitude", "longitude"]
+    native_table = pd.read_parquet(tmp_path / "native").sort_values(columns).reset_index(drop=True)
+    regular_table = pd.read_parquet(tmp_path / "regular").sort_values(columns).reset_index(drop=True)
+    pd.testing.assert_frame_equal(native_table, regular_table)
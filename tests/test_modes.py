@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from jcclass.compute import daily_modes
+from jcclass.compute.functions.kernels import CT_CODES
+
+
+def create_dummy_cts(seed=0):
+    """
+    Create 6-hourly circulation types drawn from a few types, so that ties are common.
+    """
+    rng = np.random.default_rng(seed)
+    time = pd.date_range("2000-01-01", periods=4 * 40, freq="6h")
+    lat = np.arange(40, 55, 5.0)
+    lon = np.arange(-10, 5, 5.0)
+    values = rng.choice([-1, 0, 11, 20], size=(time.size, lat.size, lon.size)).astype(float)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[8:12, 0, 0] = np.nan
+    return xr.DataArray(values, dims=['time', 'latitude', 'longitude'],
+                        coords={'time': time, 'latitude': lat, 'longitude': lon}, name='cts')
+
+
+def reference_mode(day, tie_break):
+    """
+    Modal type of one day of one cell with explicit loops.
+    """
+    day = [value for value in day if np.isfinite(value)]
+    if not day:
+        return np.nan, np.nan
+    counts = {code: day.count(code) for code in day}
+    tied = [code for code in counts if counts[code] == max(counts.values())]
+    if tie_break == "first":
+        mode = min(tied, key=day.index)
+    elif tie_break == "last":
+        mode = max(tied, key=lambda code: len(day) - day[::-1].index(code))
+    else:
+        mode = min(tied, key=lambda code: list(CT_CODES).index(code))
+    return mode, counts[mode] / len(day)
+
+
+@pytest.mark.parametrize("tie_break", ["first", "last", "order"])
+def test_daily_modes_match_loops(tie_break):
+    cts = create_dummy_cts()
+
+    daily = daily_modes(cts, tie_break=tie_break, block_size=30)
+
+    assert daily.sizes['time'] == 40
+    for i, day in enumerate(cts.time.dt.floor('1D').to_index().unique()):
+        for lat, lon in [(40, -10), (45, 0)]:
+            mode, fraction = reference_mode(list(cts.sel(time=str(day.date()), latitude=lat, longitude=lon).values),
+                                            tie_break)
+            cell = daily.isel(time=i).sel(latitude=lat, longitude=lon)
+            np.testing.assert_equal(float(cell['mode']), mode)
+            np.testing.assert_allclose(float(cell.fraction), fraction, rtol=1e-6)
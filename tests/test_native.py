@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compute_cts, NativeGridClassifier
+
+
+def create_regional_mslp(n_time=2):
+    """
+    Create a regular regional MSLP dataset.
+    """
+    lat = np.arange(20, 72.6, 2.5)
+    lon = np.arange(-40, 42.6, 2.5)
+    mslp_data = 101325 + 3000 * np.random.rand(n_time, len(lat), len(lon))
+
+    return xr.DataArray(
+        mslp_data,
+        dims=['time', 'latitude', 'longitude'],
+        coords={'time': np.arange(n_time), 'latitude': lat, 'longitude': lon},
+        name='msl'
+    )
+
+
+def as_curvilinear(ds_mslp):
+    lat2d, lon2d = np.meshgrid(ds_mslp.latitude, ds_mslp.longitude, indexing='ij')
+    return xr.DataArray(
+        ds_mslp.values,
+        dims=['time', 'y', 'x'],
+        coords={'time': ds_mslp.time, 'lat': (('y', 'x'), lat2d), 'lon': (('y', 'x'), lon2d)},
+        name='msl'
+    )
+
+
+def test_curvilinear_matches_regular_grid():
+    ds_mslp = create_regional_mslp()
+
+    native = compute_cts(as_curvilinear(ds_mslp))
+    regular = compute_cts(ds_mslp)
+
+    assert native.dims == ('time', 'y', 'x')
+    assert native.lat.dims == ('y', 'x')
+    # Cells whose stencil leaves the domain are not classified on native grids
+    classified = np.isfinite(native.values[0])
+    assert 0 < classified.sum() < classified.size
+    np.testing.assert_array_equal(native.values[:, classified], regular.values[:, classified])
+
+
+def test_unstructured_points_in_any_order():
+    curvilinear = as_curvilinear(create_regional_mslp())
+    points = curvilinear.stack(ncells=('y', 'x')).reset_index('ncells', drop=True)
+    order = np.random.default_rng(0).permutation(points.sizes['ncells'])
+    points = points.isel(ncells=order)
+
+    classifier = NativeGridClassifier(points, threads=2)
+    cts = classifier.classify(points)
+
+    expected = compute_cts(curvilinear).values.reshape(curvilinear.sizes['time'], -1)[:, order]
+    np.testing.assert_array_equal(cts.values, expected)
+    assert cts.dims == ('time', 'ncells')
+
+
+def test_native_blocks_and_unsupported_options():
+    curvilinear = as_curvilinear(create_regional_mslp(n_time=5))
+
+    xr.testing.assert_identical(compute_cts(curvilinear, block_size=2), compute_cts(curvilinear))
+    xr.testing.assert_identical(compute_cts(curvilinear, workers=2), compute_cts(curvilinear))
+    with pytest.raises(ValueError, match="Native grids"):
+        compute_cts(curvilinear, dry_run=True)
@@ -0,0 +1,144 @@
+import pytest
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compute_cts
+from jcclass.compute.pipeline import MemoryPlan, parse_memory
+from jcclass.compute.functions.regrid import REGRID_VERSION
+
+
+def create_hourly_mslp(n_days=3):
+    """
+    Create a small regional hourly MSLP dataset.
+    """
+    lat = np.arange(30, 70, 2.5)
+    lon = np.arange(-30, 40, 2.5)
+    time = np.arange('2000-01-01T00', f'2000-01-{1 + n_days:02d}T00', dtype='datetime64[h]').astype('datetime64[ns]')
+    mslp_data = 101325 + 3000 * np.random.rand(len(time), len(lat), len(lon))
+
+    return xr.DataArray(
+        mslp_data,
+        dims=['time', 'latitude', 'longitude'],
+        coords={'time': time, 'latitude': lat, 'longitude': lon},
+        name='msl'
+    )
+
+
+def test_blocks_match_single_pass():
+    ds_mslp = create_hourly_mslp(n_days=1)
+    xr.testing.assert_identical(compute_cts(ds_mslp, block_size=5), compute_cts(ds_mslp))
+
+
+def test_resample_daily_mean():
+    ds_mslp = create_hourly_mslp()
+    cts = compute_cts(ds_mslp, resample="1D", block_size=30)
+    expected = compute_cts(ds_mslp.resample(time="1D").mean())
+
+    assert cts.sizes['time'] == 3
+    xr.testing.assert_identical(cts, expected)
+
+
+def test_resample_rejects_calendar_frequencies():
+    ds_mslp = create_hourly_mslp(n_days=1)
+
+    with pytest.raises(ValueError, match="calendar frequency"):
+        compute_cts(ds_mslp, resample="MS")
+    with pytest.raises(ValueError, match="Unknown resampling frequency"):
+        compute_cts(ds_mslp, resample="fortnightly")
+
+
+def test_resample_synoptic_hour():
+    ds_mslp = create_hourly_mslp()
+    cts = compute_cts(ds_mslp, resample=12)
+
+    xr.testing.assert_identical(cts, compute_cts(ds_mslp.sel(time=ds_mslp.time.dt.hour == 12)))
+
+
+def test_target_grid_regridding(tmp_path, monkeypatch):
+    monkeypatch.setenv('JCCLASS_CACHE_DIR', str(tmp_path))
+    ds_mslp = create_hourly_mslp(n_days=1).isel(time=slice(0, 4))
+    # Same grid, coarser: interpolation falls on existing nodes
+    target = ds_mslp.isel(latitude=slice(None, None, 2), longitude=slice(None, None, 2))
+
+    cts = compute_cts(ds_mslp, target_grid=target)
+    expected = compute_cts(target)
+
+    xr.testing.assert_identical(cts, expected)
+    assert len(list(tmp_path.glob(f'regrid_v{REGRID_VERSION}_*.npz'))) == 1
+    xr.testing.assert_identical(compute_cts(ds_mslp, target_grid=target), cts)
+
+
+def test_parse_memory():
+    assert parse_memory("4GB") == 4 * 10**9
+    assert parse_memory("512 MiB") == 512 * 2**20
+    assert parse_memory("1.5G") == int(1.5 * 2**30)
+    assert parse_memory(1000) == 1000
+    assert parse_memory("2048") == 2048
+    for size in ("4 parsecs", "GB", "1.2.3GB", "-4GB"):
+        with pytest.raises(ValueError, match="Could not read the memory size"):
+            parse_memory(size)
+
+
+def test_max_memory_plan_and_result():
+    ds_mslp = create_hourly_mslp(n_days=2)
+
+    plan = compute_cts(ds_mslp, max_memory="2MB", dry_run=True)
+
+    assert isinstance(plan, MemoryPlan)
+    assert plan.n_time == ds_mslp.sizes['time']
+    assert 1 <= plan.block_size < ds_mslp.sizes['time']
+    assert plan.peak_bytes <= 2 * 10**6
+    xr.testing.assert_identical(compute_cts(ds_mslp, max_memory="2MB"), compute_cts(ds_mslp))
+    with pytest.raises(ValueError, match="too small"):
+        compute_cts(ds_mslp, max_memory="10KB")
+
+
+@pytest.mark.parametrize('options', [{}, {'resample': '1D'}, {'stencil': 'bilinear'}, {'tile_shape': (5, 5)}])
+def test_packed_int16_matches_decoded(options):
+    ds_mslp = create_hourly_mslp(n_days=2)
+    # Raw values within ±15000, inside the int16 range
+    scale_factor, add_offset = 0.1, 102825.0
+    raw = np.round((ds_mslp.values - add_offset) / scale_factor).astype(np.int16)
+    raw[0, 4, 4] = -32767
+    packed = ds_mslp.copy(data=raw)
+    packed.attrs.update(scale_factor=scale_factor, add_offset=add_offset, _FillValue=np.int16(-32767))
+    decoded = xr.decode_cf(packed.to_dataset()).msl
+    assert decoded.dtype == np.float64
+    np.testing.assert_allclose(decoded.where(decoded.notnull(), ds_mslp), ds_mslp, atol=scale_factor)
+
+    cts = compute_cts(packed, **options)
+    xr.testing.assert_identical(cts, compute_cts(decoded, **options))
+    if not options:
+        assert cts.isel(time=0).isnull().sum() > compute_cts(ds_mslp).isel(time=0).isnull().sum()
+
+
+def test_packed_int16_matches_float_field():
+    # Whole pascals are packed exactly with a scale of 1 Pa
+    ds_mslp = np.round(create_hourly_mslp(n_days=1))
+    packed = ds_mslp.copy(data=(ds_mslp.values - 102825).astype(np.int16))
+    packed.attrs.update(scale_factor=1.0, add_offset=102825.0)
+
+    xr.testing.assert_identical(compute_cts(packed), compute_cts(ds_mslp))
+
+
+def test_max_memory_with_streamed_output():
+    ds_mslp = create_hourly_mslp(n_days=2)
+    output_bytes = ds_mslp.size * 8
+    plan = compute_cts(ds_mslp, max_memory="1GB", dry_run=True)
+    budget = plan.fixed_bytes - output_bytes + 2 * plan.step_bytes
+
+    arrays = []
+
+    def out(template):
+        arrays.append(np.empty(template.shape))
+        return arrays[-1]
+
+    streamed = compute_cts(ds_mslp, max_memory=budget, dry_run=True, out=out)
+    assert streamed.fixed_bytes == plan.fixed_bytes - output_bytes
+    assert streamed.block_size == 2 and streamed.peak_bytes <= budget
+    with pytest.raises(ValueError, match="too small"):
+        compute_cts(ds_mslp, max_memory=budget)
+
+    template = compute_cts(ds_mslp, max_memory=budget, out=out)
+    expected = compute_cts(ds_mslp)
+    xr.testing.assert_identical(template.copy(data=arrays[0]), expected)
@@ -43,3 +43,53 @@ def test_plot_cts_with_custom_area(tmp_path):
     fig.savefig(path)
     assert path.exists(), "Figure should be saved to file"
 
+
+def test_plot_cts_headless_with_cached_coastline(tmp_path, monkeypatch):
+    """
+    Test the headless backend draws a coastline from a shapefile and caches it per extent.
+    """
+    import shapefile
+    from jcclass.plotting.functions import coastline
+
+    with shapefile.Writer(str(tmp_path / "coast"), shapeType=shapefile.POLYLINE) as writer:
+        writer.field("name", "C")
+        writer.line([[[-170.0, 50.0], [-60.0, 30.0], [-20.0, 20.0], [100.0, 40.0]]])
+        writer.record("coast")
+    monkeypatch.setenv("JCCLASS_COASTLINE", str(tmp_path / "coast.shp"))
+    monkeypatch.setenv("JCCLASS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(coastline, "_COASTLINE_CACHE", {})
+
+    cts_2d = create_dummy_cts_2d()
+    fig = plot_cts(cts_2d, lat_south=-60, lat_north=60, lon_west=-100, lon_east=20,
+                   show=False, backend="headless")
+    assert isinstance(fig, mplfig.Figure)
+    fig.savefig(tmp_path / "test_plot.png")
+    assert len(list((tmp_path / "cache").glob("coastline_50m_*.npz"))) == 1
+
+    # Only the part within the extent (plus a 1 degree margin) is kept, cut at its edges
+    (_, resolution, extent), path = next(iter(coastline._COASTLINE_CACHE.items()))
+    np.testing.assert_allclose(path.vertices, [[-101.0, 50.0 - 20.0 * 69 / 110], [-60.0, 30.0],
+                                               [-20.0, 20.0], [21.0, 20.0 + 20.0 * 41 / 120]])
+
+    # Later processes read the cached coastline rather than the shapefile
+    read_coastlines = coastline.read_coastlines
+    monkeypatch.setattr(coastline, "_COASTLINE_CACHE", {})
+    monkeypatch.setattr(coastline, "read_coastlines", lambda source: pytest.fail("shapefile read"))
+    cached = coastline.coastline_path(extent, resolution)
+    np.testing.assert_array_equal(cached.vertices, path.vertices)
+    monkeypatch.setattr(coastline, "read_coastlines", read_coastlines)
+
+    # A different shapefile is not served from the cache
+    with shapefile.Writer(str(tmp_path / "other"), shapeType=shapefile.POLYLINE) as writer:
+        writer.field("name", "C")
+        writer.line([[[-50.0, -70.0], [-50.0, 70.0]]])
+        writer.record("coast")
+    monkeypatch.setenv("JCCLASS_COASTLINE", str(tmp_path / "other.shp"))
+    monkeypatch.setattr(coastline, "_COASTLINE_CACHE", {})
+    other = coastline.coastline_path(extent, resolution)
+    np.testing.assert_allclose(other.vertices, [[-50.0, extent[2] - 1.0], [-50.0, extent[3] + 1.0]])
+    assert len(list((tmp_path / "cache").glob("coastline_50m_*.npz"))) == 2
+
+    # A missing shapefile gives no coastline
+    monkeypatch.setenv("JCCLASS_COASTLINE", str(tmp_path / "missing.shp"))
+    assert coastline.coastline_path(extent, resolution) is None
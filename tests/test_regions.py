@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from jcclass.compute import track_regions, summarize_tracks
+from jcclass.compute.regions import label_regions
+
+
+def create_moving_cyclone(n_time=12):
+    """
+    Create global circulation types with a 3x3 cyclonic (20) area moving east across the
+    date line, and a second one appearing half-way through.
+    """
+    lat = np.arange(-80, 81, 5.0)
+    lon = np.arange(-180, 180, 5.0)
+    values = np.zeros((n_time, lat.size, lon.size))
+    for t in range(n_time):
+        columns = (np.arange(3) + 66 + t) % lon.size
+        values[t][np.ix_(np.arange(20, 23), columns)] = 20
+        if t >= n_time // 2:
+            values[t, 5:7, 10:12] = 20
+    time = pd.date_range("2000-01-01", periods=n_time, freq="D")
+    return xr.DataArray(values, dims=['time', 'latitude', 'longitude'],
+                        coords={'time': time, 'latitude': lat, 'longitude': lon})
+
+
+def test_label_regions_joins_across_date_line():
+    mask = np.zeros((2, 4, 6), dtype=bool)
+    mask[0, 1, [0, 5]] = True
+    mask[1, 2, [0, 5]] = True
+
+    labels, n = label_regions(mask, wrap=True)
+
+    assert n == 2
+    assert labels[0, 1, 0] == labels[0, 1, 5] != labels[1, 2, 0] == labels[1, 2, 5]
+    assert label_regions(mask)[1] == 4
+
+
+def test_track_regions_across_chunks():
+    cts = create_moving_cyclone()
+
+    regions = track_regions(cts, types=20, chunk_size=5)
+
+    pd.testing.assert_frame_equal(regions, track_regions(cts, types=20, chunk_size=100))
+    tracks = summarize_tracks(regions)
+    assert list(tracks.index) == [1, 2]
+    assert tracks.loc[1, 'steps'] == 12 and tracks.loc[2, 'steps'] == 6
+    moving = regions[regions.track == 1]
+    # The region crossing the date line stays in one piece
+    assert (moving.cells == 9).all()
+    lat = np.array([20, 25, 30])
+    weights = np.cos(np.deg2rad(lat))
+    np.testing.assert_allclose(moving.latitude, (lat * weights).sum() / weights.sum(), rtol=1e-12)
+    np.testing.assert_allclose(moving.longitude.iloc[[0, 5, 6, 11]], [155, -180, -175, -150], atol=1e-9)
+    assert len(track_regions(cts, types=20, min_size=5)) == 12
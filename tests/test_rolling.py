@@ -0,0 +1,42 @@
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import rolling_frequencies, eleven_cts
+from jcclass.compute.functions.kernels import CT_CODES
+
+
+def create_dummy_cts(n_time=200, seed=0):
+    """
+    Create random circulation types on a small grid, with a few unclassified values.
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.arange(40, 55, 5.0)
+    lon = np.arange(-10, 10, 5.0)
+    values = rng.choice(CT_CODES, size=(n_time, len(lat), len(lon))).astype(float)
+    values[rng.random(values.shape) < 0.02] = np.nan
+    return xr.DataArray(values, dims=['time', 'latitude', 'longitude'],
+                        coords={'time': np.arange(n_time), 'latitude': lat, 'longitude': lon}, name='cts')
+
+
+def test_rolling_frequencies_match_xarray_rolling():
+    cts = create_dummy_cts()
+
+    # Chunks shorter than the windows, so the state is carried across several chunks
+    running = rolling_frequencies(cts, windows=(7, 30), types=[-1, 0, 20], chunk_size=13)
+
+    for window in (7, 30):
+        for code in (-1, 0, 20):
+            expected = (cts == code).where(cts.notnull()).rolling(time=window).mean()
+            np.testing.assert_allclose(running[f'frequency_{window}'].sel(ct=code), expected, rtol=1e-6)
+    assert running.frequency_30.dims == ('time', 'ct', 'latitude', 'longitude')
+
+
+def test_rolling_frequencies_eleven_types_with_min_periods():
+    cts = create_dummy_cts()
+
+    running = rolling_frequencies(cts, windows=10, eleven=True, min_periods=1, chunk_size=64)
+
+    reduced = eleven_cts(cts)
+    expected = (reduced == 9).where(reduced.notnull()).rolling(time=10, min_periods=1).mean()
+    np.testing.assert_allclose(running.frequency_10.sel(ct=9), expected, rtol=1e-6)
+    np.testing.assert_allclose(running.frequency_10.sum('ct').isel(time=slice(1, None)), 1, rtol=1e-5)
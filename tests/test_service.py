@@ -0,0 +1,133 @@
+import http.client
+import io
+import threading
+
+import numpy as np
+import xarray as xr
+
+from jcclass.cli import CTS_FILL_VALUE
+from jcclass.compute import compute_cts
+from jcclass.service import NETCDF_CONTENT, ClassificationService, make_server, request_cts
+
+
+def create_dummy_mslp(n_time=3, seed=0):
+    """
+    Create random regional MSLP fields.
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.arange(30, 70, 2.5)
+    lon = np.arange(-30, 40, 2.5)
+    values = 101325 + 3000 * rng.random((n_time, lat.size, lon.size))
+    return xr.DataArray(values, dims=['time', 'latitude', 'longitude'],
+                        coords={'time': np.arange(n_time), 'latitude': lat, 'longitude': lon})
+
+
+def start_server(service, **kwargs):
+    server = make_server(service, port=0, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def test_service_micro_batches_concurrent_requests():
+    service = ClassificationService(max_wait=0.2)
+    server = start_server(service)
+    port = server.server_address[1]
+    fields = [create_dummy_mslp(seed=seed) for seed in range(6)]
+    results = [None] * len(fields)
+
+    def send(i):
+        results[i] = request_cts(fields[i].values, fields[i].latitude.values, fields[i].longitude.values,
+                                 port=port)
+
+    try:
+        threads = [threading.Thread(target=send, args=(i,)) for i in range(len(fields))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = service.stats()
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    for field, (cts, lat, lon) in zip(fields, results):
+        expected = compute_cts(field)
+        assert cts.dtype == np.int8
+        np.testing.assert_array_equal(cts, np.where(np.isnan(expected), CTS_FILL_VALUE, expected))
+        np.testing.assert_array_equal(lat, expected.latitude)
+        np.testing.assert_array_equal(lon, expected.longitude)
+    # One warm classifier, and fewer classifications than requests
+    assert stats['classifiers'] == 1 and stats['requests'] == len(fields)
+    assert stats['batches'] < len(fields)
+
+
+def test_service_on_unix_socket(tmp_path):
+    service = ClassificationService()
+    socket_path = str(tmp_path / 'jcclass.sock')
+    server = start_server(service, socket_path=socket_path)
+    field = create_dummy_mslp()
+    try:
+        cts, _, _ = request_cts(field.values[0], field.latitude.values, field.longitude.values,
+                                socket_path=socket_path, mask='equator')
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    expected = compute_cts(field).isel(time=0)
+    np.testing.assert_array_equal(cts, np.where(np.isnan(expected), CTS_FILL_VALUE, expected))
+
+
+def test_service_after_eviction():
+    service = ClassificationService(max_classifiers=1)
+    field = create_dummy_mslp()
+    other = create_dummy_mslp(seed=1).assign_coords(longitude=lambda ds: ds.longitude + 1.0)
+    grid = (field.latitude.values, field.longitude.values)
+    try:
+        evicted = service._batcher(*grid, 'gather', None)
+        service.classify(other.values, other.latitude.values, other.longitude.values)
+        assert evicted.submit(field.values) is None
+        evicted._thread.join(5)
+        assert not evicted._thread.is_alive()
+
+        # A request that picked the evicted batcher is classified by the grid's new one
+        batcher = service._batcher
+        picks = []
+
+        def pick(*args):
+            picks.append(args)
+            return evicted if len(picks) == 1 else batcher(*args)
+
+        service._batcher = pick
+        cts, _, _ = service.classify(field.values, *grid)
+        assert len(picks) == 2
+    finally:
+        service.close()
+
+    expected = compute_cts(field)
+    np.testing.assert_array_equal(cts, np.where(np.isnan(expected), CTS_FILL_VALUE, expected))
+
+
+def test_service_netcdf_request():
+    service = ClassificationService()
+    server = start_server(service)
+    field = create_dummy_mslp()
+    body = bytes(field.rename('msl').to_dataset().to_netcdf())
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=60)
+    try:
+        connection.request('POST', '/classify', body=body, headers={'Content-Type': NETCDF_CONTENT})
+        response = connection.getresponse()
+        assert response.status == 200
+        with np.load(io.BytesIO(response.read())) as arrays:
+            cts, lat = arrays['cts'], arrays['latitude']
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+    expected = compute_cts(field)
+    np.testing.assert_array_equal(cts, np.where(np.isnan(expected), CTS_FILL_VALUE, expected))
+    np.testing.assert_array_equal(lat, expected.latitude)
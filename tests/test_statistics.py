@@ -0,0 +1,64 @@
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compare_periods
+from jcclass.compute.functions.kernels import CT_CODES
+
+
+def create_dummy_cts(n_time, probabilities, seed):
+    """
+    Create a random archive of the 27 circulation types on a small grid.
+    """
+    rng = np.random.default_rng(seed)
+    lat = np.arange(40, 60, 5.0)
+    lon = np.arange(-10, 10, 5.0)
+    codes = rng.choice(CT_CODES, size=(n_time, len(lat), len(lon)), p=probabilities).astype(float)
+
+    return xr.DataArray(
+        codes,
+        dims=['time', 'latitude', 'longitude'],
+        coords={'time': np.arange(n_time), 'latitude': lat, 'longitude': lon},
+        name='cts'
+    )
+
+
+def test_compare_periods_detects_change():
+    uniform = np.full(CT_CODES.size, 1 / CT_CODES.size)
+    shifted = uniform.copy()
+    shifted[CT_CODES == 20] += 0.1
+    shifted /= shifted.sum()
+    cts_a = create_dummy_cts(2000, uniform, seed=0)
+    cts_b = create_dummy_cts(2000, shifted, seed=1)
+
+    change = compare_periods(cts_a, cts_b, n_resamples=200, seed=0)
+
+    assert change.difference.dims == ('ct', 'latitude', 'longitude')
+    np.testing.assert_allclose(change.frequency_a.sum('ct'), 1.0, rtol=1e-6)
+    assert (change.difference.sel(ct=20) > 0).all()
+    assert (change.p_value.sel(ct=20) < 0.05).all()
+    assert (change.p_value.drop_sel(ct=20) > 0.001).mean() > 0.9
+
+
+def test_compare_periods_workers_and_eleven():
+    uniform = np.full(CT_CODES.size, 1 / CT_CODES.size)
+    cts_a = create_dummy_cts(300, uniform, seed=2)
+    cts_b = create_dummy_cts(200, uniform, seed=3)
+
+    serial = compare_periods(cts_a, cts_b, n_resamples=120, eleven=True, seed=5)
+    parallel = compare_periods(cts_a, cts_b, n_resamples=120, eleven=True, seed=5, workers=2)
+
+    assert serial.sizes['ct'] == 11
+    xr.testing.assert_identical(serial, parallel)
+
+
+def test_compare_periods_chunked_cells():
+    uniform = np.full(CT_CODES.size, 1 / CT_CODES.size)
+    cts_a = create_dummy_cts(200, uniform, seed=6).transpose('latitude', 'time', 'longitude')
+    cts_b = create_dummy_cts(150, uniform, seed=7)
+
+    whole = compare_periods(cts_a, cts_b, n_resamples=60, seed=8)
+    chunked = compare_periods(cts_a, cts_b, n_resamples=60, seed=8, chunk_cells=4)
+    shared = compare_periods(cts_a, cts_b, n_resamples=60, seed=8, chunk_cells=8, workers=2)
+
+    xr.testing.assert_identical(whole, chunked)
+    xr.testing.assert_identical(whole, shared)
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compute_cts
+from jcclass.compute.streaming import BackgroundWriter, PipelineStats, prefetch, stream_blocks
+
+
+def create_mslp(n_time=30):
+    """
+    Create a small regional MSLP dataset.
+    """
+    lat = np.arange(30, 70, 2.5)
+    lon = np.arange(-30, 40, 2.5)
+    mslp_data = 101325 + 3000 * np.random.rand(n_time, len(lat), len(lon))
+
+    return xr.DataArray(
+        mslp_data,
+        dims=['time', 'latitude', 'longitude'],
+        coords={'time': np.arange(n_time), 'latitude': lat, 'longitude': lon},
+        name='msl'
+    )
+
+
+def test_prefetch_reads_ahead_in_order():
+    reader_threads = set()
+
+    def read(item):
+        reader_threads.add(threading.current_thread().name)
+        return np.full(3, item)
+
+    items = [item for item, _ in prefetch(read, range(10), depth=3)]
+
+    assert items == list(range(10))
+    assert reader_threads == {'jcclass-reader'}
+
+
+def test_prefetch_and_writer_raise_errors():
+    def read(item):
+        if item == 2:
+            raise OSError('corrupt block')
+        return item
+
+    with pytest.raises(OSError, match='corrupt block'):
+        list(prefetch(read, range(5)))
+
+    def write(item, result):
+        raise IOError('disk full')
+
+    with pytest.raises(IOError, match='disk full'):
+        with BackgroundWriter(write) as writer:
+            writer.submit(0, np.zeros(1))
+
+
+def test_stream_blocks_overlaps_stages():
+    written = {}
+    threads = {"read": set(), "classify": set(), "write": set()}
+
+    def read(item):
+        threads["read"].add(threading.current_thread().name)
+        return np.ones(1000) * item
+
+    def classify(values):
+        threads["classify"].add(threading.current_thread().name)
+        return values * 2
+
+    def write(item, result):
+        threads["write"].add(threading.current_thread().name)
+        written[item] = result[0]
+
+    stats = stream_blocks(read, classify, write, list(range(10)), depth=2)
+
+    assert written == {item: 2.0 * item for item in range(10)}
+    assert stats.read.items == stats.classify.items == stats.write.items == 10
+    assert stats.read.nbytes == 10 * 8000
+    # Reading and writing run on their own threads, concurrently with the classification
+    assert threads == {"read": {"jcclass-reader"}, "classify": {threading.current_thread().name},
+                       "write": {"jcclass-writer"}}
+
+
+def test_compute_cts_prefetch_matches():
+    ds_mslp = create_mslp()
+    xr.testing.assert_identical(compute_cts(ds_mslp, prefetch=2, block_size=4), compute_cts(ds_mslp))
+
+
+def test_stream_blocks_stops_reader_on_failure():
+    read = []
+
+    def classify(values):
+        raise ValueError('bad block')
+
+    with pytest.raises(ValueError, match='bad block') as error:
+        stream_blocks(lambda item: read.append(item) or np.zeros(1), classify, lambda item, result: None,
+                      list(range(1000)), depth=2)
+
+    # The reader is stopped although the traceback still references the pipeline frames
+    assert error.value is not None
+    assert not any(thread.name == 'jcclass-reader' for thread in threading.enumerate())
+    assert len(read) < 10
+
+
+def test_compute_cts_prefetch_stats():
+    ds_mslp = create_mslp()
+    stats = PipelineStats()
+
+    compute_cts(ds_mslp, prefetch=2, block_size=4, stats=stats)
+
+    assert stats.read.items == stats.classify.items == stats.write.items == 8
+    assert stats.read.nbytes == ds_mslp.nbytes
+    assert stats.wall_seconds > 0
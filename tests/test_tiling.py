@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+import xarray as xr
+
+from jcclass.compute import compute_cts, JCClassifier
+from jcclass.compute.tiling import plan_tiles
+
+
+def create_global_mslp(n_time=2, dtype=np.float64):
+    """
+    Create a coarse global MSLP dataset with descending latitudes and 0-360 longitudes.
+    """
+    lat = np.arange(90, -90.1, -2.5)
+    lon = np.arange(0, 360, 2.5)
+    mslp_data = 101325 + 3000 * np.random.rand(n_time, len(lat), len(lon))
+
+    return xr.DataArray(
+        mslp_data.astype(dtype),
+        dims=['time', 'lat', 'lon'],
+        coords={'time': np.arange(n_time), 'lat': lat, 'lon': lon},
+        name='msl'
+    )
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_tiles_match_untiled(dtype):
+    ds_mslp = create_global_mslp(dtype=dtype)
+
+    tiled = compute_cts(ds_mslp, tile_shape=(7, 11), workers=3)
+
+    xr.testing.assert_identical(tiled, compute_cts(ds_mslp))
+
+
+def test_tiles_with_mask_and_sparse_stencil():
+    ds_mslp = create_global_mslp()
+
+    for kwargs in ({'mask': 'equator'}, {'stencil': 'nearest'}):
+        untiled = compute_cts(ds_mslp, block_size=2, **kwargs)
+        xr.testing.assert_identical(compute_cts(ds_mslp, tile_shape=(10, 20), **kwargs), untiled)
+
+
+def test_tile_halo_wraps_around():
+    ds_mslp = create_global_mslp()
+    classifier = JCClassifier(ds_mslp)
+
+    tiles = plan_tiles(classifier, (8, 8))
+    greenwich = int(np.flatnonzero(classifier.longitude.values == 0)[0])
+    tile = next(tile for tile in tiles if greenwich in tile.cells)
+
+    assert sum(tile.cells.size for tile in tiles) == classifier.shape[0] * classifier.shape[1]
+    # Cells at 0° reach the columns at both ends of the 0-360 input grid
+    assert tile.cols.min() == 0 and tile.cols.max() == ds_mslp.sizes['lon'] - 1
+    assert tile.cols.size < ds_mslp.sizes['lon'] and tile.rows.size < ds_mslp.sizes['lat']
+
+
+def test_workers_without_tiles(monkeypatch):
+    ds_mslp = create_global_mslp()
+    threads = []
+    init = JCClassifier.__init__
+
+    def record_threads(self, *args, **kwargs):
+        threads.append(kwargs.get('threads', 1))
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(JCClassifier, '__init__', record_threads)
+    threaded = compute_cts(ds_mslp, workers=3)
+
+    # Whole fields are classified in bands on the classifier's threads
+    assert threads == [3]
+    xr.testing.assert_identical(threaded, compute_cts(ds_mslp))
+    with pytest.raises(ValueError, match="workers must be a positive integer"):
+        compute_cts(ds_mslp, workers=0)